@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Benchmark the mythtvlib hot paths against the stand-in backend
+(mythtvlib.fake_backend), so no MythTV installation is required.
+
+Each benchmark is run over a range of sizes (the scaling curve), and for
+each size reports the elapsed time (best of --repeat runs), throughput
+(items per second), time per item, the peak memory allocated and the memory
+retained per item by the run's result, e.g. the records answered (both
+measured in a separate run under tracemalloc).
+
+    python3 benchmarks/run_benchmarks.py
+        Run all benchmarks and compare against benchmarks/baseline.json
+    python3 benchmarks/run_benchmarks.py --only queryset_filter --only from_element
+        Run the named benchmarks
+    python3 benchmarks/run_benchmarks.py --quick
+        Only run the smallest sizes
+    python3 benchmarks/run_benchmarks.py --update-baseline
+        Store the results as the new baseline
+
+A benchmark regresses if its throughput drops below, or its peak memory
+rises above, the baseline by more than --tolerance (default 25%), and its
+time grows by more than --min-seconds (default 1ms) or its peak memory by
+more than --min-kib (default 16 KiB), so that the noise in the smallest
+measurements isn't reported.  The exit status is 1 if any benchmark
+regressed.  Timings depend on the machine, so the baseline should be
+updated on the machine used to check releases.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from argparse import Namespace
+from os.path import abspath, dirname, join, realpath
+from tempfile import TemporaryDirectory
+
+# Use the workspace copy of mythtvlib
+sys.path.insert(0, abspath(join(dirname(realpath(__file__)), '..')))
+
+from mythtvlib.settings import settings
+# Benchmarks measure the library, not the cache or logging
+settings.RESPONSE_CACHE_TTL = 0
+settings.COLLECT_STATS = False
+
+from mythtvlib import services
+from mythtvlib.backend import MythTVBackend
+from mythtvlib.fake_backend import MythTVFakeBackend, MythTVFakeBackendData
+from mythtvlib.query import MythTVQuerySet
+from mythtvlib.service_channel import ChannelInfo
+from mythtvlib.service_myth import Profile
+from mythtvlib.services import MythTVServiceObject
+from mythtvlib.utils import RECORD, configure_logging, stop_queue_listeners
+
+BASELINE = join(dirname(realpath(__file__)), 'baseline.json')
+# Regressions smaller than these absolute differences are ignored
+MIN_SECONDS = 0.001
+MIN_KIB = 16.0
+
+# Registered benchmarks: name -> (function, sizes, item description)
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes, items):
+    """Register the decorated function as a benchmark.
+
+    The function is called with the context and a size, and answers a
+    callable which runs the measured code once."""
+    def register(function):
+        BENCHMARKS[name] = (function, sizes, items)
+        return function
+    return register
+
+
+
+class BenchmarkContext(object):
+    """Fake backends and temporary files shared by the benchmarks"""
+
+    def __init__(self, tmp_dir):
+        self.tmp_dir = tmp_dir
+        settings.TMP_DIRS = [tmp_dir]
+        self._fakes = {}
+        return
+
+    def fake(self, channels, sources=1, latency=0.0):
+        """Answer a running fake backend with the requested channels,
+        adding latency seconds to each request"""
+        key = (channels, sources, latency)
+        if key not in self._fakes:
+            self._fakes[key] = MythTVFakeBackend(
+                channels=channels, sources=sources, latency=latency).start()
+        return self._fakes[key]
+
+    def backend(self, channels, sources=1, transport='soap', latency=0.0):
+        "Answer a new backend on the requested fake backend"
+        fake = self.fake(channels, sources, latency)
+        return MythTVBackend(fake.hostname, fake.port, transport)
+
+    def close(self):
+        for fake in self._fakes.values():
+            fake.stop()
+        return
+
+
+def channel_elements(count):
+    "Answer count ChannelInfo response objects, as decoded by the json transport"
+    data = MythTVFakeBackendData(channels=count)
+    return [MythTVServiceObject('ChannelInfo', dict(x))
+            for x in data.source_channels[0]]
+
+
+@benchmark('wsdl_client', [1], 'clients')
+def bench_wsdl_client(context, size):
+    "Retrieve the Channel WSDL, build the index and suds client (empty cache)"
+    fake = context.fake(10)
+    def run():
+        services._schema_sources.clear()
+        backend = MythTVBackend(fake.hostname, fake.port)
+        backend.refresh_wsdl = True
+        backend.service_api('Channel').client
+        backend.http.close()
+        return
+    return run
+
+
+@benchmark('wsdl_client_cached', [1], 'clients')
+def bench_wsdl_client_cached(context, size):
+    "Build the Channel index and suds client from the WSDL cache"
+    fake = context.fake(10)
+    MythTVBackend(fake.hostname, fake.port).service_api('Channel').client
+    def run():
+        backend = MythTVBackend(fake.hostname, fake.port)
+        backend.service_api('Channel').client
+        return
+    return run
+
+
+@benchmark('channelinfo_all', [100, 1000, 10000], 'channels')
+def bench_channelinfo_all(context, size):
+    "ChannelInfo.all() using suds"
+    backend = context.backend(size, sources=2)
+    ChannelInfo.all(backend=backend)
+    return lambda: ChannelInfo.all(backend=backend)
+
+
+@benchmark('channelinfo_all_json', [100, 1000, 10000], 'channels')
+def bench_channelinfo_all_json(context, size):
+    "ChannelInfo.all() using the json transport"
+    backend = context.backend(size, sources=2, transport='json')
+    ChannelInfo.all(backend=backend)
+    return lambda: ChannelInfo.all(backend=backend)
+
+
+@benchmark('queryset_values_list', [100, 1000, 10000], 'channels')
+def bench_queryset_values_list(context, size):
+    "MythTVQuerySet.values_list() of the listed fields using the json transport"
+    backend = context.backend(size, sources=2, transport='json')
+    ChannelInfo.all(backend=backend)
+    fields = ('ChanId', 'SourceId', 'CallSign', 'ChanNum', 'ChannelName',
+              'Visible', 'XMLTVID', 'IconURL')
+    return lambda: MythTVQuerySet('ChannelInfo', backend=backend).values_list(*fields).all()
+
+
+@benchmark('record_memory', [1000, 2000], 'channels')
+def bench_record_memory(context, size):
+    "ChannelInfo.all() using suds, keeping the records (see Bytes/item)"
+    backend = context.backend(size)
+    ChannelInfo.all(backend=backend)
+    return lambda: ChannelInfo.all(backend=backend)
+
+
+@benchmark('record_memory_json', [1000, 10000], 'channels')
+def bench_record_memory_json(context, size):
+    "ChannelInfo.all() using the json transport, keeping the records (see Bytes/item)"
+    backend = context.backend(size, transport='json')
+    ChannelInfo.all(backend=backend)
+    return lambda: ChannelInfo.all(backend=backend)
+
+
+@benchmark('queryset_chanid', [1000, 10000], 'channels')
+def bench_queryset_chanid(context, size):
+    "MythTVQuerySet.filter(ChanId='^...$').all() using the json transport"
+    backend = context.backend(size, sources=2, transport='json')
+    ChannelInfo.all(backend=backend)
+    chan_id = 100000 + size - 1
+    def run():
+        query = MythTVQuerySet('ChannelInfo', backend=backend)
+        return query.filter(ChanId='^{0}$'.format(chan_id)).all()
+    return run
+
+
+@benchmark('queryset_first', [1000, 10000], 'channels')
+def bench_queryset_first(context, size):
+    "MythTVQuerySet.filter().first() over 4 videosources using the json transport"
+    backend = context.backend(size, sources=4, transport='json')
+    ChannelInfo.all(backend=backend)
+    def run():
+        query = MythTVQuerySet('ChannelInfo', backend=backend)
+        return query.filter(CallSign='^Channel 1$').first()
+    return run
+
+
+@benchmark('queryset_count', [1000, 10000], 'channels')
+def bench_queryset_count(context, size):
+    "MythTVQuerySet.filter().count() using the json transport"
+    backend = context.backend(size, sources=2, transport='json')
+    ChannelInfo.all(backend=backend)
+    def run():
+        query = MythTVQuerySet('ChannelInfo', backend=backend)
+        return query.filter(Visible='True').count()
+    return run
+
+
+@benchmark('from_element', [100, 1000, 10000], 'records')
+def bench_from_element(context, size):
+    "MythTVClass.from_element()"
+    backend = MythTVBackend.default()
+    elements = channel_elements(size)
+    return lambda: [ChannelInfo.from_element(x, backend=backend) for x in elements]
+
+
+@benchmark('model_setattr', [1000, 10000, 100000], 'assignments')
+def bench_model_setattr(context, size):
+    "Assigning an updatable attribute of retrieved records (checked and tracked)"
+    backend = MythTVBackend.default()
+    records = [ChannelInfo.from_element(x, backend=backend)
+               for x in channel_elements(1000)] * (size // 1000)
+    def run():
+        for record in records:
+            record.XMLTVID = 'new.example.com'
+            record.XMLTVID = None
+        return
+    return run
+
+
+@benchmark('queryset_filter', [100, 1000, 10000, 100000], 'records')
+def bench_queryset_filter(context, size):
+    "MythTVQuerySet.filter().all() over records already retrieved"
+    backend = MythTVBackend.default()
+    records = [ChannelInfo.from_element(x, backend=backend)
+               for x in channel_elements(size)]
+    def run():
+        query = MythTVQuerySet('ChannelInfo')
+        query._records = list(records)
+        return query.filter(CallSign='^Channel 1').all()
+    return run
+
+
+@benchmark('queryset_filter_multi', [100, 1000, 10000, 100000], 'records')
+def bench_queryset_filter_multi(context, size):
+    "MythTVQuerySet.filter() with three fields over records already retrieved"
+    backend = MythTVBackend.default()
+    records = [ChannelInfo.from_element(x, backend=backend)
+               for x in channel_elements(size)]
+    def run():
+        query = MythTVQuerySet('ChannelInfo')
+        query._records = list(records)
+        return query.filter(CallSign='^Channel 1', Visible='True',
+                            XMLTVID='example').all()
+    return run
+
+
+@benchmark('queryset_filter_lookups', [100, 1000, 10000, 100000], 'records')
+def bench_queryset_filter_lookups(context, size):
+    "MythTVQuerySet.filter() and exclude() field lookups over records already retrieved"
+    backend = MythTVBackend.default()
+    records = [ChannelInfo.from_element(x, backend=backend)
+               for x in channel_elements(size)]
+    chan_ids = [x.ChanId for x in records[::10]]
+    def run():
+        query = MythTVQuerySet('ChannelInfo')
+        query._records = list(records)
+        return query.filter(CallSign__exact='Channel 1', ChanId__in=chan_ids,
+                            Visible__exact=True).exclude(ChanNum__startswith='9').all()
+    return run
+
+
+@benchmark('queryset_get', [1000, 10000, 100000], 'lookups')
+def bench_queryset_get(context, size):
+    "MythTVQuerySet.get(ChanId=...) for every record, using the index"
+    backend = MythTVBackend.default()
+    records = [ChannelInfo.from_element(x, backend=backend)
+               for x in channel_elements(size)]
+    chan_ids = [x.ChanId for x in records]
+    def run():
+        query = MythTVQuerySet('ChannelInfo')
+        query._records = list(records)
+        for chan_id in chan_ids:
+            query.get(ChanId=chan_id)
+        return
+    return run
+
+
+@benchmark('profile_features', [1000], 'features')
+def bench_profile_features(context, size):
+    "Profile feature access"
+    text = MythTVFakeBackendData(channels=10).profile_text()
+    names = list(Profile.definition()['features'].keys())
+    def run():
+        profile = Profile(text=text)
+        for i in range(size):
+            getattr(profile, names[i % len(names)])
+        return
+    return run
+
+
+@benchmark('xmltv_parse', [100, 1000, 10000], 'channels')
+def bench_xmltv_parse(context, size):
+    "MythTVChannelMaintenance.xmltv_data"
+    from mythtvlib.mythtv_chanmaint import MythTVChannelMaintenance
+    fname = join(context.tmp_dir, 'xmltv-{0}.xml'.format(size))
+    with open(fname, 'w') as fp:
+        fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<tv>\n')
+        for i in range(size):
+            fp.write('<channel id="{0}.example.com"><display-name>Channel {0}'
+                     '</display-name></channel>\n'.format(i))
+            fp.write('<programme channel="{0}.example.com" start="20150101000000">'
+                     '<title>Programme</title></programme>\n'.format(i))
+        fp.write('</tv>\n')
+    fake = context.fake(10)
+    args = Namespace(xmltv=fname, hostname=fake.hostname, port=fake.port,
+                     refresh_wsdl=False, stats=False)
+    def run():
+        return MythTVChannelMaintenance(args).xmltv_data
+    return run
+
+
+@benchmark('bulk_save', [100, 1000], 'channels')
+def bench_bulk_save(context, size):
+    "save() every channel using suds"
+    backend = context.backend(size)
+    channels = ChannelInfo.all(backend=backend)
+    def run():
+        for channel in channels:
+            channel.save()
+        return
+    return run
+
+
+def bench_save_changed(context, size, bulk):
+    """Answer a run changing the XMLTVID of every channel and saving them,
+    on a backend adding 5ms to each request"""
+    backend = context.backend(size, latency=0.005)
+    channels = ChannelInfo.all(backend=backend)
+    runs = iter(range(1000000))
+    def run():
+        xmltvid = 'run{0}.example.com'.format(next(runs))
+        for channel in channels:
+            channel.XMLTVID = xmltvid
+        if bulk:
+            return ChannelInfo.bulk_save(channels, workers=4, rate=0)
+        for channel in channels:
+            channel.save()
+        return
+    return run
+
+
+@benchmark('save_latency', [100, 400], 'channels')
+def bench_save_latency(context, size):
+    "save() every changed channel in turn, with 5ms backend latency"
+    return bench_save_changed(context, size, bulk=False)
+
+
+@benchmark('bulk_save_workers', [100, 400], 'channels')
+def bench_bulk_save_workers(context, size):
+    "ChannelInfo.bulk_save() of the changed channels with 4 workers, with 5ms backend latency"
+    return bench_save_changed(context, size, bulk=True)
+
+
+def bench_logging(context, size, queue, console_level):
+    """Answer the bulk update logging loop: a RECORD line per record and an
+    INFO summary, using settings.LOGGING writing to the temporary directory"""
+    config = copy.deepcopy(settings.LOGGING)
+    config['handlers']['rotate']['filename'] = join(context.tmp_dir, 'bench.log')
+    config['handlers']['console']['stream'] = open(os.devnull, 'w')
+    config['handlers']['console']['level'] = console_level
+    logging.disable(logging.NOTSET)
+    logger = logging.getLogger('mythtv_cli.py')
+    configure_logging(config, queue=queue, loggers=[logger.name])
+    def run():
+        log_records = logger.isEnabledFor(RECORD)
+        for i in range(size):
+            if log_records:
+                logger.log(RECORD, "Updated: ChannelInfo(ChanId={0}) XMLTVID: '' => '{0}.example.com'".format(i))
+        logger.info("Updated {0} record(s)".format(size))
+        return
+    return run
+
+
+@benchmark('logging_direct', [1000, 10000], 'records')
+def bench_logging_direct(context, size):
+    "Log each updated record, handlers called synchronously"
+    return bench_logging(context, size, False, 'RECORD')
+
+
+@benchmark('logging_queue', [1000, 10000], 'records')
+def bench_logging_queue(context, size):
+    "Log each updated record through QueueHandler (time to queue only)"
+    return bench_logging(context, size, True, 'RECORD')
+
+
+@benchmark('logging_summary', [1000, 10000], 'records')
+def bench_logging_summary(context, size):
+    "Log only the bulk summary (root logger at INFO)"
+    config_level = settings.LOGGING['root']['level']
+    settings.LOGGING['root']['level'] = 'INFO'
+    try:
+        return bench_logging(context, size, False, 'INFO')
+    finally:
+        settings.LOGGING['root']['level'] = config_level
+
+
+def measure(function, size, repeat):
+    """Answer the best elapsed time of repeat runs of the benchmark,
+    and the peak memory allocated by, and the memory still allocated for
+    the result of, a separate run"""
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+
+def run_benchmarks(names, quick, repeat, output):
+    """Answer the results:
+    {name: {size: {seconds, throughput, peak_kib, retained_per_item}}}"""
+    results = {}
+    with TemporaryDirectory() as tmp_dir:
+        context = BenchmarkContext(tmp_dir)
+        try:
+            for name in names:
+                function, sizes, items = BENCHMARKS[name]
+                if quick:
+                    sizes = sizes[:1]
+                output.write("{0} ({1})\n".format(name, function.__doc__))
+                output.write("    {0:>8} {1:>10} {2:>14} {3:>12} {4:>12} {5:>10}\n".format(
+                    "Size", "Seconds", items + "/s", "us/item", "Peak KiB", "Bytes/item"))
+                results[name] = {}
+                for size in sizes:
+                    seconds, peak, retained = measure(function(context, size), size, repeat)
+                    result = {'seconds': seconds,
+                              'throughput': size / seconds,
+                              'peak_kib': peak / 1024.0,
+                              'retained_per_item': float(retained) / size}
+                    results[name][str(size)] = result
+                    output.write("    {0:>8} {1:>10.4f} {2:>14.1f} {3:>12.2f} {4:>12.1f} {5:>10.0f}\n".format(
+                        size, seconds, result['throughput'],
+                        seconds * 1e6 / size, result['peak_kib'],
+                        result['retained_per_item']))
+                    output.flush()
+                    # Undo any logging configured by the benchmark
+                    stop_queue_listeners()
+                    logging.disable(logging.WARNING)
+        finally:
+            context.close()
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds=MIN_SECONDS, min_kib=MIN_KIB):
+    """Answer the lines describing the results that regressed
+    compared with the baseline, by more than tolerance and by more than
+    min_seconds or min_kib"""
+    regressions = []
+    for name, sizes in sorted(results.items()):
+        for size, result in sorted(sizes.items(), key=lambda x: int(x[0])):
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                continue
+            if (result['throughput'] < base['throughput'] * (1 - tolerance) and
+                    result['seconds'] - base['seconds'] > min_seconds):
+                regressions.append(
+                    "{0}[{1}]: throughput {2:.1f}/s, baseline {3:.1f}/s".format(
+                        name, size, result['throughput'], base['throughput']))
+            if (result['peak_kib'] > base['peak_kib'] * (1 + tolerance) and
+                    result['peak_kib'] - base['peak_kib'] > min_kib):
+                regressions.append(
+                    "{0}[{1}]: peak memory {2:.1f} KiB, baseline {3:.1f} KiB".format(
+                        name, size, result['peak_kib'], base['peak_kib']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mythtvlib benchmarks",
+                                     epilog=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS),
+                        help="Run the named benchmark (may be repeated)")
+    parser.add_argument('--quick', action='store_true', default=False,
+                        help="Only run the smallest size of each benchmark")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Number of timed runs, the best is reported (3)")
+    parser.add_argument('--baseline', default=BASELINE,
+                        help="Baseline file (benchmarks/baseline.json)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed fractional slowdown or memory growth (0.25)")
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                        help="Ignore slowdowns of at most this many seconds (0.001)")
+    parser.add_argument('--min-kib', type=float, default=MIN_KIB,
+                        help="Ignore peak memory growth of at most this many KiB (16)")
+    parser.add_argument('--update-baseline', action='store_true', default=False,
+                        help="Store the results as the baseline")
+    parser.add_argument('--output', default=None,
+                        help="Also write the results to the named JSON file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    names = args.only or list(BENCHMARKS)
+    results = run_benchmarks(names, args.quick, args.repeat, sys.stdout)
+    if args.output is not None:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    if args.update_baseline:
+        try:
+            with open(args.baseline) as fp:
+                baseline = json.load(fp)
+        except FileNotFoundError:
+            baseline = {}
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        with open(args.baseline, 'w') as fp:
+            json.dump(baseline, fp, indent=2, sort_keys=True)
+            fp.write("\n")
+        print("Baseline written to {0}".format(args.baseline))
+        return
+    try:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+    except FileNotFoundError:
+        print("No baseline: {0}".format(args.baseline))
+        return
+    regressions = compare(results, baseline, args.tolerance,
+                          args.min_seconds, args.min_kib)
+    if len(regressions) > 0:
+        print("Regressions compared with {0}:".format(args.baseline))
+        for line in regressions:
+            print("    " + line)
+        exit(1)
+    print("No regressions compared with {0}".format(args.baseline))
+    return
+
+
+if __name__ == "__main__":
+    main()
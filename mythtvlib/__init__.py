@@ -1,2 +1,4 @@
 __VERSION__ = "0.2.1"
 config_file_name = 'mythtv_cli_settings.py'
+# The MythTV services, see MythTVServiceAPI
+SERVICE_NAMES = ['Capture', 'Channel', 'Content', 'DVR', 'Frontend', 'Guide', 'Myth', 'Video']
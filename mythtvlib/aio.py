@@ -0,0 +1,228 @@
+"""
+Module: aio.py
+
+asyncio access to the MythTV services.
+
+The service layer (suds, the connection pool) is blocking, so the async
+classes run the blocking calls in a thread pool owned by each backend,
+leaving the event loop free.  The WSDL metadata, connection pool, response
+cache and model classes are shared with the synchronous MythTVBackend
+being wrapped, e.g.:
+
+    backend = MythTVAsyncBackend('mythbackend')
+    channels = await backend.service_api("Channel").call(
+        "GetChannelInfoList", 1)
+    records = await MythTVAsyncQuerySet('ChannelInfo', backend).filter(
+        CallSign='ABC').all()
+    async for record in MythTVAsyncQuerySet('ChannelInfo', backend):
+        ...
+
+MythTVAsyncQuerySet retrieves each of the model's partitions (e.g. the
+channels of each videosource) concurrently, and calls on different
+backends (each with its own thread pool) run concurrently, see
+MythTVServiceAPI for how the service APIs are shared by the threads.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from mythtvlib.backend import MythTVBackend
+from mythtvlib.query import MythTVQuerySet, exact_values
+
+
+
+def pushdown_records(cls, exact, backend):
+    """Answer the records built from cls.pushdown(exact), or None.
+    The elements may be retrieved as they are iterated over, so the
+    records are built in the executor too."""
+    elements = cls.pushdown(exact, backend=backend)
+    if elements is None:
+        return None
+    return [cls.from_element(x, backend=backend) for x in elements]
+
+
+
+class MythTVAsyncBackend(object):
+    """The asyncio counterpart of MythTVBackend"""
+    _default = None
+
+    def __init__(self, hostname=None, port=None, transport=None, backend=None,
+                 workers=None):
+        """Initialise the receiver.
+
+        backend is the MythTVBackend to wrap, by default a new backend is
+        created from hostname, port and transport.
+        workers is the number of threads the blocking calls are run in,
+        the default is the size of the backend's connection pool."""
+        self.backend = backend
+        if self.backend is None:
+            self.backend = MythTVBackend(hostname, port, transport)
+        if workers is None:
+            workers = self.backend.http.size
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._service_apis = {}
+        return
+
+    @classmethod
+    def default(cls):
+        "Answer the default async backend, sharing MythTVBackend.default()"
+        if cls._default is None:
+            cls._default = cls(backend=MythTVBackend.default())
+        return cls._default
+
+    @property
+    def hostname(self):
+        return self.backend.hostname
+
+    @property
+    def port(self):
+        return self.backend.port
+
+    async def run(self, function, *args, **kwargs):
+        "Answer the result of the blocking function, run in the receivers executor"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(function, *args, **kwargs))
+
+    def service_api(self, service_name):
+        api = self._service_apis.get(service_name)
+        if api is None:
+            api = MythTVAsyncServiceAPI(self, self.backend.service_api(service_name))
+            self._service_apis[service_name] = api
+        return api
+
+    def close(self):
+        "Stop the receivers threads and close the idle connections"
+        self.executor.shutdown(wait=False)
+        self.backend.http.close()
+        return
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return
+
+    def __str__(self):
+        return "MythTVAsyncBackend(hostname={hostname}, port={port})".format(
+                hostname=self.hostname, port=self.port)
+
+
+
+class MythTVAsyncServiceAPI(object):
+    """The asyncio counterpart of MythTVServiceAPI.
+    The introspection methods that may retrieve the WSDL are coroutines."""
+
+    def __init__(self, async_backend, api):
+        self.async_backend = async_backend
+        self.api = api
+        self.service_name = api.service_name
+        return
+
+    async def call(self, operation, *args, **kwargs):
+        "Invoke the requested operation, answering the response"
+        return await self.async_backend.run(self.api.call, operation, *args, **kwargs)
+
+    async def operations(self):
+        return await self.async_backend.run(self.api.operations)
+
+    async def operation_parameters(self, operation):
+        return await self.async_backend.run(self.api.operation_parameters, operation)
+
+    def __repr__(self):
+        return "{cls}({svc})".format(cls=self.__class__.__name__, svc=self.service_name)
+
+
+
+class MythTVAsyncQuerySet(MythTVQuerySet):
+    """The asyncio counterpart of MythTVQuerySet.
+
+    filter(), exclude(), values(), order_by(), etc. are unchanged, the
+    methods that retrieve records are coroutines, and the records may be
+    iterated over with async for.  The synchronous iteration, len() and
+    indexing would block the event loop, and raise TypeError."""
+
+    def __init__(self, classname, async_backend=None):
+        if async_backend is None:
+            async_backend = MythTVAsyncBackend.default()
+        MythTVQuerySet.__init__(self, classname, backend=async_backend.backend)
+        self.async_backend = async_backend
+        return
+
+    async def _fetch(self):
+        """Answer the records, using the model's pushdown() if possible,
+        otherwise retrieving the partitions concurrently"""
+        cls = self.mythtv_class
+        run = self.async_backend.run
+        exact = exact_values(self._filters)
+        if len(exact) > 0:
+            records = await run(pushdown_records, cls, exact, self.backend)
+            if records is not None:
+                return records
+        keys = await run(cls.partitions, backend=self.backend)
+        partitions = await asyncio.gather(
+            *[run(cls.partition, key, backend=self.backend) for key in keys])
+        records = []
+        for partition in partitions:
+            records.extend(partition)
+        return records
+
+    async def all(self):
+        """Answer all the records matching the receivers filters"""
+        if self._result is None and self._records is None:
+            self._records = await self._fetch()
+        return self._apply_filters()
+
+    async def index_by(self, field_name):
+        "See MythTVQuerySet.index_by()"
+        await self.all()
+        return self._index_by(field_name)
+
+    async def get(self, **kwargs):
+        "See MythTVQuerySet.get()"
+        await self.all()
+        return MythTVQuerySet.get(self, **kwargs)
+
+    async def in_bulk(self, field_name, values):
+        "See MythTVQuerySet.in_bulk()"
+        await self.all()
+        return MythTVQuerySet.in_bulk(self, field_name, values)
+
+    async def update(self, **fields):
+        "See MythTVQuerySet.update(), the records are saved in the executor"
+        await self.all()
+        return await self.async_backend.run(MythTVQuerySet.update, self, **fields)
+
+    async def first(self):
+        """See MythTVQuerySet.first(), the records are retrieved lazily in
+        the executor"""
+        return await self.async_backend.run(MythTVQuerySet.first, self)
+
+    async def exists(self):
+        "See MythTVQuerySet.exists()"
+        return await self.async_backend.run(MythTVQuerySet.exists, self)
+
+    async def count(self):
+        "See MythTVQuerySet.count()"
+        return await self.async_backend.run(MythTVQuerySet.count, self)
+
+    async def __aiter__(self):
+        for record in await self.all():
+            yield record
+        return
+
+    def _blocking(self, operation, alternative):
+        raise TypeError("{0} would block the event loop, use {1}".format(
+            operation, alternative))
+
+    def __iter__(self):
+        self._blocking("Iterating over a MythTVAsyncQuerySet", "async for")
+
+    def __len__(self):
+        self._blocking("len() of a MythTVAsyncQuerySet", "await count()")
+
+    def __getitem__(self, index):
+        self._blocking("Indexing a MythTVAsyncQuerySet",
+                       "(await all())[index] or await first()")
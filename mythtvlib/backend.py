@@ -5,19 +5,31 @@ This is very basic at the moment, it just stores the backend location and
 returns the requested service.
 """
 
+import atexit
+from os.path import join
+from threading import RLock
+
 from mythtvlib.settings import settings
-from mythtvlib.services import MythTVServiceAPI
+from mythtvlib.response_cache import MythTVResponseCache
+from mythtvlib.services import TRANSPORTS, MythTVServiceAPI, MythTVServiceException
+from mythtvlib.stats import MythTVStats
+from mythtvlib.transport import MythTVConnectionPool
+from mythtvlib.wsdl_cache import MythTVWSDLCache
 
 
 
 class MythTVBackend(object):
     _default = None
 
-    def __init__(self, hostname=None, port=None):
+    def __init__(self, hostname=None, port=None, transport=None):
         """Initialise the receiver.
         
         If no parameters are supplied, settings will be used.
-        If settings are not defined, use defaults."""
+        If settings are not defined, use defaults.
+
+        transport is used for GET operations, see services.TRANSPORTS.
+        The default is looked up in settings.SERVICE_TRANSPORTS by
+        "hostname:port", then hostname, then settings.SERVICE_TRANSPORT."""
 
         self.hostname = hostname
         if self.hostname is None:
@@ -25,7 +37,32 @@ class MythTVBackend(object):
         self.port = port
         if self.port is None:
             self.port = int(getattr(settings, "PORT", 6544))
+        self.transport = transport
+        if self.transport is None:
+            transports = getattr(settings, "SERVICE_TRANSPORTS", {})
+            self.transport = transports.get(
+                "{0}:{1}".format(self.hostname, self.port),
+                transports.get(self.hostname,
+                               getattr(settings, "SERVICE_TRANSPORT", "soap")))
+        if self.transport not in TRANSPORTS:
+            raise MythTVServiceException("Unknown transport: {0}".format(self.transport))
+        # Call and request statistics, see stats()
+        self.metrics = MythTVStats()
+        # All requests to the backend share the connection pool
+        self.http = MythTVConnectionPool(
+            self.hostname, self.port,
+            size=int(getattr(settings, "HTTP_POOL_SIZE", 4)),
+            timeout=float(getattr(settings, "HTTP_TIMEOUT", 90)),
+            metrics=self.metrics)
+        # refresh_wsdl forces the WSDL to be retrieved from the backend
+        # instead of the cache
+        self.refresh_wsdl = False
+        self._wsdl_cache = None
+        self._response_cache = None
         self._service_apis = {}
+        # _lock guards the lazily created caches and service APIs, which
+        # may be shared by threads (see mythtvlib.aio)
+        self._lock = RLock()
         return
 
     @classmethod
@@ -39,11 +76,45 @@ class MythTVBackend(object):
     def services(cls):
         return MythTVServiceAPI.services
 
+    @property
+    def wsdl_cache(self):
+        "Answer the receivers WSDL cache"
+        with self._lock:
+            if self._wsdl_cache is None:
+                self._wsdl_cache = MythTVWSDLCache(self)
+        return self._wsdl_cache
+
+    @property
+    def response_cache(self):
+        """Answer the receivers GET response cache.
+        The cache is saved on exit if settings.RESPONSE_CACHE_PERSIST"""
+        with self._lock:
+            if self._response_cache is None:
+                fname = None
+                if getattr(settings, "RESPONSE_CACHE_PERSIST", False):
+                    fname = join(self.wsdl_cache.directory, "responses.pickle")
+                self._response_cache = MythTVResponseCache(self, fname=fname)
+                if fname is not None:
+                    atexit.register(self._response_cache.save)
+        return self._response_cache
+
+    def stats(self):
+        """Answer the receivers statistics: the metrics collected while
+        enabled (see stats.MythTVStats), the connection counters and the
+        response cache counters"""
+        stats = self.metrics.summary()
+        stats['http'] = self.http.counters()
+        cache = self.response_cache
+        stats['response_cache'] = {'hits': cache.hits, 'misses': cache.misses,
+                                   'entries': len(cache), 'bytes': cache.bytes}
+        return stats
+
     def service_api(self, service_name):
-        api = self._service_apis.get(service_name)
-        if api is None:
-            api = MythTVServiceAPI(service_name, self)
-            self._service_apis[service_name] = api
+        with self._lock:
+            api = self._service_apis.get(service_name)
+            if api is None:
+                api = MythTVServiceAPI(service_name, self)
+                self._service_apis[service_name] = api
         return api
 
     def __str__(self):
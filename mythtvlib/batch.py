@@ -0,0 +1,154 @@
+"""
+Module: batch.py
+
+Run many service operations on a single backend, see mythtv_cli batch.
+
+Each line of the batch is:
+
+    <service> <operation> [<arg>...]
+
+Blank lines and lines starting with # are ignored, arguments containing
+spaces may be quoted as in the shell.  The operations are run by a pool of
+worker threads sharing the backend (see MythTVServiceAPI), and each result
+is written as soon as it is available, with every output line prefixed by
+the batch line number:
+
+    3: (ChannelInfo){
+    3:    ChanId = 1001
+    ...
+    5: ERROR: Unknown Channel operation: GetChanelInfo
+"""
+
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+
+from mythtvlib.services import MythTVServiceException
+
+
+
+class MythTVBatchItem(object):
+    """A single operation in the batch, and its outcome"""
+
+    def __init__(self, line_number, service_name, operation, args):
+        self.line_number = line_number
+        self.service_name = service_name
+        self.operation = operation
+        self.args = args
+        self.response = None
+        self.error = None
+        self.elapsed = None
+        return
+
+    @property
+    def name(self):
+        return "{0}.{1}".format(self.service_name, self.operation)
+
+    def output_lines(self):
+        "Answer the receivers outcome as lines tagged with its line number"
+        if self.error is not None:
+            lines = ["ERROR: {0}".format(self.error)]
+        else:
+            lines = str(self.response).split("\n")
+        return ["{0}: {1}".format(self.line_number, x) for x in lines]
+
+
+
+def read_batch(fp):
+    """Answer the MythTVBatchItems read from the supplied file.
+    Lines that can't be parsed are answered as items with an error."""
+    items = []
+    for line_number, line in enumerate(fp, 1):
+        line = line.strip()
+        if len(line) == 0 or line.startswith('#'):
+            continue
+        error = None
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            words = []
+            error = str(e)
+        if error is None and len(words) < 2:
+            error = "Expected <service> <operation> [<arg>...]"
+        if error is None and 'help' in words[1:]:
+            error = "help isn't available in a batch"
+        if error is None:
+            item = MythTVBatchItem(line_number, words[0], words[1], words[2:])
+        else:
+            item = MythTVBatchItem(line_number, None, None, [])
+            item.error = error
+        items.append(item)
+    return items
+
+
+
+class MythTVBatch(object):
+    """Run MythTVBatchItems concurrently on a backend"""
+
+    def __init__(self, backend, workers=4):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self._output_lock = Lock()
+        self.elapsed = None
+        return
+
+    def execute(self, item):
+        "Run the item's operation, recording the response or error"
+        start = time.time()
+        try:
+            service = self.backend.service_api(item.service_name)
+            item.response = service.execute_args([item.operation] + item.args)
+        except MythTVServiceException as e:
+            item.error = str(e)
+        except Exception as e:
+            # Report backend failures against the item and carry on
+            item.error = "{0}: {1}".format(e.__class__.__name__, e)
+        item.elapsed = time.time() - start
+        return item
+
+    def write(self, item, output):
+        with self._output_lock:
+            for line in item.output_lines():
+                output.write(line + "\n")
+            output.flush()
+        return
+
+    def run(self, items, output):
+        """Run the items, writing each outcome to output as it completes.
+        Answer the number of failed items."""
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = []
+            for item in items:
+                if item.error is not None:
+                    # Invalid line
+                    self.write(item, output)
+                else:
+                    futures.append(executor.submit(self.execute, item))
+            for future in as_completed(futures):
+                self.write(future.result(), output)
+        self.elapsed = time.time() - start
+        return len([x for x in items if x.error is not None])
+
+    def summary(self, items):
+        """Answer the summary lines: the item counts and the latency of
+        each operation"""
+        failed = len([x for x in items if x.error is not None])
+        lines = ["{0} operation(s), {1} failed, {2:.3f}s elapsed, {3} worker(s)".format(
+            len(items), failed, self.elapsed or 0.0, self.workers)]
+        operations = {}
+        for item in items:
+            if item.elapsed is not None:
+                operations.setdefault(item.name, []).append(item)
+        if len(operations) > 0:
+            lines.append("    {0:<40} {1:>5} {2:>6} {3:>9} {4:>9}".format(
+                "Operation", "Count", "Errors", "Mean (ms)", "Max (ms)"))
+        for name in sorted(operations):
+            op_items = operations[name]
+            elapsed = [x.elapsed * 1000 for x in op_items]
+            lines.append("    {0:<40} {1:>5} {2:>6} {3:>9.1f} {4:>9.1f}".format(
+                name, len(op_items),
+                len([x for x in op_items if x.error is not None]),
+                sum(elapsed) / len(elapsed), max(elapsed)))
+        return lines
@@ -0,0 +1,146 @@
+"""
+Module: bulk.py
+
+Save many records on a single backend, see MythTVClass.bulk_save() and
+MythTVQuerySet.update().
+
+Only the records with changes (see MythTVClass.needs_save()) are saved,
+by a pool of worker threads sharing the backend (see MythTVServiceAPI).
+The start of the saves can be limited to a number per second, to spare
+the backend.  The outcome of each record is answered in a
+MythTVSaveReport:
+
+    report = ChannelInfo.bulk_save(channels)
+    for result in report.failed:
+        print(result.record, result.error)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from mythtvlib.settings import settings
+
+# MythTVSaveResult status values
+SAVED = 'saved'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+
+
+class MythTVSaveResult(object):
+    """The outcome of saving a single record"""
+
+    def __init__(self, record):
+        self.record = record
+        # changes is the receivers field_name -> (old value, new value)
+        # before the save, see MythTVClass.changes()
+        self.changes = record.changes()
+        self.status = None
+        self.error = None
+        self.elapsed = None
+        return
+
+
+
+class MythTVSaveReport(object):
+    """The MythTVSaveResults of a bulk save, in the order of the records"""
+
+    def __init__(self, results, workers, elapsed):
+        self.results = results
+        self.workers = workers
+        self.elapsed = elapsed
+        return
+
+    def _status(self, status):
+        return [x for x in self.results if x.status == status]
+
+    @property
+    def saved(self):
+        return self._status(SAVED)
+
+    @property
+    def unchanged(self):
+        return self._status(UNCHANGED)
+
+    @property
+    def failed(self):
+        return self._status(FAILED)
+
+    def summary(self):
+        "Answer the summary line of the receiver"
+        return ("{0} record(s): {1} saved, {2} unchanged, {3} failed, "
+                "{4:.3f}s elapsed, {5} worker(s)").format(
+            len(self.results), len(self.saved), len(self.unchanged),
+            len(self.failed), self.elapsed, self.workers)
+
+
+
+class MythTVRateLimiter(object):
+    """Space the calls to wait() at least 1/rate seconds apart, across
+    threads.  A rate of 0 (or None) doesn't limit the calls."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = Lock()
+        self._next = 0.0
+        return
+
+    def wait(self):
+        "Wait until the next call is allowed"
+        if self.interval == 0.0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return
+
+
+
+class MythTVBulkSave(object):
+    """Save records concurrently"""
+
+    def __init__(self, workers=None, rate=None):
+        if workers is None:
+            workers = int(getattr(settings, "SAVE_WORKERS", 4))
+        if rate is None:
+            rate = float(getattr(settings, "SAVE_RATE", 0))
+        self.workers = max(1, workers)
+        self.limiter = MythTVRateLimiter(rate)
+        return
+
+    def execute(self, result):
+        "Save the result's record, recording the outcome"
+        self.limiter.wait()
+        start = time.time()
+        try:
+            result.record.save()
+            result.status = SAVED
+        except Exception as e:
+            # Report backend failures against the record and carry on
+            result.status = FAILED
+            result.error = "{0}: {1}".format(e.__class__.__name__, e)
+        result.elapsed = time.time() - start
+        return result
+
+    def run(self, records):
+        "Save the records that need saving, answer the MythTVSaveReport"
+        start = time.time()
+        results = [MythTVSaveResult(x) for x in records]
+        pending = []
+        for result in results:
+            if result.record.needs_save():
+                pending.append(result)
+            else:
+                result.status = UNCHANGED
+        workers = min(self.workers, len(pending))
+        if workers <= 1:
+            for result in pending:
+                self.execute(result)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self.execute, pending))
+        return MythTVSaveReport(results, max(1, workers), time.time() - start)
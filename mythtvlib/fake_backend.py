@@ -0,0 +1,823 @@
+"""
+Module: fake_backend.py
+
+A stand-in MythTV backend for offline testing and benchmarking.
+
+MythTVFakeBackend serves a small subset of the MythTV Web Services
+(Channel, Myth, Guide and DVR) using http.server:
+
+* /<Service>/wsdl and /<Service>/xsd?type=<Type> describe the services in the
+  same layout as a real backend, i.e. the WSDL imports the type definitions.
+* GET /<Service>/<Operation>?<Param>=<Value> answers with XML, or JSON if the
+  request sends "Accept: application/json".
+* POST /<Service> answers SOAP requests (as sent by suds).
+* POST /<Service>/<Operation> answers form encoded updates.
+
+Invalid requests are answered with 400 (GET) or a SOAP fault.
+
+The channel list is synthetic: the number of channels (e.g. 10 to 50,000)
+and video sources is configurable, and latency (per request) and bandwidth
+limits may be injected so that the performance of mythtvlib can be
+measured reproducibly.  The tests start one on a free port:
+
+    with MythTVFakeBackend(channels=300, sources=2) as fake:
+        backend = MythTVBackend(fake.hostname, fake.port)
+
+Run it from the command line with:
+
+    python -m mythtvlib.fake_backend --channels 1000 --sources 2 --port 6544
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlsplit
+from xml.sax.saxutils import escape
+
+from lxml.etree import fromstring
+
+
+XS_NS = 'http://www.w3.org/2001/XMLSchema'
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+MYTHTV_NS = 'http://mythtv.org'
+
+# Complex types, as (element name, type) in sequence order.
+# ArrayOf<Type> definitions are generated automatically.
+TYPES = {
+    'ChannelInfo': [
+        ('ChanId', 'xs:unsignedInt'), ('ChanNum', 'xs:string'),
+        ('CallSign', 'xs:string'), ('IconURL', 'xs:string'),
+        ('ChannelName', 'xs:string'), ('MplexId', 'xs:unsignedInt'),
+        ('TransportId', 'xs:unsignedInt'), ('ServiceId', 'xs:unsignedInt'),
+        ('NetworkId', 'xs:unsignedInt'), ('ATSCMajorChan', 'xs:unsignedInt'),
+        ('ATSCMinorChan', 'xs:unsignedInt'), ('Format', 'xs:string'),
+        ('Modulation', 'xs:string'), ('Frequency', 'xs:long'),
+        ('FrequencyId', 'xs:string'), ('FrequencyTable', 'xs:string'),
+        ('FineTune', 'xs:int'), ('SIStandard', 'xs:string'),
+        ('ChanFilters', 'xs:string'), ('SourceId', 'xs:int'),
+        ('InputId', 'xs:int'), ('CommFree', 'xs:int'),
+        ('UseEIT', 'xs:boolean'), ('Visible', 'xs:boolean'),
+        ('XMLTVID', 'xs:string'), ('DefaultAuth', 'xs:string'),
+        ('Programs', 'tns:ArrayOfProgram')],
+    'ChannelInfoList': [
+        ('StartIndex', 'xs:int'), ('Count', 'xs:int'),
+        ('CurrentPage', 'xs:int'), ('TotalPages', 'xs:int'),
+        ('TotalAvailable', 'xs:int'), ('AsOf', 'xs:dateTime'),
+        ('Version', 'xs:string'), ('ProtoVer', 'xs:string'),
+        ('ChannelInfos', 'tns:ArrayOfChannelInfo')],
+    'VideoSource': [
+        ('Id', 'xs:int'), ('SourceName', 'xs:string'),
+        ('Grabber', 'xs:string'), ('UserId', 'xs:string'),
+        ('FreqTable', 'xs:string'), ('LineupId', 'xs:string'),
+        ('Password', 'xs:string'), ('UseEIT', 'xs:boolean'),
+        ('ConfigPath', 'xs:string'), ('NITId', 'xs:int')],
+    'VideoSourceList': [
+        ('AsOf', 'xs:dateTime'), ('Version', 'xs:string'),
+        ('ProtoVer', 'xs:string'),
+        ('VideoSources', 'tns:ArrayOfVideoSource')],
+    'Program': [
+        ('StartTime', 'xs:dateTime'), ('EndTime', 'xs:dateTime'),
+        ('Title', 'xs:string'), ('SubTitle', 'xs:string'),
+        ('Category', 'xs:string'), ('ChanId', 'xs:unsignedInt'),
+        ('Description', 'xs:string')],
+    'ProgramList': [
+        ('StartIndex', 'xs:int'), ('Count', 'xs:int'),
+        ('TotalAvailable', 'xs:int'), ('AsOf', 'xs:dateTime'),
+        ('Version', 'xs:string'), ('ProtoVer', 'xs:string'),
+        ('Programs', 'tns:ArrayOfProgram')],
+}
+
+# The operations of each service:
+#     (name, http verb, [(parameter, type)], return type)
+SERVICES = {
+    'Channel': [
+        ('GetChannelInfo', 'GET', [('ChanID', 'xs:unsignedInt')],
+            'tns:ChannelInfo'),
+        ('GetChannelInfoList', 'GET',
+            [('SourceID', 'xs:unsignedInt'), ('StartIndex', 'xs:int'),
+             ('Count', 'xs:int')],
+            'tns:ChannelInfoList'),
+        ('GetVideoSource', 'GET', [('SourceID', 'xs:unsignedInt')],
+            'tns:VideoSource'),
+        ('GetVideoSourceList', 'GET', [], 'tns:VideoSourceList'),
+        ('GetXMLTVIdList', 'GET', [('SourceID', 'xs:unsignedInt')],
+            'tns:ArrayOfString'),
+        ('UpdateDBChannel', 'POST',
+            [('MplexID', 'xs:unsignedInt'), ('SourceID', 'xs:unsignedInt'),
+             ('ChannelID', 'xs:unsignedInt'), ('CallSign', 'xs:string'),
+             ('ChannelName', 'xs:string'), ('ChannelNumber', 'xs:string'),
+             ('ServiceID', 'xs:unsignedInt'),
+             ('ATSCMajorChannel', 'xs:unsignedInt'),
+             ('ATSCMinorChannel', 'xs:unsignedInt'),
+             ('UseEIT', 'xs:boolean'), ('visible', 'xs:boolean'),
+             ('FrequencyID', 'xs:string'), ('Icon', 'xs:string'),
+             ('Format', 'xs:string'), ('XMLTVID', 'xs:string'),
+             ('DefaultAuthority', 'xs:string')],
+            'xs:boolean'),
+    ],
+    'Myth': [
+        ('GetHostName', 'GET', [], 'xs:string'),
+        ('GetTimeZone', 'GET', [], 'xs:string'),
+        ('ProfileText', 'GET', [], 'xs:string'),
+    ],
+    'Guide': [
+        ('GetProgramDetails', 'GET',
+            [('ChanId', 'xs:int'), ('StartTime', 'xs:dateTime')],
+            'tns:Program'),
+        ('GetProgramList', 'GET',
+            [('StartIndex', 'xs:int'), ('Count', 'xs:int'),
+             ('ChanId', 'xs:int')],
+            'tns:ProgramList'),
+    ],
+    'DVR': [
+        ('GetExpiringList', 'GET',
+            [('StartIndex', 'xs:int'), ('Count', 'xs:int')],
+            'tns:ProgramList'),
+        ('GetRecordedList', 'GET',
+            [('Descending', 'xs:boolean'), ('StartIndex', 'xs:int'),
+             ('Count', 'xs:int')],
+            'tns:ProgramList'),
+    ],
+}
+
+PROFILE_TEXT = """MythTV Profile
+
+- audio:
+     {'passthru': 'false', 'stereopcm': 'false', 'upmixtype': 'passive', 'volcontrol': 'true', 'defaultupmix': 'false', 'maxchannels': '2', 'passthruoverride': 'false', 'mixercontrol': 'PCM', 'audio_sys_version': '', 'sr_override': 'false', 'pulse': 'false', 'passthrudevice': 'Default', 'jack': 'false', 'device': 'ALSA:default', 'audio_sys': 'ALSA', 'mixerdevice': 'ALSA:default'}
+- branch:
+     fixes/0.27
+- channel_count:
+     {channel_count}
+- country:
+     CZ
+- database:
+     {'version': '5.5.44', 'usedengine': 'MyISAM', 'engines': ['MyISAM'], 'schema': {}}
+- grabbers:
+     ['tv_grab_huro']
+- historical:
+     {'showcount': 120, 'rectime': 3600, 'db_age': 1000, 'reccount': 12}
+- language:
+     en_us
+- libapi:
+     0.27.20140520-1
+- logurgency:
+     {'ERR': 0}
+- mythtype:
+     1
+- playbackprofile:
+     {'name': 'Normal', 'profiles': []}
+- protocol:
+     77
+- qtversion:
+     4.8.6
+- recordings:
+     {'scheduled': {}, 'livetv': {}, 'expireable': {}, 'upcoming': {}}
+- remote:
+     lirc
+- scheduler:
+     {'count': 1}
+- sourcecount:
+     {source_count}
+- storage:
+     {'rectotal': 1000, 'videofree': 500, 'recfree': 500, 'videototal': 1000}
+- theme:
+     Terra
+- timezone:
+     Europe/Prague
+- tuners:
+     {'DVB': 2}
+- tzoffset:
+     3600
+- uuid:
+     {uuid}
+- version:
+     {version}
+- vtpertuner:
+     2.0
+"""
+
+
+
+class MythTVFakeBackendData(object):
+    """The synthetic database served by the fake backend"""
+
+    def __init__(self, channels=100, sources=1,
+                 version='v0.27.5-20-g0123abcd',
+                 uuid='00000000-0000-0000-0000-000000000001'):
+        self.version = version
+        self.uuid = uuid
+        self.video_sources = []
+        for source_id in range(1, sources + 1):
+            self.video_sources.append({
+                'Id': source_id,
+                'SourceName': 'Source {0}'.format(source_id),
+                'Grabber': 'eitonly',
+                'UserId': '',
+                'FreqTable': 'default',
+                'LineupId': '',
+                'Password': '',
+                'UseEIT': True,
+                'ConfigPath': '',
+                'NITId': -1})
+        self.channels = {}
+        for i in range(channels):
+            source_id = (i % sources) + 1
+            chan_id = source_id * 100000 + i + 1
+            callsign = 'Channel {0}'.format(i // 3)
+            self.channels[chan_id] = {
+                'ChanId': chan_id,
+                'ChanNum': str(i + 1),
+                'CallSign': callsign,
+                'IconURL': 'icon{0}.png'.format(i // 3) if i % 2 else '',
+                'ChannelName': callsign,
+                'MplexId': 1 + i // 10,
+                'TransportId': 1 + i // 10,
+                'ServiceId': i + 1,
+                'NetworkId': 1,
+                'ATSCMajorChan': 0,
+                'ATSCMinorChan': 0,
+                'Format': 'Default',
+                'Modulation': '',
+                'Frequency': 0,
+                'FrequencyId': '',
+                'FrequencyTable': '',
+                'FineTune': 0,
+                'SIStandard': 'dvb',
+                'ChanFilters': '',
+                'SourceId': source_id,
+                'InputId': 0,
+                'CommFree': 0,
+                'UseEIT': True,
+                'Visible': True,
+                'XMLTVID': '{0}.example.com'.format(i // 3) if i % 4 else '',
+                'DefaultAuth': '',
+                'Programs': []}
+        self.programs = []
+        for i, chan_id in enumerate(sorted(self.channels)[:50]):
+            self.programs.append({
+                'StartTime': '2015-01-01T{0:02d}:00:00Z'.format(i % 24),
+                'EndTime': '2015-01-01T{0:02d}:59:00Z'.format(i % 24),
+                'Title': 'Program {0}'.format(i),
+                'SubTitle': '',
+                'Category': 'News',
+                'ChanId': chan_id,
+                'Description': 'Synthetic program {0}'.format(i)})
+        # The channels of each source (0 is all sources) in ChanId order
+        self.source_channels = {0: [self.channels[x] for x in sorted(self.channels)]}
+        for channel in self.source_channels[0]:
+            self.source_channels.setdefault(channel['SourceId'], []).append(channel)
+        self.lock = threading.Lock()
+        return
+
+    def profile_text(self):
+        text = PROFILE_TEXT
+        for k, v in (('{channel_count}', len(self.channels)),
+                     ('{source_count}', len(self.video_sources)),
+                     ('{uuid}', self.uuid),
+                     ('{version}', self.version)):
+            text = text.replace(k, str(v))
+        return text
+
+    def channel_list(self, source_id=0, start_index=0, count=0):
+        channels = self.source_channels.get(source_id, [])
+        total = len(channels)
+        if count > 0:
+            channels = channels[start_index:start_index + count]
+        else:
+            channels = channels[start_index:]
+        return {'StartIndex': start_index,
+                'Count': len(channels),
+                'CurrentPage': 1,
+                'TotalPages': 1,
+                'TotalAvailable': total,
+                'AsOf': '2015-01-01T00:00:00Z',
+                'Version': self.version,
+                'ProtoVer': '77',
+                'ChannelInfos': channels}
+
+    def program_list(self, start_index=0, count=0, chan_id=0):
+        programs = [p for p in self.programs
+                    if chan_id == 0 or p['ChanId'] == chan_id]
+        total = len(programs)
+        if count > 0:
+            programs = programs[start_index:start_index + count]
+        else:
+            programs = programs[start_index:]
+        return {'StartIndex': start_index,
+                'Count': len(programs),
+                'TotalAvailable': total,
+                'AsOf': '2015-01-01T00:00:00Z',
+                'Version': self.version,
+                'ProtoVer': '77',
+                'Programs': programs}
+
+    def update_channel(self, params):
+        "Apply an UpdateDBChannel request, answer True on success"
+        mapping = {
+            'ChannelNumber': 'ChanNum', 'CallSign': 'CallSign',
+            'ChannelName': 'ChannelName', 'Icon': 'IconURL',
+            'visible': 'Visible', 'XMLTVID': 'XMLTVID',
+            'Format': 'Format', 'DefaultAuthority': 'DefaultAuth'}
+        try:
+            chan_id = int(params.get('ChannelID'))
+        except (TypeError, ValueError):
+            return False
+        with self.lock:
+            channel = self.channels.get(chan_id)
+            if channel is None:
+                return False
+            for param, key in mapping.items():
+                if param not in params:
+                    continue
+                value = params[param]
+                if key == 'Visible':
+                    value = str(value).lower() in ('1', 'true')
+                channel[key] = value
+        return True
+
+    def execute(self, service, operation, params):
+        "Answer the (return type, value) of the requested operation"
+        op = operation_definition(service, operation)
+        if op is None:
+            raise KeyError("{0}/{1}".format(service, operation))
+        params = coerce_params(op[2], params)
+        key = (service, operation)
+        if key == ('Channel', 'GetChannelInfo'):
+            value = self.channels.get(params.get('ChanID'))
+            if value is None:
+                raise KeyError("ChanID {0}".format(params.get('ChanID')))
+        elif key == ('Channel', 'GetChannelInfoList'):
+            value = self.channel_list(params.get('SourceID', 0),
+                                      params.get('StartIndex', 0),
+                                      params.get('Count', 0))
+        elif key == ('Channel', 'GetVideoSource'):
+            sources = [v for v in self.video_sources
+                       if v['Id'] == params.get('SourceID')]
+            if len(sources) == 0:
+                raise KeyError("SourceID {0}".format(params.get('SourceID')))
+            value = sources[0]
+        elif key == ('Channel', 'GetVideoSourceList'):
+            value = {'AsOf': '2015-01-01T00:00:00Z',
+                     'Version': self.version,
+                     'ProtoVer': '77',
+                     'VideoSources': self.video_sources}
+        elif key == ('Channel', 'GetXMLTVIdList'):
+            value = sorted(set(c['XMLTVID'] for c in self.channels.values()
+                               if c['XMLTVID'] and
+                               c['SourceId'] == params.get('SourceID')))
+        elif key == ('Channel', 'UpdateDBChannel'):
+            value = self.update_channel(params)
+        elif key == ('Myth', 'GetHostName'):
+            value = 'fakebackend'
+        elif key == ('Myth', 'GetTimeZone'):
+            value = 'Europe/Prague'
+        elif key == ('Myth', 'ProfileText'):
+            value = self.profile_text()
+        elif key == ('Guide', 'GetProgramDetails'):
+            programs = [p for p in self.programs
+                        if p['ChanId'] == params.get('ChanId')]
+            if len(programs) == 0:
+                raise KeyError("ChanId {0}".format(params.get('ChanId')))
+            value = programs[0]
+        elif key == ('Guide', 'GetProgramList'):
+            value = self.program_list(params.get('StartIndex', 0),
+                                      params.get('Count', 0),
+                                      params.get('ChanId', 0))
+        else:
+            # DVR lists
+            value = self.program_list(params.get('StartIndex', 0),
+                                      params.get('Count', 0))
+        return op[3], value
+
+
+
+def operation_definition(service, operation):
+    "Answer the SERVICES entry for the requested operation, or None"
+    for op in SERVICES.get(service, []):
+        if op[0] == operation:
+            return op
+    return None
+
+
+def coerce_params(definitions, params):
+    "Convert the supplied string parameters using their schema types"
+    types = dict(definitions)
+    coerced = {}
+    for k, v in params.items():
+        ptype = types.get(k)
+        if ptype in ('xs:int', 'xs:unsignedInt', 'xs:long'):
+            try:
+                v = int(v)
+            except ValueError:
+                v = 0
+        coerced[k] = v
+    return coerced
+
+
+def referenced_types(type_name, found=None):
+    """Answer the complex type names referenced by the supplied type,
+    including the type itself, in dependency order"""
+    if found is None:
+        found = []
+    if not type_name.startswith('tns:'):
+        return found
+    name = type_name[4:]
+    if name in found:
+        return found
+    if name.startswith('ArrayOf'):
+        found.append(name)
+        referenced_types('tns:' + name[7:], found)
+        return found
+    found.append(name)
+    for element, etype in TYPES.get(name, []):
+        referenced_types(etype, found)
+    return found
+
+
+def xsd_for(base_url, type_name):
+    "Answer the XSD document defining the requested type"
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<xs:schema xmlns:xs="{xs}" xmlns:tns="{tns}" targetNamespace="{tns}" '
+        'elementFormDefault="qualified" attributeFormDefault="unqualified">'.format(
+            xs=XS_NS, tns=MYTHTV_NS)]
+    if type_name.startswith('ArrayOf'):
+        item_type = type_name[7:]
+        if item_type == 'String':
+            item_xs = 'xs:string'
+        else:
+            item_xs = 'tns:' + item_type
+            lines.append('<xs:import schemaLocation="{0}/xsd?type={1}" '
+                         'namespace="{2}"/>'.format(base_url, item_type, MYTHTV_NS))
+        lines.append('<xs:complexType name="{0}"><xs:sequence>'
+                     '<xs:element minOccurs="0" maxOccurs="unbounded" '
+                     'nillable="true" name="{1}" type="{2}"/>'
+                     '</xs:sequence></xs:complexType>'.format(
+                        type_name, item_type, item_xs))
+    else:
+        imports = [t[4:] for e, t in TYPES[type_name] if t.startswith('tns:')]
+        for imp in imports:
+            lines.append('<xs:import schemaLocation="{0}/xsd?type={1}" '
+                         'namespace="{2}"/>'.format(base_url, imp, MYTHTV_NS))
+        lines.append('<xs:complexType name="{0}"><xs:sequence>'.format(type_name))
+        for element, etype in TYPES[type_name]:
+            lines.append('<xs:element minOccurs="0" name="{0}" type="{1}"/>'.format(
+                element, etype))
+        lines.append('</xs:sequence></xs:complexType>')
+    lines.append('<xs:element name="{0}" nillable="true" type="tns:{0}"/>'.format(
+        type_name))
+    lines.append('</xs:schema>')
+    return "\n".join(lines)
+
+
+def wsdl_for(base_url, service):
+    "Answer the WSDL document for the requested service"
+    name = '{0}Services'.format(service)
+    imports = []
+    for op in SERVICES[service]:
+        if op[3].startswith('tns:') and op[3][4:] not in imports:
+            imports.append(op[3][4:])
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" '
+        'xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" '
+        'xmlns:xs="{xs}" xmlns:tns="{tns}" '
+        'xmlns:wsaw="http://www.w3.org/2006/05/addressing/wsdl" '
+        'targetNamespace="{tns}" name="{name}">'.format(
+            xs=XS_NS, tns=MYTHTV_NS, name=name),
+        '<types>',
+        '<xs:schema elementFormDefault="qualified" targetNamespace="{0}">'.format(
+            MYTHTV_NS)]
+    for imp in imports:
+        lines.append('<xs:import schemaLocation="{0}/xsd?type={1}" '
+                     'namespace="{2}"/>'.format(base_url, imp, MYTHTV_NS))
+    for op_name, verb, params, rtype in SERVICES[service]:
+        lines.append('<xs:element name="{0}"><xs:complexType><xs:sequence>'.format(
+            op_name))
+        for pname, ptype in params:
+            lines.append('<xs:element minOccurs="0" maxOccurs="1" '
+                         'name="{0}" type="{1}"/>'.format(pname, ptype))
+        lines.append('</xs:sequence></xs:complexType></xs:element>')
+        lines.append('<xs:element name="{0}Response"><xs:complexType><xs:sequence>'
+                     '<xs:element minOccurs="0" nillable="true" '
+                     'name="{0}Result" type="{1}"/>'
+                     '</xs:sequence></xs:complexType></xs:element>'.format(
+                        op_name, rtype))
+    lines.append('</xs:schema>')
+    lines.append('</types>')
+    for op_name, verb, params, rtype in SERVICES[service]:
+        for direction, suffix in (('Input', ''), ('Output', 'Response')):
+            lines.append('<message name="{name}_{op}_{dir}Message">'
+                         '<part name="parameters" element="tns:{op}{suffix}"/>'
+                         '</message>'.format(name=name, op=op_name,
+                                             dir=direction, suffix=suffix))
+    lines.append('<portType name="{0}">'.format(name))
+    for op_name, verb, params, rtype in SERVICES[service]:
+        lines.append('<operation name="{op}"><documentation>{verb} </documentation>'
+                     '<input wsaw:Action="{tns}/{svc}/{op}" '
+                     'message="tns:{name}_{op}_InputMessage"/>'
+                     '<output wsaw:Action="{tns}/{svc}/{op}Response" '
+                     'message="tns:{name}_{op}_OutputMessage"/>'
+                     '</operation>'.format(op=op_name, verb=verb, tns=MYTHTV_NS,
+                                           svc=service, name=name))
+    lines.append('</portType>')
+    lines.append('<binding name="BasicHttpBinding_{0}" type="tns:{0}">'
+                 '<soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>'.format(
+                    name))
+    for op_name, verb, params, rtype in SERVICES[service]:
+        lines.append('<operation name="{op}">'
+                     '<soap:operation soapAction="{tns}/{svc}/{op}" style="document"/>'
+                     '<input><soap:body use="literal"/></input>'
+                     '<output><soap:body use="literal"/></output>'
+                     '</operation>'.format(op=op_name, tns=MYTHTV_NS, svc=service))
+    lines.append('</binding>')
+    lines.append('<service name="{0}"><documentation>Interface Version 1.0'
+                 '</documentation><port name="BasicHttpBinding_{0}" '
+                 'binding="tns:BasicHttpBinding_{0}">'
+                 '<soap:address location="{1}"/></port></service>'.format(
+                    name, base_url))
+    lines.append('</definitions>')
+    return "\n".join(lines)
+
+
+def _scalar_text(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _xml_value(type_name, value, out):
+    "Append the XML content for value, of schema type type_name, to out"
+    if type_name.startswith('tns:ArrayOf'):
+        item_type = type_name[11:]
+        for item in value:
+            out.append('<{0}>'.format(item_type))
+            if item_type == 'String':
+                out.append(escape(_scalar_text(item)))
+            else:
+                _xml_value('tns:' + item_type, item, out)
+            out.append('</{0}>'.format(item_type))
+    elif type_name.startswith('tns:'):
+        for element, etype in TYPES[type_name[4:]]:
+            out.append('<{0}>'.format(element))
+            _xml_value(etype, value[element], out)
+            out.append('</{0}>'.format(element))
+    else:
+        out.append(escape(_scalar_text(value)))
+    return
+
+
+def _json_value(type_name, value):
+    "Answer the JSON-ready representation used by MythTV: scalars are strings"
+    if type_name.startswith('tns:ArrayOf'):
+        item_type = 'tns:' + type_name[11:]
+        if item_type == 'tns:String':
+            item_type = 'xs:string'
+        return [_json_value(item_type, item) for item in value]
+    elif type_name.startswith('tns:'):
+        return dict((element, _json_value(etype, value[element]))
+                    for element, etype in TYPES[type_name[4:]])
+    return _scalar_text(value)
+
+
+def result_name(type_name):
+    "Answer the root element name MythTV uses for a result of type_name"
+    if type_name == 'tns:ArrayOfString':
+        return 'StringList'
+    if type_name.startswith('tns:'):
+        return type_name[4:]
+    return {'xs:boolean': 'bool', 'xs:string': 'String'}.get(type_name, 'Value')
+
+
+def xml_response(type_name, value):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<{0} xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+           'version="1.0" serializerVersion="1.1">'.format(result_name(type_name))]
+    _xml_value(type_name, value, out)
+    out.append('</{0}>'.format(result_name(type_name)))
+    return "".join(out)
+
+
+def json_response(type_name, value):
+    return json.dumps({result_name(type_name): _json_value(type_name, value)})
+
+
+def soap_response(operation, type_name, value):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<s:Envelope xmlns:s="{0}"><s:Body>'.format(SOAP_ENV_NS),
+           '<{0}Response xmlns="{1}"><{0}Result>'.format(operation, MYTHTV_NS)]
+    _xml_value(type_name, value, out)
+    out.append('</{0}Result></{0}Response></s:Body></s:Envelope>'.format(operation))
+    return "".join(out)
+
+
+def soap_fault(message):
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<s:Envelope xmlns:s="{0}"><s:Body><s:Fault>'
+            '<faultcode>s:Client</faultcode><faultstring>{1}</faultstring>'
+            '</s:Fault></s:Body></s:Envelope>').format(SOAP_ENV_NS, escape(message))
+
+
+
+class MythTVFakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        return
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.record_connection()
+        return
+
+    def send_body(self, body, content_type, status=200):
+        data = body.encode('utf-8')
+        self.server.throttle(len(data))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return
+
+    def split_path(self):
+        parts = urlsplit(self.path)
+        path = [p for p in parts.path.split('/') if p]
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        return path, params
+
+    def do_GET(self):
+        self.server.record_request()
+        path, params = self.split_path()
+        base_url = self.server.base_url
+        if len(path) != 2 or path[0] not in SERVICES:
+            self.send_body("Not Found", 'text/plain', 404)
+            return
+        service, operation = path
+        if operation == 'wsdl':
+            self.send_body(wsdl_for('{0}/{1}'.format(base_url, service), service),
+                           'text/xml')
+            return
+        if operation == 'xsd':
+            type_name = params.get('type', '')
+            if type_name not in TYPES and not type_name.startswith('ArrayOf'):
+                self.send_body("Unknown type", 'text/plain', 404)
+                return
+            self.send_body(xsd_for('{0}/{1}'.format(base_url, service), type_name),
+                           'text/xml')
+            return
+        self.answer(service, operation, params)
+        return
+
+    def answer(self, service, operation, params):
+        try:
+            type_name, value = self.server.data.execute(service, operation, params)
+        except KeyError as e:
+            self.send_body("Invalid request: {0}".format(e), 'text/plain', 400)
+            return
+        if 'application/json' in self.headers.get('Accept', ''):
+            self.send_body(json_response(type_name, value), 'application/json')
+        else:
+            self.send_body(xml_response(type_name, value), 'text/xml')
+        return
+
+    def do_POST(self):
+        self.server.record_request()
+        path, params = self.split_path()
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if len(path) == 2 and path[0] in SERVICES:
+            params.update(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+            self.answer(path[0], path[1], params)
+            return
+        if len(path) != 1 or path[0] not in SERVICES:
+            self.send_body("Not Found", 'text/plain', 404)
+            return
+        service = path[0]
+        envelope = fromstring(body)
+        request = envelope.find('{{{0}}}Body'.format(SOAP_ENV_NS))[0]
+        operation = request.tag.split('}')[-1]
+        for child in request:
+            params[child.tag.split('}')[-1]] = child.text or ''
+        try:
+            type_name, value = self.server.data.execute(service, operation, params)
+        except KeyError as e:
+            self.send_body(soap_fault("Invalid request: {0}".format(e)),
+                           'text/xml', 500)
+            return
+        self.send_body(soap_response(operation, type_name, value), 'text/xml')
+        return
+
+
+
+class MythTVFakeBackend(ThreadingMixIn, HTTPServer):
+    """A threaded HTTP server answering a subset of the MythTV Web Services.
+
+    latency is the delay, in seconds, added to each request.
+    bandwidth is the maximum transfer rate in bytes per second (0=unlimited)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, hostname='localhost', port=0, channels=100, sources=1,
+                 latency=0.0, bandwidth=0, data=None):
+        HTTPServer.__init__(self, (hostname, port), MythTVFakeRequestHandler)
+        # The name clients use, which appears in the WSDL
+        self.hostname = hostname
+        self.data = data
+        if self.data is None:
+            self.data = MythTVFakeBackendData(channels=channels, sources=sources)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.request_count = 0
+        self.connection_count = 0
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        return
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def base_url(self):
+        return 'http://{0}:{1}'.format(self.hostname, self.port)
+
+    def record_request(self):
+        with self._counter_lock:
+            self.request_count += 1
+        return
+
+    def record_connection(self):
+        with self._counter_lock:
+            self.connection_count += 1
+        return
+
+    def throttle(self, nbytes):
+        "Apply the configured latency and bandwidth limits"
+        delay = self.latency
+        if self.bandwidth > 0:
+            delay += float(nbytes) / self.bandwidth
+        if delay > 0:
+            time.sleep(delay)
+        return
+
+    def start(self):
+        "Serve requests in a background thread, answer the receiver"
+        # A short poll interval keeps stop() quick
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake MythTV Backend")
+    parser.add_argument('--hostname', default='localhost',
+                        help="Address to listen on (localhost)")
+    parser.add_argument('--port', type=int, default=6544,
+                        help="Port to listen on (6544)")
+    parser.add_argument('--channels', type=int, default=100,
+                        help="Number of synthetic channels (100)")
+    parser.add_argument('--sources', type=int, default=1,
+                        help="Number of video sources (1)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds added to every request (0)")
+    parser.add_argument('--bandwidth', type=int, default=0,
+                        help="Maximum bytes per second (0=unlimited)")
+    args = parser.parse_args()
+    server = MythTVFakeBackend(args.hostname, args.port,
+                               channels=args.channels, sources=args.sources,
+                               latency=args.latency, bandwidth=args.bandwidth)
+    print("Serving fake MythTV backend on {0}".format(server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 
 import argparse
-import logging.config
+import logging
 import sys
-from lxml.etree import parse
 from os.path import exists, join, isdir, abspath, dirname, realpath, basename
 from urllib.error import URLError
 
@@ -13,13 +12,13 @@ proposed_path = abspath(join(mydir, '..'))
 if isdir(join(proposed_path, 'mythtvlib')) and (proposed_path not in sys.path):
     sys.path.append(proposed_path)
 
-from mythtvlib import __VERSION__
-from mythtvlib.backend import MythTVBackend
-from mythtvlib.query import MythTVQuerySet
+# main() starts profiling before importing the rest of mythtvlib, see --profile
+from mythtvlib.profiling import PROFILE_MODES, MythTVProfiler
 
-from mythtvlib.settings import settings
+# As in mythtv_cli, the rest of mythtvlib (and lxml) is imported when
+# needed, and logging is configured once the arguments have been parsed
+from mythtvlib import __VERSION__
 
-logging.config.dictConfig(settings.LOGGING)
 logger = logging.getLogger(basename(sys.argv[0]))
 
 
@@ -31,11 +30,15 @@ class MythTVMaintenanceException(Exception):
 class MythTVChannelMaintenance(object):
     
     def __init__(self, args):
+        from mythtvlib.backend import MythTVBackend
         self.args = args
         self._xmltv_data = None
         self._callsign_map = None
         self._backend = MythTVBackend.default(hostname=self.args.hostname,
                                               port=self.args.port)
+        self._backend.refresh_wsdl = self.args.refresh_wsdl
+        if self.args.stats:
+            self._backend.metrics.enabled = True
         self._channels = None
         return
 
@@ -46,6 +49,7 @@ class MythTVChannelMaintenance(object):
         if self._xmltv_data is not None:
             return self._xmltv_data
         
+        from lxml.etree import parse
         self.require_xmltv()
         self._xmltv_data = {}
         tree = parse(self.args.xmltv)
@@ -59,8 +63,15 @@ class MythTVChannelMaintenance(object):
     def channels(self):
         if self._channels is not None:
             return self._channels
+        from mythtvlib.query import MythTVQuerySet
+        self._channels = self.retrieve(MythTVQuerySet('ChannelInfo').all)
+        return self._channels
+
+    def retrieve(self, function):
+        """Answer the result of function, which retrieves data from the
+        backend, exiting if the backend can't be reached"""
         try:
-            self._channels = MythTVQuerySet('ChannelInfo').all()
+            return function()
         except (ConnectionRefusedError, URLError) as e:
             if self._backend.hostname == "localhost":
                 logger.info("hostname=='localhost' - has it been set in mythtv_cli_settings?")
@@ -71,7 +82,6 @@ class MythTVChannelMaintenance(object):
             logger.fatal(msg)
             logger.fatal("Error: {0}".format(e))
             exit(1)
-        return self._channels
 
     def require_xmltv(self):
         "Check that the XMLTV file name exists"
@@ -87,7 +97,13 @@ class MythTVChannelMaintenance(object):
 
     def execute(self):
         "Execute the requested command"
-        getattr(self, self.args.command)(self.args.params)
+        from mythtvlib.stats import format_stats
+        try:
+            getattr(self, self.args.command)(self.args.params)
+        finally:
+            if self.args.stats:
+                for line in format_stats(self._backend.stats()):
+                    print(line, file=sys.stderr)
         return
 
     def list(self, params):
@@ -107,6 +123,7 @@ class MythTVChannelMaintenance(object):
 
     def list_channels(self):
         "List the MythTV Channels"
+        from mythtvlib.query import MythTVQuerySet
         fmt_string = "{id:<5} {vs:<3} {callsign:<20} {channum:<7} {name:<20} {visible:<7} {xmltvid:<20} {icon:<20}"
         #import pdb; pdb.set_trace()
         print(fmt_string.format(
@@ -119,16 +136,21 @@ class MythTVChannelMaintenance(object):
                 xmltvid="XMLTVID",
                 icon="Icon URL"))
         print('-'*100)
-        for channel in self.channels:
+        # Only the listed fields are needed, so don't build the channels
+        query = MythTVQuerySet('ChannelInfo').values_list(
+            'ChanId', 'SourceId', 'CallSign', 'ChanNum', 'ChannelName',
+            'Visible', 'XMLTVID', 'IconURL')
+        for chan_id, source_id, callsign, channum, name, visible, xmltvid, icon \
+                in self.retrieve(query.all):
             print(fmt_string.format(
-                id=channel.ChanId,
-                vs=channel.SourceId,
-                callsign=channel.CallSign,
-                channum=channel.ChanNum,
-                name=channel.ChannelName,
-                visible=channel.Visible,
-                xmltvid=channel.XMLTVID or "",
-                icon=channel.IconURL or ""))
+                id=chan_id,
+                vs=source_id,
+                callsign=callsign,
+                channum=channum,
+                name=name,
+                visible=visible,
+                xmltvid=xmltvid or "",
+                icon=icon or ""))
         print("")
         return
 
@@ -153,6 +175,7 @@ class MythTVChannelMaintenance(object):
         appropriate XMLTVID."""
         if self._callsign_map is not None:
             return self._callsign_map
+        from mythtvlib.settings import settings
         if len(settings.XMLTV_CALLSIGNS) == 0:
             logger.warn("CallSign mapping is empty."
                 "  This normally should be configured in mythtv_cli_settings.py")
@@ -213,17 +236,32 @@ class MythTVChannelMaintenance(object):
             answer = input("Proceed [y/N]? ")
             proceed = answer.lower() in ["y", "yes"]
         if proceed:
-            for proposed in proposed_changes:
-                channel = proposed[0]
-                old_xmltvid = channel.XMLTVID
-                channel.XMLTVID = proposed[1]
-                channel.save()
-                logger.info("ChanID: {callsign} ({cid}): XMLTVID '{old}' -> '{new}'".format(
-                        callsign=channel.CallSign,
-                        cid=channel.ChanId,
-                        old=old_xmltvid,
-                        new=channel.XMLTVID))
-            logger.info("Updated {0} record(s)".format(len(proposed_changes)))
+            for channel, new_xmltvid in proposed_changes:
+                channel.XMLTVID = new_xmltvid
+            self.save_channels([x[0] for x in proposed_changes], 'XMLTVID',
+                               "ChanID: {callsign} ({cid}): XMLTVID '{old}' -> '{new}'")
+        return
+
+    def save_channels(self, channels, field_name, fmt_string):
+        """Save the changed channels concurrently, logging the change of
+        field_name of each channel with fmt_string, and a summary"""
+        from mythtvlib.models import ChannelInfo
+        from mythtvlib.utils import RECORD
+        report = ChannelInfo.bulk_save(channels)
+        if logger.isEnabledFor(RECORD):
+            for result in report.saved:
+                old, new = result.changes.get(field_name, (None, None))
+                logger.log(RECORD, fmt_string.format(
+                        callsign=result.record.CallSign,
+                        cid=result.record.ChanId,
+                        old=old,
+                        new=new))
+        for result in report.failed:
+            logger.error("Failed: {0}: {1}".format(result.record, result.error))
+        logger.info("Updated {0} record(s) in {1:.1f}s ({2} unchanged, {3} failed)".format(
+            len(report.saved), report.elapsed, len(report.unchanged), len(report.failed)))
+        if len(report.failed) > 0:
+            exit(1)
         return
  
     def icons(self, params):
@@ -313,8 +351,7 @@ icon_map = {
             if new_icon == channel.IconURL:
                 # No change, move on
                 continue
-            # Save the old Icon for user confirmation
-            channel._Old_IconURL = channel.IconURL
+            # The old Icon is kept by channel.changes() for user confirmation
             channel.IconURL = new_icon
             proposed_changes.append(channel)
         if len(proposed_changes) == 0:
@@ -334,25 +371,21 @@ icon_map = {
                 print(fmt_string.format(
                     id=channel.ChanId,
                     callsign=channel.CallSign,
-                    old_icon=channel._Old_IconURL,
+                    old_icon=channel.changes()['IconURL'][0],
                     new_icon=channel.IconURL))
             answer = input("Proceed [y/N]? ")
             proceed = answer.lower() in ["y", "yes"]
         if proceed:
-            for channel in proposed_changes:
-                channel.save()
-                logger.info("Channel: {callsign} ({cid}): IconURL '{old}' -> '{new}'".format(
-                        callsign=channel.CallSign,
-                        cid=channel.ChanId,
-                        old=channel._Old_IconURL,
-                        new=channel.IconURL))
-            logger.info("Updated {0} record(s)".format(len(proposed_changes)))
+            self.save_channels(proposed_changes, 'IconURL',
+                               "Channel: {callsign} ({cid}): IconURL '{old}' -> '{new}'")
         return
 
 
 
 def main():
-    logger.debug("Starting")
+    profiler = MythTVProfiler.from_argv(sys.argv)
+    if profiler is not None:
+        profiler.start()
     epilog = """
 {prog} has 4 basic use cases:
 
@@ -443,6 +476,20 @@ your channels, or that you need to re-scan for whatever reason.
     parser.add_argument('--create-config', action='store_true',
                         default=False,
                         help="Create a new configuration data file")
+    parser.add_argument('--refresh-wsdl', action='store_true',
+                        default=False,
+                        help="Retrieve the WSDL from the backend instead of the cache")
+    parser.add_argument('--stats', action='store_true',
+                        default=False,
+                        help="Print call latency and size statistics on exit")
+    parser.add_argument('--profile', metavar='MODE',
+                        nargs='?', const='cprofile', choices=PROFILE_MODES,
+                        help=("Profile the run, --profile cprofile (the default) "
+                              "or --profile tracemalloc, writing the profile and "
+                              "a summary on exit"))
+    parser.add_argument('--profile-output', metavar='FILE',
+                        default=None,
+                        help="Profile file name")
     parser.add_argument('-y', action='store_true',
                         dest='yes',
                         default=False,
@@ -456,8 +503,11 @@ your channels, or that you need to re-scan for whatever reason.
     parser.add_argument('--version',
                         action='version',
                         version='%(prog)s version '+ __VERSION__)
-    args = parser.parse_args()
+    args = parser.parse_args(MythTVProfiler.strip_args(sys.argv[1:]))
 
+    from mythtvlib.utils import configure_logging
+    configure_logging(loggers=[logger.name])
+    logger.debug("Starting")
     maint = MythTVChannelMaintenance(args)
     maint.execute()
     logger.debug("Done")
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
-#import logging
-import logging.config
+import logging
 import sys
 from os.path import isdir, abspath, dirname, realpath, join, basename, exists
 from urllib.error import URLError
@@ -14,13 +13,15 @@ proposed_path = abspath(join(mydir, '..'))
 if isdir(join(proposed_path, 'mythtvlib')) and (proposed_path not in sys.path):
     sys.path.append(proposed_path)
 
-from mythtvlib import __VERSION__, config_file_name
-from mythtvlib.backend import MythTVBackend
-from mythtvlib.query import MythTVQuerySet
+# main() starts profiling before importing the rest of mythtvlib, see --profile
+from mythtvlib.profiling import PROFILE_MODES, MythTVProfiler
 
-from mythtvlib.settings import settings
+# Only the lightweight modules are imported here, so that --help, --version
+# and argument errors don't pay for suds, lxml, the models and the settings.
+# The rest of mythtvlib is imported by the commands that need it, and logging
+# is configured once the arguments have been parsed.
+from mythtvlib import SERVICE_NAMES, __VERSION__, config_file_name
 
-logging.config.dictConfig(settings.LOGGING)
 logger = logging.getLogger(basename(sys.argv[0]))
 
 
@@ -31,6 +32,8 @@ class MythTVCLIException(Exception):
 
 def update(args):
     # update <class name> <filter field> <filter regex> <update field> <update value>
+    from mythtvlib.query import MythTVQuerySet
+    from mythtvlib.utils import RECORD
     if len(args.params) != 5:
         msg = "Expect 5 parameters, got {0}".format(len(args.params))
         logger.fatal(msg)
@@ -70,22 +73,58 @@ def update(args):
             logger.info("User aborted update")
             return
     fmt_string = "Updated: {obj} {field}: '{old}' => '{new}'"
-    for rec in update_records:
-        old_value = getattr(rec, update_field)
-        setattr(rec, update_field, update_value)
-        rec.save()
-        logger.info(fmt_string.format(
-            obj=str(rec),
-            field=update_field,
-            old=old_value,
-            new=update_value))
-    logger.info("Updated {0} record(s)".format(len(update_records)))
+    # Records already holding the value aren't saved
+    report = update_class.update(**{update_field : update_value})
+    if logger.isEnabledFor(RECORD):
+        for result in report.saved:
+            logger.log(RECORD, fmt_string.format(
+                obj=str(result.record),
+                field=update_field,
+                old=result.changes[update_field][0],
+                new=update_value))
+    for result in report.failed:
+        logger.error("Failed: {0}: {1}".format(result.record, result.error))
+    logger.info("Updated {0} record(s) in {1:.1f}s ({2} unchanged, {3} failed)".format(
+        len(report.saved), report.elapsed, len(report.unchanged), len(report.failed)))
+    if len(report.failed) > 0:
+        exit(1)
+    return
+
+
+
+def batch(args, backend):
+    "Run the operations in the batch file (or stdin), see mythtvlib.batch"
+    from mythtvlib.batch import MythTVBatch, read_batch
+    from mythtvlib.settings import settings
+    if len(args.params) != 1:
+        msg = "Expect 1 parameter, got {0}".format(len(args.params))
+        logger.fatal(msg)
+        exit(1)
+    if args.params[0] == '-':
+        items = read_batch(sys.stdin)
+    else:
+        try:
+            with open(args.params[0]) as fp:
+                items = read_batch(fp)
+        except OSError as e:
+            logger.fatal("Unable to read batch: {0}".format(e))
+            exit(1)
+    workers = args.workers
+    if workers is None:
+        workers = int(getattr(settings, "BATCH_WORKERS", 4))
+    runner = MythTVBatch(backend, workers=workers)
+    failed = runner.run(items, sys.stdout)
+    for line in runner.summary(items):
+        print(line, file=sys.stderr)
+    if failed > 0:
+        exit(1)
     return
 
 
 
 def gen_config(args):
     "Generate a config file with hostname and port populated"
+    from mythtvlib.query import MythTVQuerySet
     if exists(config_file_name):
         msg = ("mythtv_cli_settings.py already exists.  "
                "Please rename or remove this file before generating a "
@@ -170,16 +209,63 @@ PORT={port}
 
 
 
+def run_command(args, backend):
+    "Run the requested command"
+    from mythtvlib.services import MythTVServiceException
+    if args.command == 'dump':
+        try:
+            service = backend.service_api(args.params[0])
+            # TODO: MythTVServiceAPI can return the help and 
+            #       process the command like any other
+            if args.params[1] == 'help':
+                service.print_help(show_post=args.post)
+            else:
+                resp = service.execute_args(args.params[1:])
+                print(resp)
+        except (ConnectionRefusedError, URLError) as e:
+            if backend.hostname == "localhost":
+                logger.info("hostname=='localhost' - has it been set in mythtv_cli_settings?")
+            msg = ("Unable to get backend service.  Please check "
+                   "hostname={host}, port={port} is correct and the backend "
+                   "is up").format(
+                        host=backend.hostname, port=backend.port)
+            logger.fatal(msg)
+            logger.fatal("Error: {0}".format(e))
+            exit(1)
+        except MythTVServiceException as e:
+            logger.fatal(str(e))
+            exit(1)
+    elif args.command == 'batch':
+        batch(args, backend)
+    elif args.command == 'update':
+        update(args)
+    elif args.command == 'generate':
+        if args.params[0] != 'config':
+            msg = "Unknown generation command: {0}".format(args.params[0])
+        gen_config(args)
+    else:
+        # argparse should catch this before we get here
+        raise MythTVCLIException("Unknown command: {0}".format(args.command))
+    return
+
+
+
 def main():
-    logger.debug("Starting")
-    services_string = ", ".join(MythTVBackend.services())
+    profiler = MythTVProfiler.from_argv(sys.argv)
+    if profiler is not None:
+        profiler.start()
+    services_string = ", ".join(SERVICE_NAMES)
     epilog = """
-{prog} has 3 basic use cases:
+{prog} has 4 basic use cases:
 
     {prog} generate config
         Generate a basic {config_fn} file
     {prog} dump <service> <operation> <key...>
         Print the results of the requested service/operation
+    {prog} batch <file|->
+        Run the "<service> <operation> <key...>" lines in the file
+        (or stdin) concurrently, printing each result prefixed by its
+        line number, and a summary to stderr
     {prog} update <class name> <filter field> <filter regex> <update field> <update value>
         Update the records matching the supplied regular expression in the
         requested class.
@@ -211,6 +297,23 @@ MythTV Web Services Documentation: https://www.mythtv.org/wiki/Services_API
     parser.add_argument('--server-port', dest='port',
                         default=None,
                         help="MythTV Backend services port")
+    parser.add_argument('--refresh-wsdl', action='store_true',
+                        default=False,
+                        help="Retrieve the WSDL from the backend instead of the cache")
+    parser.add_argument('--workers', type=int,
+                        default=None,
+                        help="Number of operations run concurrently by batch")
+    parser.add_argument('--stats', action='store_true',
+                        default=False,
+                        help="Print call latency and size statistics on exit")
+    parser.add_argument('--profile', metavar='MODE',
+                        nargs='?', const='cprofile', choices=PROFILE_MODES,
+                        help=("Profile the run, --profile cprofile (the default) "
+                              "or --profile tracemalloc, writing the profile and "
+                              "a summary on exit"))
+    parser.add_argument('--profile-output', metavar='FILE',
+                        default=None,
+                        help="Profile file name")
     parser.add_argument('-y', action='store_true',
                         dest='yes',
                         default=False,
@@ -218,43 +321,28 @@ MythTV Web Services Documentation: https://www.mythtv.org/wiki/Services_API
     parser.add_argument('--version',
                         action='version',version='%(prog)s version '+ __VERSION__)
     parser.add_argument('command',
-                        choices=['dump', 'update', 'generate'],
+                        choices=['dump', 'batch', 'update', 'generate'],
                         help="Maintenance command, see below")
     parser.add_argument('params',
                         nargs='+',
                         help="Command parameter(s)")
-    args = parser.parse_args()
+    args = parser.parse_args(MythTVProfiler.strip_args(sys.argv[1:]))
 
+    from mythtvlib.backend import MythTVBackend
+    from mythtvlib.stats import format_stats
+    from mythtvlib.utils import configure_logging
+    configure_logging(loggers=[logger.name])
+    logger.debug("Starting")
     backend = MythTVBackend.default(hostname=args.hostname, port=args.port)
-    if args.command == 'dump':
-        try:
-            service = backend.service_api(args.params[0])
-        except (ConnectionRefusedError, URLError) as e:
-            if backend.hostname == "localhost":
-                logger.info("hostname=='localhost' - has it been set in mythtv_cli_settings?")
-            msg = ("Unable to get backend service.  Please check "
-                   "hostname={host}, port={port} is correct and the backend "
-                   "is up").format(
-                        host=backend.hostname, port=backend.port)
-            logger.fatal(msg)
-            logger.fatal("Error: {0}".format(e))
-            exit(1)
-        # TODO: MythTVServiceAPI can return the help and 
-        #       process the command like any other
-        if args.params[1] == 'help':
-            service.print_help(show_post=args.post)
-        else:
-            resp = service.execute_args(args.params[1:])
-            print(resp)
-    elif args.command == 'update':
-        update(args)
-    elif args.command == 'generate':
-        if args.params[0] != 'config':
-            msg = "Unknown generation command: {0}".format(args.params[0])
-        gen_config(args)
-    else:
-        # argparse should catch this before we get here
-        raise MythTVCLIException("Unknown command: {0}".format(args.command))
+    backend.refresh_wsdl = args.refresh_wsdl
+    if args.stats:
+        backend.metrics.enabled = True
+    try:
+        run_command(args, backend)
+    finally:
+        if args.stats:
+            for line in format_stats(backend.stats()):
+                print(line, file=sys.stderr)
     logger.debug("Done")
     return
 
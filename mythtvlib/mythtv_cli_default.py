@@ -5,6 +5,10 @@
 # You should create your own muthtv_cli_settings.py and place all custom
 # configuration information there.
 #
+
+# Bulk updates log each updated record at the RECORD level (between DEBUG
+# and INFO) and a summary at INFO.  Set the 'console' level to 'INFO' to
+# only see the summary.  The console shows RECORD messages as INFO.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': True,
@@ -13,6 +17,7 @@ LOGGING = {
             'format': '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'
         },
         'simple': {
+            'class': 'mythtvlib.utils.MythTVConsoleFormatter',
             'format': '%(levelname)s: %(message)s'
         },
     },
@@ -28,7 +33,7 @@ LOGGING = {
             'backupCount': 5
             },
         'console':{
-            'level':'INFO',
+            'level':'RECORD',
             'class':'logging.StreamHandler',
             'formatter': 'simple'
         },
@@ -46,6 +51,11 @@ LOGGING = {
     }
 }
 
+# Write the log records from background threads (QueueHandler /
+# QueueListener), so that file I/O and rotation don't slow down bulk
+# operations
+LOGGING_QUEUE = False
+
 # See the mythtv_clie_settings_example for a description of XMLTV_CALLSIGNS
 XMLTV_CALLSIGNS = {}
 
@@ -55,4 +65,56 @@ PORT=6544
 
 # Default tmp directories
 TMP_DIRS = ['/tmp/']
-TMP_DIR_NAME = 'MythTV_CLI'
\ No newline at end of file
+TMP_DIR_NAME = 'MythTV_CLI'
+
+# Number of threads used to retrieve the schema imported by the WSDL
+WSDL_FETCH_WORKERS = 8
+
+# Seconds the cached WSDL is used before checking the backend version
+WSDL_CACHE_TTL = 24*60*60
+
+# Store the suds client model with the cached WSDL, avoiding re-parsing the
+# WSDL on every run
+SUDS_CLIENT_CACHE = True
+
+# Transport used for GET operations: 'soap' (suds), 'json' or 'xml'.
+# 'json' and 'xml' use plain HTTP requests, avoiding the suds overhead,
+# and fall back to suds if the response can't be decoded.
+SERVICE_TRANSPORT = 'soap'
+# Per backend transports, keyed by "hostname:port" or hostname, e.g.
+#   SERVICE_TRANSPORTS = {'mythbackend:6544': 'json'}
+SERVICE_TRANSPORTS = {}
+
+# Maximum number of simultaneous (keep-alive) connections to the backend,
+# and the request timeout in seconds
+HTTP_POOL_SIZE = 4
+HTTP_TIMEOUT = 90
+
+# GET responses are cached for RESPONSE_CACHE_TTL seconds (0 disables the
+# cache), overridden per operation by RESPONSE_CACHE_TTLS, keyed by
+# "Service.Operation" or "Operation", e.g.
+#   RESPONSE_CACHE_TTLS = {'GetVideoSourceList': 600, 'Guide.GetProgramGuide': 0}
+# The responses kept total at most RESPONSE_CACHE_BYTES as received from the
+# backend, least recently used first out.  RESPONSE_CACHE_PERSIST keeps the
+# cache between runs.
+RESPONSE_CACHE_TTL = 60
+RESPONSE_CACHE_TTLS = {}
+RESPONSE_CACHE_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_PERSIST = False
+
+# Number of operations mythtv_cli batch runs concurrently.  Workers beyond
+# HTTP_POOL_SIZE wait for a connection to the backend.
+BATCH_WORKERS = 4
+
+# Number of records MythTVClass.bulk_save() (and so the update commands)
+# saves concurrently, and the maximum number of saves started per second
+# (0 is unlimited)
+SAVE_WORKERS = 4
+SAVE_RATE = 0
+
+# Collect per operation latency and size statistics, see
+# MythTVBackend.stats() and the --stats option
+COLLECT_STATS = False
+
+# Number of functions or allocation sites summarised by --profile
+PROFILE_TOP = 25
@@ -1,55 +1,162 @@
 import re
+import time
+from itertools import count
 
 from mythtvlib.backend import MythTVBackend
+from mythtvlib.services import MythTVServiceObject, plain_value
 
 class MythTVObjectException(Exception):
     pass
 
+# Numbers the changes to the attributes of records retrieved from the
+# backend, see MythTVClass.modification
+_modifications = count(1)
 
+# Model class name -> model class, see MythTVClass.classname()
+_registry = {}
 
-class MythTVClass(object):
+# Set an attribute, bypassing MythTVClass.__setattr__
+_set_slot = object.__setattr__
+
+
+
+class MythTVModelMeta(object):
+    """The definition of a model class, with the lookup tables used for
+    every record computed once"""
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.name = definition['name']
+        self.service = definition.get('service')
+        self.keys = tuple(definition['keys'])
+        self.key_set = frozenset(self.keys)
+        self.update_set = frozenset(definition.get('update_attributes', ()))
+        # The keyword arguments accepted by MythTVClass.__init__()
+        self.init_set = self.key_set.union(['_backend', '_safe_mode'])
+        self.primary_key = tuple(definition.get('primary_key', ()))
+        self.post_operation = definition.get('post_operation')
+        # (attribute, post parameter) pairs
+        self.post_mapping = tuple(definition.get('post_mapping', {}).items())
+        self.field_types = definition.get('field_types', {})
+        return
+
+
+
+class MythTVClassType(type):
+    """Metaclass of the models: registers each model class and sets its
+    _meta, the MythTVModelMeta of its definition, when it is created.
+    Abstract classes, whose definition() raises MythTVObjectException,
+    have no _meta and aren't registered.
+
+    The records store their attributes in __slots__, the keys of the
+    definition, rather than a per-record __dict__."""
+
+    def __new__(mcs, name, bases, namespace):
+        if '__slots__' not in namespace:
+            namespace = dict(namespace)
+            namespace['__slots__'] = mcs.slots(name, bases, namespace)
+        return type.__new__(mcs, name, bases, namespace)
+
+    @classmethod
+    def slots(mcs, name, bases, namespace):
+        """Answer the __slots__ of a new model class: the keys of the
+        definition() in its namespace that aren't slots of its bases.
+
+        The class doesn't exist yet, so definition() is called with the
+        first base as cls, and shouldn't depend on cls.  A class that
+        inherits its definition inherits its slots."""
+        definition = namespace.get('definition')
+        if definition is None:
+            return ()
+        try:
+            keys = definition.__func__(bases[0])['keys']
+        except MythTVObjectException:
+            return ()
+        inherited = set()
+        for base in bases:
+            for klass in base.__mro__:
+                inherited.update(getattr(klass, '__slots__', ()))
+        return tuple([x for x in keys if x not in inherited])
+
+    def __init__(cls, name, bases, namespace):
+        type.__init__(cls, name, bases, namespace)
+        try:
+            definition = cls.definition()
+        except MythTVObjectException:
+            cls._meta = None
+            return
+        cls._meta = MythTVModelMeta(definition)
+        _registry[name] = cls
+        return
+
+
+
+class MythTVClass(object, metaclass=MythTVClassType):
     """Abstract superclass to provide an object representation of a
-    MythTV backend web service object"""
+    MythTV backend web service object.
+
+    Records only have the keys of their definition (and the private
+    attributes below), setting any other attribute raises AttributeError.
+    Copies share the receivers backend, pickled (and deep copied) records
+    don't include the backend, and are restored with
+    MythTVBackend.default()."""
+
+    # The number of the latest change to an attribute of a record retrieved
+    # from the backend, used to invalidate the MythTVQuerySet indexes
+    modification = 0
+
+    # _changes is field_name -> value when loaded (or last saved) of the
+    # attributes changed since, see changes()
+    __slots__ = ('_backend', '_safe_mode', '_changes')
 
     def __init__(self, *args, **kwargs):
-        # __setattr__ checks the value of _safe_mode and _definition,
-        # to avoid a chicken-and-egg situation, bypass __setattr__
-        self.__dict__['_safe_mode'] = False
-        self.__dict__['_definition'] = None
-        self._backend = MythTVBackend.default()
-        all_attributes = []
-        all_attributes.extend(self.__class__.keys())
-        all_attributes.extend(['_backend', '_safe_mode', '_definition'])
-        for k, v in kwargs.items():
-            if k in all_attributes:
-                setattr(self, k, v)
-            else:
+        # __setattr__ checks the value of _safe_mode, to avoid a
+        # chicken-and-egg situation, and as the receiver isn't in safe
+        # mode yet, bypass __setattr__
+        _set_slot(self, '_safe_mode', False)
+        _set_slot(self, '_changes', {})
+        init_set = self._meta.init_set
+        for k in kwargs:
+            if k not in init_set:
                 raise TypeError('{0} is an invalid argument for {1}'.format(
-                            k, self._class_definition['name']))
+                            k, self._meta.name))
+        if '_backend' not in kwargs:
+            _set_slot(self, '_backend', MythTVBackend.default())
+        for k, v in kwargs.items():
+            _set_slot(self, k, v)
         return
 
     @classmethod
     def from_element(cls, element, backend=None):
-        attributes = {}
-        # Transfer all attributes from the element,
-        # which is assumed to be a suds.sudsobject.Object
-        for k, v in element:
-            attributes[k] = v
-        new_object = cls(**attributes)
+        metrics = (backend or MythTVBackend.default()).metrics
+        if not metrics.enabled:
+            return cls._from_element(element, backend)
+        start = time.perf_counter()
+        new_object = cls._from_element(element, backend)
+        metrics.record_model(cls.__name__, time.perf_counter() - start)
+        return new_object
+
+    @classmethod
+    def _from_element(cls, element, backend):
+        # Transfer all attributes from the element, which is either a
+        # MythTVServiceObject or a suds.sudsobject.Object, whose values
+        # are converted so the record doesn't keep the suds objects
+        if type(element) is MythTVServiceObject:
+            attributes = dict(element)
+        else:
+            attributes = {k: plain_value(v) for k, v in element}
         if backend is not None:
-            new_object._backend = backend
+            attributes['_backend'] = backend
+        new_object = cls(**attributes)
         new_object._safe_mode = True
         return new_object
 
     @classmethod
     def classname(cls, name):
         "Answer the appropriate subclass"
-        subclasses = cls.__subclasses__()
-        subclass = None
-        for cl in subclasses:
-            if name == cl.__name__:
-                subclass = cl
-                break
+        subclass = _registry.get(name)
+        if subclass is None or not issubclass(subclass, cls):
+            return None
         return subclass
 
     @classmethod
@@ -57,19 +164,86 @@ class MythTVClass(object):
         "Answer the receivers definition"
         raise MythTVObjectException("Subclass responsibility")
 
+    @classmethod
+    def all(cls, backend=None):
+        "Answer all the receivers records fetched from the backend"
+        records = []
+        for key in cls.partitions(backend=backend):
+            records.extend(cls.partition(key, backend=backend))
+        return records
+
+    @classmethod
+    def partitions(cls, backend=None):
+        """Answer the keys of the independently retrievable subsets of the
+        receivers records, see partition().
+        The default is a single partition."""
+        return [None]
+
+    @classmethod
+    def partition(cls, key, backend=None):
+        "Answer the receivers records in the partition identified by key"
+        raise MythTVObjectException("Subclass responsibility")
+
+    @classmethod
+    def partition_elements(cls, key, backend=None):
+        """Answer an iterable of the service response elements of the
+        partition identified by key, from which from_element() builds the
+        records, or None if the receiver builds its records in some other
+        way (see partition()).
+        The default is None."""
+        return None
+
+    @classmethod
+    def pushdown(cls, exact, backend=None):
+        """Answer an iterable of the service response elements (see
+        partition_elements()) of the receivers records that may match
+        exact, a dictionary of field name -> value (a string for regex
+        filters), retrieving only those records, or None if the fields
+        can't be selected on the backend.
+        The caller filters the answered elements, and builds the records
+        it needs with from_element().
+        The default can't select any fields."""
+        return None
+
     @classmethod
     def keys(cls):
         "Answer the attribute names of the receiver"
-        return cls.definition()['keys']
+        return cls._meta.keys
+
+    def _slot_names(self):
+        "Answer the names of the receivers slots"
+        names = []
+        for klass in type(self).__mro__:
+            names.extend(klass.__dict__.get('__slots__', ()))
+        return names
+
+    def __getstate__(self):
+        """Answer the receivers attributes, without the backend, which
+        holds connections and locks"""
+        return {k: getattr(self, k) for k in self._slot_names()
+                if k != '_backend' and hasattr(self, k)}
+
+    def __setstate__(self, state):
+        # Bypass __setattr__, as when initialised
+        _set_slot(self, '_backend', MythTVBackend.default())
+        for k, v in state.items():
+            _set_slot(self, k, v)
+        return
+
+    def __copy__(self):
+        new_object = self.__class__.__new__(self.__class__)
+        for k, v in self.__getstate__().items():
+            _set_slot(new_object, k, v)
+        _set_slot(new_object, '_backend', self._backend)
+        _set_slot(new_object, '_changes', dict(self._changes))
+        return new_object
 
     def _service_api(self):
         "Answer the receivers service api"
-        return self._backend.service_api(self._class_definition()['service'])
+        return self._backend.service_api(self._meta.service)
 
     def _class_definition(self):
-        if self._definition is None:
-            self.__dict__['_definition'] = self.__class__.definition()
-        return self._definition
+        return self._meta.definition
 
     def __setattr__(self, name, value):
         """Ensure that we don't update an attribute that is not marked user
@@ -77,30 +251,65 @@ class MythTVClass(object):
         
         TODO: Implement a non-safe mode that allows all attributes to be
         updated"""
-        if self._safe_mode:
-            definition = self._class_definition()
-            attributes = definition['keys']
-            update_attributes = definition['update_attributes']
-            if (name in attributes) and (name not in update_attributes):
-                raise MythTVObjectException(("Attempted to update read-only "
-                                              "attribute: {0}").format(name))
-        self.__dict__[name] = value
+        if getattr(self, '_safe_mode', False):
+            meta = self._meta
+            if name in meta.key_set:
+                if name not in meta.update_set:
+                    raise MythTVObjectException(("Attempted to update read-only "
+                                                  "attribute: {0}").format(name))
+                self._track_change(name, value)
+            MythTVClass.modification = next(_modifications)
+        _set_slot(self, name, value)
         return
 
+    def _track_change(self, name, value):
+        "Record the change of attribute name to value, see changes()"
+        changes = self._changes
+        if name in changes:
+            if changes[name] == value:
+                # Changed back
+                del changes[name]
+        else:
+            old_value = getattr(self, name, None)
+            if old_value != value:
+                changes[name] = old_value
+        return
+
+    def changes(self):
+        """Answer a dictionary of field_name -> (old value, new value) of
+        the attributes changed since the receiver was retrieved from the
+        backend or last saved"""
+        return {k: (v, getattr(self, k, None)) for k, v in self._changes.items()}
+
+    def needs_save(self):
+        """Answer whether the receiver has changes to save.
+        Records not retrieved from the backend always need saving."""
+        return not self._safe_mode or len(self._changes) > 0
+
     def save(self):
         """Save the receiver on the backend.
         The receiver must have all post attributes as we cannot assume
         reasonable defaults (yet)"""
         kwargs = {}
-        for obj_attr, upd_attr in self._class_definition()['post_mapping'].items():
+        for obj_attr, upd_attr in self._meta.post_mapping:
             kwargs[upd_attr] = getattr(self, obj_attr)
-        getattr(self._service_api().service, self._class_definition()['post_operation'])(**kwargs)
+        self._service_api().call(self._meta.post_operation, **kwargs)
+        self._changes.clear()
         return
 
+    @classmethod
+    def bulk_save(cls, objs, workers=None, rate=None):
+        """Save the records in objs that need saving (see needs_save()),
+        using up to workers concurrent saves, starting at most rate saves
+        per second (settings SAVE_WORKERS and SAVE_RATE by default).
+        Answer the MythTVSaveReport of each record's outcome."""
+        from mythtvlib.bulk import MythTVBulkSave
+        return MythTVBulkSave(workers=workers, rate=rate).run(objs)
+
     def __repr__(self):
-        definition = self.__class__.definition()
-        keys = ["{0}={1}".format(k, getattr(self, k)) for k in definition['primary_key']]
+        meta = self._meta
+        keys = ["{0}={1}".format(k, getattr(self, k)) for k in meta.primary_key]
         key_string = ", ".join(keys)
         return "{name}({pkey})".format(
-                name=definition['name'], 
+                name=meta.name, 
                 pkey=key_string)
@@ -0,0 +1,168 @@
+"""
+Module: profiling.py
+
+The --profile [cprofile|tracemalloc] option of mythtv_cli and
+mythtv_chanmaint.
+
+The profiler is started from the command line arguments at the start of
+the script's main(), before the arguments are parsed and the rest of
+mythtvlib (which the scripts import when needed) is imported, so startup
+imports, WSDL handling, querying and saving are all covered.  Importing
+the script modules doesn't start it.  It is stopped when the
+process exits (including exit() calls) and writes:
+
+- cprofile: a pstats file (load with pstats.Stats or snakeviz) and the
+  top functions by cumulative time,
+- tracemalloc: a snapshot (load with tracemalloc.Snapshot.load) and the
+  top allocation sites by size.
+
+The summary is written to stderr.  The file name may be set with
+--profile-output FILE, by default it is <prog>-<time>.prof or
+<prog>-<time>.tracemalloc in the current directory.
+
+This module only imports from the standard library when imported, so that
+it doesn't hide the import time of the rest of the package.
+"""
+
+import atexit
+import sys
+import time
+from os.path import basename, splitext
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+PROFILE_SUFFIXES = {'cprofile': '.prof', 'tracemalloc': '.tracemalloc'}
+# Default number of functions / allocation sites summarised
+PROFILE_TOP = 25
+
+
+
+class MythTVProfilerException(Exception):
+    pass
+
+
+
+class MythTVProfiler(object):
+    """Profile the process in either cprofile or tracemalloc mode"""
+
+    def __init__(self, mode, output, top=None):
+        if mode not in PROFILE_MODES:
+            raise MythTVProfilerException("Unknown profile mode: {0}".format(mode))
+        self.mode = mode
+        self.output = output
+        self.top = top
+        self._profile = None
+        self._started = False
+        return
+
+    @classmethod
+    def from_argv(cls, argv):
+        """Answer a profiler for the --profile and --profile-output options
+        in argv, or None if profiling wasn't requested"""
+        mode, output, args = cls.parse_args(argv[1:])
+        if mode is None:
+            return None
+        if mode not in PROFILE_MODES:
+            # Exit as argparse would, the arguments haven't been parsed yet
+            sys.exit("{prog}: error: --profile: invalid mode '{mode}' (choose from {modes})".format(
+                prog=basename(argv[0]), mode=mode, modes=", ".join(PROFILE_MODES)))
+        if output is None:
+            output = "{prog}-{time}{suffix}".format(
+                prog=splitext(basename(argv[0]))[0],
+                time=time.strftime("%Y%m%d-%H%M%S"),
+                suffix=PROFILE_SUFFIXES.get(mode, ''))
+        return cls(mode, output)
+
+    @staticmethod
+    def parse_args(args):
+        """Answer the profile mode, output file name and the remaining
+        arguments in args.
+
+        The mode may be given as --profile=MODE or --profile MODE, the
+        argument following a bare --profile is only taken as the mode if
+        it is one of PROFILE_MODES, so that it may be followed by the
+        command.  The file name may be given as --profile-output=FILE or
+        --profile-output FILE."""
+        mode = None
+        output = None
+        remaining = []
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg == '--profile':
+                mode = 'cprofile'
+                if i + 1 < len(args) and args[i + 1] in PROFILE_MODES:
+                    i += 1
+                    mode = args[i]
+            elif arg.startswith('--profile='):
+                mode = arg.split('=', 1)[1]
+            elif arg == '--profile-output' and i + 1 < len(args):
+                i += 1
+                output = args[i]
+            elif arg.startswith('--profile-output='):
+                output = arg.split('=', 1)[1]
+            else:
+                remaining.append(arg)
+            i += 1
+        return mode, output, remaining
+
+    @classmethod
+    def strip_args(cls, args):
+        """Answer args without the profile options,
+        which have been handled by from_argv()"""
+        return cls.parse_args(args)[2]
+
+    def start(self):
+        "Start profiling, and stop and report when the process exits"
+        if self.mode == 'cprofile':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start(25)
+        self._started = True
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, stream=None):
+        "Stop profiling, write the profile and the summary"
+        if not self._started:
+            return
+        self._started = False
+        if stream is None:
+            stream = sys.stderr
+        top = self.top
+        if top is None:
+            from mythtvlib.settings import settings
+            top = int(getattr(settings, "PROFILE_TOP", PROFILE_TOP))
+        if self.mode == 'cprofile':
+            self._stop_cprofile(stream, top)
+        else:
+            self._stop_tracemalloc(stream, top)
+        return
+
+    def _stop_cprofile(self, stream, top):
+        import pstats
+        self._profile.disable()
+        self._profile.dump_stats(self.output)
+        stream.write("Profile written to {0}, top {1} functions:\n".format(
+            self.output, top))
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(top)
+        return
+
+    def _stop_tracemalloc(self, stream, top):
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot.dump(self.output)
+        stream.write(("Allocation snapshot written to {0}, current {1:.1f} KiB, "
+                      "peak {2:.1f} KiB, top {3} allocation sites:\n").format(
+            self.output, current / 1024, peak / 1024, top))
+        for statistic in snapshot.statistics('lineno')[:top]:
+            frame = statistic.traceback[0]
+            stream.write("{size:>10.1f} KiB {count:>8} blocks  {fname}:{line}\n".format(
+                size=statistic.size / 1024, count=statistic.count,
+                fname=frame.filename, line=frame.lineno))
+        return
@@ -2,64 +2,674 @@
 MythTVQuerySet is the general search mechanism for querying the MythTV Backend
 """
 import re
+from collections import OrderedDict
 from copy import copy
+from itertools import islice
+from operator import attrgetter
 
 from mythtvlib.models import MythTVClass
+from mythtvlib.services import MythTVServiceObject
+
+# Characters with a special meaning in a regular expression
+REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
 
 class MythTVQueryException(Exception):
     pass
 
+class MythTVObjectDoesNotExist(MythTVQueryException):
+    pass
+
+class MythTVMultipleObjectsReturned(MythTVQueryException):
+    pass
+
+
+
+def exact_literal(pattern):
+    """Answer the value matched by an equality pattern (^literal$),
+    or None if the pattern isn't one"""
+    literal = pattern[1:-1]
+    if (pattern.startswith('^') and pattern.endswith('$') and len(pattern) > 1
+            and not REGEX_SPECIAL.intersection(literal)):
+        return literal
+    return None
+
+
+def exact_values(clauses):
+    """Answer a dictionary of field_name -> value of the filter conditions
+    that only match a single value, see MythTVClass.pushdown()"""
+    exact = {}
+    for negate, conditions in clauses:
+        if negate:
+            continue
+        for field_name, lookup, value in conditions:
+            if lookup == 'exact':
+                literal = value
+            elif lookup == 'regex':
+                literal = exact_literal(value.pattern)
+            else:
+                literal = None
+            if literal is not None and field_name not in exact:
+                exact[field_name] = literal
+    return exact
+
+
+def filter_matcher(pattern, regex):
+    """Answer (cost, matcher) for the filter pattern: matcher(value) answers
+    whether regex.search(value) would match, avoiding the regex when the
+    pattern is a literal, and cost orders the matchers cheapest first"""
+    if not REGEX_SPECIAL.intersection(pattern):
+        return 0, lambda value: pattern in value
+    literal = pattern[1:]
+    if pattern.startswith('^') and not REGEX_SPECIAL.intersection(literal):
+        return 1, lambda value: value.startswith(literal)
+    literal = exact_literal(pattern)
+    if literal is not None:
+        # $ also matches before a trailing newline
+        return 0, lambda value: value == literal or value == literal + "\n"
+    search = regex.search
+    return 2 + len(pattern), lambda value: search(value) is not None
+
+
+def coerce_value(field_type, value):
+    """Answer value converted to field_type, a field type from the model
+    definition's 'field_types' (None for fields compared as strings)"""
+    if field_type is None or field_type is str:
+        return str(value)
+    if field_type is bool and isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    try:
+        return field_type(value)
+    except (TypeError, ValueError):
+        raise MythTVQueryException("Expected {0} value, got {1!r}".format(
+            field_type.__name__, value))
+
+
+def prepare_lookup(field_type, lookup, value):
+    "Answer the value of the lookup converted for matching, see lookup_matcher()"
+    if lookup == 'regex':
+        return re.compile(value)
+    if lookup in ('iexact', 'startswith', 'contains'):
+        value = str(value)
+        return value.lower() if lookup == 'iexact' else value
+    if lookup == 'in':
+        return frozenset([coerce_value(field_type, x) for x in value])
+    if lookup == 'range':
+        low, high = value
+        return coerce_value(field_type, low), coerce_value(field_type, high)
+    if lookup == 'isnull':
+        return bool(value)
+    return coerce_value(field_type, value)
+
+
+def compare(operator):
+    "Answer a matcher factory for the comparison, which never matches None"
+    def factory(value):
+        def matcher(field_value):
+            if field_value is None:
+                return False
+            try:
+                return operator(field_value, value)
+            except TypeError:
+                return False
+        return matcher
+    return factory
+
+# The lookup matchers: lookup -> (cost, kind, matcher factory)
+# kind is the form of the field value passed to the matcher:
+#   raw    - the attribute value
+#   native - the attribute value for fields with a type, otherwise
+#            the attribute value as a string
+#   string - the attribute value as a string
+LOOKUPS = {
+    'exact'      : (0, 'native', lambda value: lambda x: x == value),
+    'iexact'     : (1, 'string', lambda value: lambda x: x.lower() == value),
+    'in'         : (0, 'native', lambda value: lambda x: x in value),
+    'startswith' : (1, 'string', lambda value: lambda x: x.startswith(value)),
+    'contains'   : (1, 'string', lambda value: lambda x: value in x),
+    'gt'         : (1, 'native', compare(lambda x, value: x > value)),
+    'gte'        : (1, 'native', compare(lambda x, value: x >= value)),
+    'lt'         : (1, 'native', compare(lambda x, value: x < value)),
+    'lte'        : (1, 'native', compare(lambda x, value: x <= value)),
+    'range'      : (1, 'native', compare(lambda x, value: value[0] <= x <= value[1])),
+    # MythTV answers empty strings for missing values
+    'isnull'     : (0, 'raw', lambda value: lambda x: (x is None or x == '') == value),
+    'regex'      : (None, 'string', None),
+}
+
+
+def lookup_matcher(lookup, value):
+    """Answer (cost, kind, matcher) for the lookup and its prepared value,
+    matcher(field_value) answers whether the field value matches"""
+    if lookup == 'regex':
+        cost, matcher = filter_matcher(value.pattern, value)
+        return cost, 'string', matcher
+    cost, kind, factory = LOOKUPS[lookup]
+    return cost, kind, factory(value)
+
+
+def string_matcher(matcher):
+    "Answer a matcher applying matcher to the value as a string"
+    return lambda value: matcher(str(value))
+
+
+def conjunction(conditions, field_types):
+    """Answer (cost, predicate) where predicate answers whether a record
+    matches all the (field_name, lookup, value) conditions.
+
+    Each field is only read, and usually converted to a string, once per
+    record, the fields with the cheapest checks are tested first and the
+    first check that fails rejects the record."""
+    fields = OrderedDict()
+    for field_name, lookup, value in conditions:
+        fields.setdefault(field_name, []).append(lookup_matcher(lookup, value))
+    checks = []
+    for field_name, matchers in fields.items():
+        matchers.sort(key=lambda x: x[0])
+        typed = field_types.get(field_name) is not None
+        strings = [kind == 'string' or (kind == 'native' and not typed)
+                   for cost, kind, matcher in matchers]
+        if all(strings):
+            to_string = True
+            field_matchers = tuple([x[2] for x in matchers])
+        else:
+            # Convert the value for the string matchers only
+            to_string = False
+            field_matchers = tuple([string_matcher(x[2]) if string else x[2]
+                                    for x, string in zip(matchers, strings)])
+        checks.append((sum([x[0] for x in matchers]), field_name,
+                       to_string, field_matchers))
+    checks.sort(key=lambda x: x[0])
+    cost = sum([x[0] for x in checks])
+    checks = tuple([x[1:] for x in checks])
+
+    def predicate(record):
+        for field_name, to_string, matchers in checks:
+            value = getattr(record, field_name)
+            if to_string:
+                value = str(value)
+            for matcher in matchers:
+                if not matcher(value):
+                    return False
+        return True
+    return cost, predicate
+
+
+def compile_filters(clauses, field_types=None):
+    """Answer a predicate answering whether a record matches the
+    (negate, conditions) clauses added by filter() and exclude(),
+    or None if there are no clauses.
+
+    The filter() conditions must all match, and any exclude() clause
+    whose conditions all match rejects the record.  An exclude() without
+    conditions rejects nothing."""
+    if len(clauses) == 0:
+        return None
+    field_types = field_types or {}
+    required = []
+    excluded = []
+    for negate, conditions in clauses:
+        if negate:
+            if len(conditions) > 0:
+                excluded.append(conjunction(conditions, field_types))
+        else:
+            required.extend(conditions)
+    if len(excluded) == 0:
+        return conjunction(required, field_types)[1]
+    excluded.sort(key=lambda x: x[0])
+    excluded = tuple([x[1] for x in excluded])
+    required = conjunction(required, field_types)[1]
+
+    def predicate(record):
+        if not required(record):
+            return False
+        for matches in excluded:
+            if matches(record):
+                return False
+        return True
+    return predicate
+
+
+
+def projector(fields, kind):
+    """Answer a function answering the projection of a record or service
+    response element: a dictionary (kind 'dict'), a tuple ('tuple') or
+    the value of the single field ('flat')"""
+    getter = attrgetter(*fields)
+
+    def values(record):
+        try:
+            return getter(record)
+        except AttributeError:
+            # Service responses may omit empty values
+            values = tuple([getattr(record, x, None) for x in fields])
+            return values[0] if len(fields) == 1 else values
+    if kind == 'flat':
+        return values
+    if len(fields) == 1:
+        if kind == 'tuple':
+            return lambda record: (values(record),)
+        field_name = fields[0]
+        return lambda record: {field_name: values(record)}
+    if kind == 'tuple':
+        return values
+    return lambda record: dict(zip(fields, values(record)))
+
+
+def ordering_key(field_name):
+    """Answer the sort key of field_name, which orders missing (None)
+    values first"""
+    def key(record):
+        value = getattr(record, field_name, None)
+        return (value is not None, value)
+    return key
+
+
+def hashable(value):
+    """Answer value, or if it (or an item of it) is a list, dictionary or
+    service response object, an equal tuple that can be hashed"""
+    if isinstance(value, (list, tuple)):
+        return tuple([hashable(x) for x in value])
+    if isinstance(value, dict):
+        return tuple([(k, hashable(v)) for k, v in value.items()])
+    if isinstance(value, MythTVServiceObject):
+        return (value._type, hashable(list(value)))
+    return value
+
+
+def unique(results):
+    """Generate the distinct results, in order.
+    Fields with list (e.g. Programs) or object values are compared by value."""
+    seen = set()
+    for result in results:
+        key = tuple(result.values()) if isinstance(result, dict) else result
+        try:
+            new = key not in seen
+        except TypeError:
+            key = hashable(key)
+            new = key not in seen
+        if new:
+            seen.add(key)
+            yield result
+    return
+
 
 
 class MythTVQuerySet(object):
-    """Provide a django like interface for filtering MythTV objects."""
+    """Provide a django like interface for filtering MythTV objects.
+
+    filter() and exclude() take field lookups, e.g.:
+
+        filter(CallSign='^ABC')          - a regular expression search
+        filter(CallSign__exact='ABC')    - equality
+        filter(ChanId__in=[1001, 1002])
+        filter(SourceId__gte=2, XMLTVID__isnull=False)
+        exclude(CallSign__startswith='Test')
+
+    The lookups are exact, iexact, in, startswith, contains, gt, gte, lt,
+    lte, range, isnull and regex, a field without a lookup is a regex.
+    Fields with a type in the model definition ('field_types') are
+    compared as that type (e.g. ChanId as an integer), the others as
+    strings.  Only regex lookups use regular expressions.
+
+    Filters are combined with AND, and are only evaluated when the records
+    are requested, once per record.  all() (and len()) answers the cached
+    list of matching records, while iterating over the receiver, indexing,
+    slicing, first(), exists() and count() retrieve the records lazily,
+    one partition (e.g. videosource) at a time, and stop once they have
+    enough.  The filters are applied to the service response elements, so
+    model objects are only built for the matching records, and not at all
+    by exists() and count().
+
+    get(), in_bulk() and index_by() look records up by attribute value
+    using hash indexes, built from the list answered by all() the first
+    time each field is used, and rebuilt if the records have been changed
+    since.
+
+    Equality filters (exact or ^value$) the model can select on the backend
+    are pushed down, see MythTVClass.pushdown(), e.g. ChannelInfo retrieves
+    a single channel for ChanId__exact=1001.
+
+    values() and values_list() answer dictionaries or tuples of the
+    requested fields instead of records, taken directly from the service
+    responses without building the records, e.g.:
+
+        values_list('ChanId', 'CallSign').order_by('CallSign').distinct()
+
+    order_by() sorts the results, and distinct() removes duplicate
+    projections (records are always distinct)."""
     
-    def __init__(self, classname):
+    def __init__(self, classname, backend=None):
         self.mythtv_class = MythTVClass.classname(classname)
         if self.mythtv_class is None:
             raise MythTVQueryException("Unknown class name: {0}".format(classname))
-        # _filters is a list of (field_name, field_regex, compiled_regex)
+        # backend is None for the default backend
+        self.backend = backend
+        # _filters is a list of the (negate, conditions) clauses added by
+        # filter() and exclude(), where conditions is a list of
+        # (field_name, lookup, prepared value)
         self._filters = []
+        # _records are the records retrieved from the backend, or a parent
+        # query's result, which match the first _applied filters
         self._records = None
+        self._applied = 0
+        # _result is the list of records (or projections) matching all the
+        # filters
+        self._result = None
+        # _projection is the values() / values_list() (fields, kind),
+        # see projector(), or None for records
+        self._projection = None
+        # _ordering is the order_by() field names, prefixed with '-' for
+        # descending order
+        self._ordering = ()
+        self._distinct = False
+        # _indexes are the index_by() dictionaries of _result by field name,
+        # valid while _index_version is unchanged
+        self._indexes = {}
+        self._index_version = None
         return
 
     def filter(self, **kwargs):
-        "Add the supplied filter to the list."
+        "Answer a copy of the receiver with the supplied filters added."
         new_query = self.copy()
-        attributes = self.mythtv_class.keys()
-        for k, v in kwargs.items():
-            if k not in attributes:
+        new_query._filters.append((False, self._conditions(kwargs)))
+        return new_query
+
+    def exclude(self, **kwargs):
+        """Answer a copy of the receiver without the records matching all
+        the supplied filters"""
+        new_query = self.copy()
+        new_query._filters.append((True, self._conditions(kwargs)))
+        return new_query
+
+    def _conditions(self, kwargs):
+        "Answer the (field_name, lookup, value) conditions of the filter kwargs"
+        attributes = self.mythtv_class._meta.key_set
+        field_types = self._field_types()
+        conditions = []
+        for k, v in sorted(kwargs.items()):
+            field_name, _, lookup = k.partition('__')
+            lookup = lookup or 'regex'
+            if field_name not in attributes:
                 raise MythTVQueryException(("Attempt to filter on" 
-                                    "non-existant attribute: {0}").format(k))
-            new_query._filters.append((k, v, re.compile(v)))
-        if self._records is not None and len(self._records) > 0:
-            self._apply_filters()
+                                    "non-existant attribute: {0}").format(field_name))
+            if lookup not in LOOKUPS:
+                raise MythTVQueryException("Unknown lookup: {0}".format(k))
+            conditions.append((field_name, lookup,
+                               prepare_lookup(field_types.get(field_name), lookup, v)))
+        return conditions
+
+    def _field_types(self):
+        return self.mythtv_class._meta.field_types
+
+    def _field_names(self, fields, action):
+        "Answer fields, checking that they are attributes of the receivers class"
+        attributes = self.mythtv_class._meta.key_set
+        for field_name in fields:
+            if field_name not in attributes:
+                raise MythTVQueryException(("Attempt to {0} "
+                                    "non-existant attribute: {1}").format(action, field_name))
+        return tuple(fields)
+
+    def values(self, *fields):
+        """Answer a copy of the receiver answering a dictionary of field
+        name -> value of each matching record, of the supplied fields or
+        all fields"""
+        return self._project(fields or self.mythtv_class.keys(), 'dict')
+
+    def values_list(self, *fields, flat=False):
+        """Answer a copy of the receiver answering a tuple of the field
+        values of each matching record, of the supplied fields or all
+        fields.  If flat is True, answer the value of the single field."""
+        if flat and len(fields) != 1:
+            raise MythTVQueryException("values_list(flat=True) requires a single field")
+        return self._project(fields or self.mythtv_class.keys(),
+                             'flat' if flat else 'tuple')
+
+    def _project(self, fields, kind):
+        new_query = self.copy()
+        new_query._projection = (self._field_names(fields, 'project'), kind)
+        return new_query
+
+    def order_by(self, *fields):
+        """Answer a copy of the receiver answering the results ordered by
+        the supplied fields, prefixed with '-' for descending order.
+        Missing values order first."""
+        self._field_names([x.lstrip('-') for x in fields], 'order by')
+        new_query = self.copy()
+        new_query._ordering = tuple(fields)
+        return new_query
+
+    def distinct(self):
+        "Answer a copy of the receiver answering each projection once"
+        new_query = self.copy()
+        new_query._distinct = True
         return new_query
 
     def _apply_filters(self):
-        """Apply the receivers filters to the records"""
-        if self._records is None:
-            self._records = self.mythtv_class.all()
-        # TODO: This can probably be optimised in some way
-        if len(self._filters) > 0:
-            filtered_records = []
-            for rec in self._records:
-                for f in self._filters:
-                    if f[2].search(str(getattr(rec, f[0]))):
-                        filtered_records.append(rec)
-            self._records = filtered_records
+        """Answer the list of records matching all the receivers filters,
+        retrieving the records if necessary"""
+        if self._result is None:
+            self._result = list(self._iterate())
+        return self._result
+
+    def _iterate(self, build=True):
+        """Answer an iterator over the results: the records matching all
+        the receivers filters, or their projections, in order.
+        If build is False, the order doesn't matter and the matching
+        service response elements may be answered instead of records,
+        see count() and exists()."""
+        if self._result is not None:
+            return iter(self._result)
+        project = self._projection is not None and (build or self._distinct)
+        results = self._matching(build=build and not project)
+        if len(self._ordering) > 0 and build:
+            results = list(results)
+            # Sort by each field in turn, the sort is stable
+            for field_name in reversed(self._ordering):
+                results.sort(key=ordering_key(field_name.lstrip('-')),
+                             reverse=field_name.startswith('-'))
+            results = iter(results)
+        if project:
+            results = map(projector(*self._projection), results)
+            if self._distinct:
+                results = unique(results)
+        return results
+
+    def _matching(self, build=True):
+        """Generate the records matching all the receivers filters,
+        retrieving them one partition at a time.
+        If build is False, answer the matching service response elements
+        instead of building records from them."""
+        cls = self.mythtv_class
+        if self._records is not None:
+            predicate = compile_filters(self._filters[self._applied:],
+                                        self._field_types())
+            for record in self._records:
+                if predicate is None or predicate(record):
+                    yield record
+            return
+        predicate = compile_filters(self._filters, self._field_types())
+        exact = exact_values(self._filters)
+        if len(exact) > 0:
+            elements = cls.pushdown(exact, backend=self.backend)
+            if elements is not None:
+                yield from self._matching_elements(elements, predicate, build)
+                return
+        for key in cls.partitions(backend=self.backend):
+            elements = cls.partition_elements(key, backend=self.backend)
+            if elements is None:
+                for record in cls.partition(key, backend=self.backend):
+                    if predicate is None or predicate(record):
+                        yield record
+                continue
+            yield from self._matching_elements(elements, predicate, build)
+        return
+
+    def _matching_elements(self, elements, predicate, build):
+        """Generate the records built from the elements matching predicate,
+        or the elements themselves if build is False"""
+        cls = self.mythtv_class
+        for element in elements:
+            if predicate is None or predicate(element):
+                if build:
+                    yield cls.from_element(element, backend=self.backend)
+                else:
+                    yield element
         return
 
     def all(self):
-        """Answer all the records in a copy of the receiver"""
-        self._apply_filters()
-        return self._records
+        """Answer all the records matching the receivers filters"""
+        return self._apply_filters()
+
+    def index_by(self, field_name):
+        """Answer a dictionary of field value -> list of the matching
+        records with that value, e.g. index_by('CallSign')['ABC'].
+        The index is kept until the records change."""
+        return self._index_by(field_name)
+
+    def _coerce(self, field_name, value):
+        """Answer value converted to the type of field_name, see
+        coerce_value().  Values of fields without a type, and None, are
+        answered unchanged."""
+        field_type = self._field_types().get(field_name)
+        if field_type is None or value is None:
+            return value
+        return coerce_value(field_type, value)
+
+    def _index_by(self, field_name):
+        if field_name not in self.mythtv_class._meta.key_set:
+            raise MythTVQueryException(("Attempt to index on "
+                                "non-existant attribute: {0}").format(field_name))
+        if self._projection is not None:
+            raise MythTVQueryException("Records can't be indexed after values()")
+        records = self._apply_filters()
+        version = (MythTVClass.modification, len(records))
+        if version != self._index_version:
+            self._indexes = {}
+            self._index_version = version
+        index = self._indexes.get(field_name)
+        if index is None:
+            index = {}
+            for record in records:
+                index.setdefault(getattr(record, field_name), []).append(record)
+            self._indexes[field_name] = index
+        return index
+
+    def get(self, **kwargs):
+        """Answer the single matching record whose attributes are equal to
+        the supplied values, e.g. get(ChanId=1001), converted to the
+        field's type as by filter(), so get(ChanId='1001') is the same.
+        Raise MythTVObjectDoesNotExist or MythTVMultipleObjectsReturned if
+        there isn't exactly one."""
+        attributes = self.mythtv_class._meta.key_set
+        for k in kwargs:
+            if k not in attributes:
+                raise MythTVQueryException(("Attempt to get on "
+                                    "non-existant attribute: {0}").format(k))
+        if len(kwargs) == 0:
+            records = self._apply_filters()
+        else:
+            items = [(k, self._coerce(k, v)) for k, v in sorted(kwargs.items())]
+            records = self._index_by(items[0][0]).get(items[0][1], [])
+            for field_name, value in items[1:]:
+                records = [x for x in records if getattr(x, field_name) == value]
+        if len(records) == 0:
+            raise MythTVObjectDoesNotExist("No {0} matches {1}".format(
+                self.mythtv_class.__name__, kwargs))
+        if len(records) > 1:
+            raise MythTVMultipleObjectsReturned("{0} {1} records match {2}".format(
+                len(records), self.mythtv_class.__name__, kwargs))
+        return records[0]
+
+    def in_bulk(self, field_name, values):
+        """Answer a dictionary of value -> list of the records with that
+        field value, for each of the values that matches a record.
+        The values are converted to the field's type, as by get()."""
+        index = self._index_by(field_name)
+        bulk = {}
+        for value in values:
+            records = index.get(self._coerce(field_name, value))
+            if records is not None:
+                bulk[value] = records
+        return bulk
+
+    def update(self, **fields):
+        """Set the supplied fields of each matching record and save the
+        records that changed, see MythTVClass.bulk_save().
+        Answer the MythTVSaveReport."""
+        update_attributes = self.mythtv_class._meta.update_set
+        for field_name in self._field_names(fields, 'update'):
+            if field_name not in update_attributes:
+                raise MythTVQueryException(("Attempt to update read-only "
+                                    "attribute: {0}").format(field_name))
+        if self._projection is not None:
+            raise MythTVQueryException("Records can't be updated after values()")
+        records = self._apply_filters()
+        for record in records:
+            for field_name, value in fields.items():
+                setattr(record, field_name, value)
+        return self.mythtv_class.bulk_save(records)
+
+    def first(self):
+        "Answer the first matching record (or projection), or None"
+        for record in self._iterate():
+            return record
+        return None
+
+    def exists(self):
+        "Answer whether any record matches"
+        for element in self._iterate(build=False):
+            return True
+        return False
+
+    def count(self):
+        "Answer the number of matching records, without building them"
+        if self._result is not None:
+            return len(self._result)
+        count = 0
+        for element in self._iterate(build=False):
+            count += 1
+        return count
+
+    def __iter__(self):
+        """Iterate over the matching records.
+        Unless all() has been called, the records are retrieved as the
+        iteration proceeds, and aren't kept."""
+        return self._iterate()
+
+    def __len__(self):
+        return len(self._apply_filters())
+
+    def __getitem__(self, index):
+        """Answer the record at index, or the list of records in the slice.
+        Non-negative indexes and slices stop retrieving records once the
+        requested records have been found."""
+        if self._result is not None:
+            return self._result[index]
+        if isinstance(index, slice):
+            if ((index.start or 0) < 0 or (index.stop is not None and index.stop < 0)
+                    or (index.step or 1) < 0):
+                return self._apply_filters()[index]
+            return list(islice(self._iterate(), index.start, index.stop, index.step))
+        if index < 0:
+            return self._apply_filters()[index]
+        for record in islice(self._iterate(), index, index + 1):
+            return record
+        raise IndexError("MythTVQuerySet index out of range")
 
     def copy(self):
         """Answer a copy of the receiver.
-        If _records are not None, copy the record list"""
+        If the receivers records have been retrieved the copy starts from
+        (a copy of) the filtered records, or the retrieved records if the
+        receiver answers projections"""
         new_copy = copy(self)
-        if new_copy._records is not None:
-            new_copy._records = copy(new_copy._records)
+        new_copy._filters = list(self._filters)
+        if self._result is not None and self._projection is None:
+            new_copy._records = copy(self._result)
+            new_copy._applied = len(self._filters)
+        elif self._records is not None:
+            new_copy._records = copy(self._records)
+        new_copy._result = None
+        new_copy._indexes = {}
+        new_copy._index_version = None
         return new_copy
-
@@ -0,0 +1,213 @@
+"""
+Module: response_cache.py
+
+A cache of the responses to GET operations.
+
+Scripts frequently repeat the same requests, e.g. GetVideoSourceList and
+GetChannelInfoList, within a single run and in runs a few minutes apart.
+MythTVServiceAPI.call() answers GET operations from the receivers backend's
+MythTVResponseCache while the response is younger than the operation's TTL.
+
+Entries are keyed by (hostname, port, service, operation, parameters).
+The least recently used entries are discarded once the responses held
+total more than RESPONSE_CACHE_BYTES, measured as received from the
+backend.  A single larger response isn't cached.
+
+All of a service's entries are discarded when a POST operation on the
+service succeeds, e.g. Channel/UpdateDBChannel invalidates the cached
+GetChannelInfoList responses.  A GET that was sent before the POST
+completed isn't cached, see generation().
+
+If RESPONSE_CACHE_PERSIST is True the cache is pickled in the backend's
+WSDL cache directory when the process exits and re-loaded by the next
+process.  Responses that can't be pickled (suds objects) are only cached
+in memory.
+
+Cached responses are shared by all callers and must not be modified.
+"""
+
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from os import remove, replace
+from os.path import exists
+from threading import Lock
+
+from mythtvlib.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+
+class MythTVResponseCache(object):
+    """A TTL and LRU bounded cache of GET responses for a single backend"""
+
+    # Increment version to discard all persisted caches
+    version = 2
+
+    def __init__(self, backend, max_bytes=None, ttl=None, ttls=None, fname=None):
+        """Initialise the receiver.
+
+        max_bytes is the total size of the responses held.
+        ttl is the default time to live (seconds) of the responses,
+        ttls the per operation overrides keyed by "Service.Operation" or
+        "Operation".  A TTL of 0 disables caching.
+        fname is the file the cache is persisted in, None for a memory
+        only cache."""
+        self.backend = backend
+        self.max_bytes = max_bytes
+        if self.max_bytes is None:
+            self.max_bytes = int(getattr(settings, "RESPONSE_CACHE_BYTES", 16 * 1024 * 1024))
+        self.ttl = ttl
+        if self.ttl is None:
+            self.ttl = float(getattr(settings, "RESPONSE_CACHE_TTL", 60))
+        self.ttls = ttls
+        if self.ttls is None:
+            self.ttls = getattr(settings, "RESPONSE_CACHE_TTLS", {})
+        self.fname = fname
+        self._lock = Lock()
+        # key -> (expiry time, response, size), least recently used first
+        self._entries = OrderedDict()
+        # bytes is the total size of the entries
+        self.bytes = 0
+        # _generations is service name -> the number of times its entries
+        # have been invalidated, _cleared the number of times all entries
+        # have been
+        self._generations = {}
+        self._cleared = 0
+        self._loaded = fname is None
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def operation_ttl(self, service_name, operation):
+        "Answer the time to live of the responses to operation"
+        ttl = self.ttls.get("{0}.{1}".format(service_name, operation))
+        if ttl is None:
+            ttl = self.ttls.get(operation, self.ttl)
+        return float(ttl)
+
+    def key(self, service_name, operation, parameters):
+        """Answer the cache key of a request.
+        parameters is a dict of parameter names and (encoded) values."""
+        return (self.backend.hostname, self.backend.port, service_name,
+                operation, tuple(sorted(parameters.items())))
+
+    def _load(self):
+        "Read the persisted entries (with the lock held)"
+        self._loaded = True
+        try:
+            with open(self.fname, 'rb') as fp:
+                version, entries = pickle.load(fp)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.debug("Ignoring response cache {0}: {1}".format(self.fname, e))
+            return
+        if version != self.version:
+            return
+        now = time.time()
+        for key, entry in entries:
+            if entry[0] > now and self.bytes + entry[2] <= self.max_bytes:
+                self._entries[key] = entry
+                self.bytes += entry[2]
+        return
+
+    def _remove(self, key):
+        "Remove the entry for key (with the lock held)"
+        self.bytes -= self._entries.pop(key)[2]
+        return
+
+    def get(self, key):
+        "Answer the cached response for key, or None"
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, service_name):
+        """Answer the invalidation generation of service_name's entries.
+        A GET response is only put() if the generation read before the
+        request was sent is unchanged, otherwise a POST may have changed
+        the backend while the response was in flight."""
+        with self._lock:
+            return (self._cleared, self._generations.get(service_name, 0))
+
+    def put(self, key, response, ttl, size, generation=None):
+        """Add the response, of size bytes as received (None if unknown,
+        which isn't cached), to the receiver.
+        generation is the service's generation() when the request was
+        sent, None to skip the check."""
+        if ttl <= 0 or size is None or size > self.max_bytes:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if generation is not None and generation != (
+                    self._cleared, self._generations.get(key[2], 0)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, response, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return
+
+    def invalidate(self, service_name=None):
+        "Discard the entries of service_name, or all entries"
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if service_name is None:
+                self._entries.clear()
+                self.bytes = 0
+                self._cleared += 1
+            else:
+                for key in [k for k in self._entries if k[2] == service_name]:
+                    self._remove(key)
+                self._generations[service_name] = (
+                    self._generations.get(service_name, 0) + 1)
+        return
+
+    def save(self):
+        "Persist the unexpired entries, if the receiver has a file name"
+        if self.fname is None:
+            return
+        with self._lock:
+            if not self._loaded:
+                # Nothing has been used, leave the file as it is
+                return
+            now = time.time()
+            entries = []
+            for key, entry in self._entries.items():
+                if entry[0] <= now:
+                    continue
+                try:
+                    pickle.dumps(entry[1])
+                except Exception:
+                    continue
+                entries.append((key, entry))
+        if len(entries) == 0:
+            if exists(self.fname):
+                remove(self.fname)
+            return
+        tmp_fname = self.fname + ".tmp"
+        with open(tmp_fname, 'wb') as fp:
+            pickle.dump((self.version, entries), fp)
+        replace(tmp_fname, self.fname)
+        return
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
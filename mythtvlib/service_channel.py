@@ -5,6 +5,7 @@ Define all the MythTV classes that are part of the Channel Service
 """
 from mythtvlib.backend import MythTVBackend
 from mythtvlib.object import MythTVClass, MythTVObjectException
+from mythtvlib.services import array_items
 
 
 CLASS_DEFINITIONS = {
@@ -40,7 +41,15 @@ CLASS_DEFINITIONS = {
                   'CommFree', 'UseEIT', 'Visible', 'XMLTVID', 'DefaultAuth',
                   'Programs'],
         'update_attributes' : ['ChanNum', 'CallSign', 'ChannelName',
-                            'IconURL', 'Visible', 'XMLTVID']
+                            'IconURL', 'Visible', 'XMLTVID'],
+        # The attributes filter() compares as numbers and booleans,
+        # the others are compared as strings
+        'field_types' : {'ChanId' : int, 'MplexId' : int, 'TransportId' : int,
+                         'ServiceId' : int, 'NetworkId' : int,
+                         'ATSCMajorChan' : int, 'ATSCMinorChan' : int,
+                         'Frequency' : int, 'FineTune' : int, 'SourceId' : int,
+                         'InputId' : int, 'CommFree' : int,
+                         'UseEIT' : bool, 'Visible' : bool}
         },
 }
 
@@ -56,9 +65,9 @@ class ChannelInfo(MythTVClass):
         """Iterate over all videosources in the backend"""
         if backend is None:
             backend = MythTVBackend.default()
-        video_services = backend.service_api("Channel").service.GetVideoSourceList()
-        for vss in video_services.VideoSources:
-            yield vss[1]
+        video_services = backend.service_api("Channel").call("GetVideoSourceList")
+        for vs in array_items(video_services.VideoSources):
+            yield vs
         return
 
     @classmethod
@@ -66,30 +75,72 @@ class ChannelInfo(MythTVClass):
         """Iterate over all channels in the specified videosource id"""
         if backend is None:
             backend = MythTVBackend.default()
-        channels = backend.service_api("Channel").service.GetChannelInfoList(videosource_id)
+        channels = backend.service_api("Channel").call("GetChannelInfoList", videosource_id)
         # channels is a ChannelInfoList
-        # channels.ChannelInfos is ArrayOfChannelInfo,
-        # which is a an array like object with one entry,
-        # a list of ChannelInfo
-        for channel in channels.ChannelInfos[0]:
+        # channels.ChannelInfos is the array of ChannelInfo
+        for channel in array_items(channels.ChannelInfos):
             yield channel
         return        
 
     @classmethod
     def all_channels(cls, backend=None):
         "Iterate over all channels, i.e. over all videosources"
-        for vss in cls.videosources(backend=backend):
-            for vs in vss:
-                for channel in cls.channels(vs.Id, backend=backend):
-                    yield channel
+        for vs in cls.videosources(backend=backend):
+            for channel in cls.channels(vs.Id, backend=backend):
+                yield channel
         return
 
     @classmethod
-    def all(cls, backend=None):
-        """Answer all the receivers records fetched from the backend"""
-        all_records = [cls.from_element(c, backend=backend) \
-                       for c in cls.all_channels(backend=backend)]
-        return all_records
+    def channel(cls, chan_id, backend=None):
+        """Answer a list of the channel with ChanId chan_id,
+        or an empty list if there isn't one"""
+        return [cls.from_element(x, backend=backend)
+                for x in cls.channel_elements(chan_id, backend=backend)]
+
+    @classmethod
+    def channel_elements(cls, chan_id, backend=None):
+        """Answer a list of the ChannelInfo element with ChanId chan_id,
+        or an empty list if there isn't one"""
+        from suds import WebFault
+        if backend is None:
+            backend = MythTVBackend.default()
+        try:
+            channel = backend.service_api("Channel").call("GetChannelInfo", chan_id)
+        except WebFault:
+            # The backend answers a fault for an unknown ChanId
+            return []
+        return [channel]
+
+    @classmethod
+    def pushdown(cls, exact, backend=None):
+        """Answer the ChannelInfo elements that may match exact: the single
+        channel of an exact ChanId, or the channels of an exact SourceId.
+        The values may be strings (from a regex) or integers."""
+        for field_name in ('ChanId', 'SourceId'):
+            try:
+                value = int(exact.get(field_name))
+            except (TypeError, ValueError):
+                continue
+            if field_name == 'ChanId':
+                return cls.channel_elements(value, backend=backend)
+            return cls.partition_elements(value, backend=backend)
+        return None
+
+    @classmethod
+    def partitions(cls, backend=None):
+        "Answer the videosource ids, each is retrieved separately"
+        return [vs.Id for vs in cls.videosources(backend=backend)]
+
+    @classmethod
+    def partition(cls, key, backend=None):
+        "Answer the channels in videosource key"
+        return [cls.from_element(c, backend=backend) \
+                for c in cls.channels(key, backend=backend)]
+
+    @classmethod
+    def partition_elements(cls, key, backend=None):
+        "Iterate over the ChannelInfo elements of videosource key"
+        return cls.channels(key, backend=backend)
 
 
 
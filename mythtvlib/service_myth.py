@@ -7,6 +7,7 @@ import re
 
 from mythtvlib.backend import MythTVBackend
 from mythtvlib.object import MythTVClass, MythTVObjectException
+from mythtvlib.utils import profile_feature
 
 
 CLASS_DEFINITIONS = {
@@ -56,11 +57,11 @@ class Profile(MythTVClass):
         return CLASS_DEFINITIONS['Profile']
 
     @classmethod
-    def all(cls, backend=None):
+    def partition(cls, key, backend=None):
         """Answer the backend's Profile"""
         if backend is None:
             backend = MythTVBackend.default()
-        profile_text = backend.service_api("Myth").service.ProfileText()
+        profile_text = backend.service_api("Myth").call("ProfileText")
         profile = cls(text=profile_text, _backend=backend)
         return [profile]
 
@@ -72,15 +73,10 @@ class Profile(MythTVClass):
         - <feature_name>:
              <feature_value>
         """
-        regex = re.compile('(^- {0}:)'.format(feature_name), re.MULTILINE)
-        search = regex.search(self.text)
-        if search is None:
+        feature = profile_feature(self.text, feature_name)
+        if feature is None:
             raise MythTVObjectException("Profile feature '{0}' not found".format(feature_name))
-        offset = search.end() + 1
-        substring = self.text[offset:]
-        length = substring.find("\n")
-        substring = substring[:length].strip()
-        return substring
+        return feature
 
     def __getattr__(self, name):
         """Answer the requested feature"""
@@ -11,58 +11,364 @@ TODO:
   Either MythTV is correct and suds-jurko should be modified to handle it, or
   MythTV is incorrect and needs to be fixed."""
 
-from lxml.etree import parse
-from os.path import exists, join
-from urllib.request import urlopen
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+from itertools import repeat
+from lxml.etree import XMLSyntaxError, fromstring, parse
+from threading import Lock, RLock, local
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from suds.cache import ObjectCache
 from suds.client import Client
+from suds.sudsobject import Object as SudsObject
 
-from mythtvlib.utils import get_tmp_dir
+from mythtvlib import SERVICE_NAMES
+from mythtvlib.settings import settings
+from mythtvlib.transport import MythTVSudsTransport
+
+logger = logging.getLogger(__name__)
+
+# The ways GET operations can be sent to the backend:
+#   soap - suds
+#   json - HTTP GET, decoding the JSON response
+#   xml  - HTTP GET, decoding the XML response
+# suds is always used for POST operations.
+TRANSPORTS = ('soap', 'json', 'xml')
+
+XS_NS = 'http://www.w3.org/2001/XMLSchema'
+WSDL_NS = 'http://schemas.xmlsoap.org/wsdl/'
+
+# Increment INDEX_VERSION when the structure returned by build_index changes
+INDEX_VERSION = 1
+
+INTEGER_TYPES = frozenset(['byte', 'int', 'integer', 'long', 'short',
+                           'unsignedByte', 'unsignedInt', 'unsignedLong',
+                           'unsignedShort'])
+FLOAT_TYPES = frozenset(['decimal', 'double', 'float'])
+
+# The raw schema documents retrieved by any service in this process,
+# keyed by schemaLocation.  The services share most of their imports, so
+# each schema is only retrieved once.
+_schema_sources = {}
+_schema_sources_lock = Lock()
 
 class MythTVServiceException(Exception):
     pass
 
+
+
+class MythTVServiceObject(object):
+    """A response object decoded by the json and xml transports.
+
+    Like suds.sudsobject.Object the response values are attributes, and
+    iterating over the object answers (name, value) pairs, so the model
+    classes can be built from either."""
+
+    __slots__ = ('_type', '__dict__')
+
+    def __init__(self, type_name, items):
+        self._type = type_name
+        self.__dict__.update(items)
+        return
+
+    def __iter__(self):
+        return iter(self.__dict__.items())
+
+    def __repr__(self):
+        lines = ["({0}){{".format(self._type)]
+        for k, v in self.__dict__.items():
+            value = repr(v).replace("\n", "\n   ")
+            lines.append("   {0} = {1}".format(k, value))
+        lines.append(" }")
+        return "\n".join(lines)
+
+
+
+def array_items(array):
+    """Answer the list of items in a response array.
+
+    The json and xml transports answer a list.  suds answers an
+    ArrayOf<Type> object whose only attribute is the list."""
+    if isinstance(array, list):
+        return array
+    if array is None:
+        return []
+    for name, items in array:
+        return items
+    return []
+
+
+def plain_value(value):
+    """Answer a response value without suds objects, as the json and xml
+    transports answer it: suds Text as a str, ArrayOf<Type> objects as a
+    list and other objects as a MythTVServiceObject, so that the records
+    built from a response don't keep references to the suds objects"""
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, list):
+        return [plain_value(x) for x in value]
+    if isinstance(value, SudsObject):
+        type_name = value.__class__.__name__
+        if type_name.startswith('ArrayOf'):
+            return [plain_value(x) for x in array_items(value)]
+        return MythTVServiceObject(type_name, [(k, plain_value(v)) for k, v in value])
+    return value
+
+
+def _decode_scalar(type_name, text):
+    "Answer the python value of text, whose schema type is type_name"
+    if text is None or text == "":
+        return None
+    if not isinstance(text, str):
+        # JSON numbers and booleans are already decoded
+        return text
+    local_type = type_name.split(':')[-1]
+    if local_type in INTEGER_TYPES:
+        return int(text)
+    if local_type == 'boolean':
+        return text.lower() in ('true', '1')
+    if local_type in FLOAT_TYPES:
+        return float(text)
+    if local_type == 'dateTime':
+        try:
+            return datetime.strptime(text, "%Y-%m-%dT%H:%M:%SZ").replace(
+                tzinfo=timezone.utc)
+        except ValueError:
+            return text
+    return text
+
+
+def _encode_scalar(value):
+    "Answer value as an HTTP query parameter"
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+
+def build_index(wsdl):
+    """Answer the operation and type index of the supplied WSDL
+    (lxml ElementTree), built in a single pass over the schema and
+    port types:
+
+    {'version': INDEX_VERSION,
+     'operations': {name: {'verb': 'GET' or 'POST',
+                           'parameters': [{'name', 'type', 'minOccurs',
+                                           'nillable'}],
+                           'returns': type name}},
+     'types': {complex type name: {element name: element type}},
+     'arrays': {array type name: item type name}}
+
+    The index only contains strings, lists and dicts so it can be stored
+    as JSON."""
+    xs_element = '{{{0}}}element'.format(XS_NS)
+    xs_complex_type = '{{{0}}}complexType'.format(XS_NS)
+    sequence_path = '{{{0}}}sequence/{1}'.format(XS_NS, xs_element)
+    elements = {}
+    types = {}
+    arrays = {}
+    root = wsdl.getroot()
+    for schema in root.iter('{{{0}}}schema'.format(XS_NS)):
+        for child in schema:
+            name = child.get('name')
+            if name is None:
+                continue
+            if child.tag == xs_element:
+                elements[name] = child.findall(
+                    '{0}/{1}'.format(xs_complex_type, sequence_path))
+            elif child.tag == xs_complex_type:
+                sequence = child.findall(sequence_path)
+                types[name] = dict((e.get('name'), e.get('type'))
+                                   for e in sequence)
+                if len(sequence) == 1 and sequence[0].get('maxOccurs') == 'unbounded':
+                    arrays[name] = sequence[0].get('type')
+    operations = {}
+    for port_type in root.iter('{{{0}}}portType'.format(WSDL_NS)):
+        for operation in port_type.iter('{{{0}}}operation'.format(WSDL_NS)):
+            name = operation.get('name')
+            documentation = operation.find('{{{0}}}documentation'.format(WSDL_NS))
+            if documentation is None:
+                verb = "None"
+            else:
+                verb = (documentation.text or "").strip()
+            parameters = [{
+                'name': x.get('name'),
+                'type': x.get('type'),
+                'minOccurs': x.get('minOccurs'),
+                'nillable': x.get('nillable'),
+                } for x in elements.get(name, [])]
+            results = elements.get(name + 'Response', [])
+            operations[name] = {
+                'verb': verb,
+                'parameters': parameters,
+                'returns': results[0].get('type') if len(results) > 0 else None,
+                }
+    return {'version': INDEX_VERSION, 'operations': operations,
+            'types': types, 'arrays': arrays}
+
+
+def fetch_schema(location, pool):
+    """Answer the contents of the schema at location,
+    retrieving it using pool if it hasn't already been fetched."""
+    with _schema_sources_lock:
+        source = _schema_sources.get(location)
+    if source is None:
+        source = pool.get(location)
+        with _schema_sources_lock:
+            _schema_sources[location] = source
+    return source
+
+
+
 class MythTVServiceAPI(object):
-    """Provide convenient access to the low-level MythTV Web Services."""
+    """Provide convenient access to the low-level MythTV Web Services.
 
-    services = ['Capture', 'Channel', 'Content', 'DVR', 'Frontend', 'Guide', 'Myth', 'Video']
+    The receiver may be shared by threads (see mythtvlib.aio, batch and
+    bulk): the WSDL and index are built once, under _lock, while suds
+    clients keep the state of the current reply, so each thread has its
+    own client, built from the cached client model (see client)."""
+
+    services = SERVICE_NAMES
 
     def __init__(self, service_name, backend):
+        """Initialise the receiver.
+
+        Nothing is retrieved or parsed until it is needed: the WSDL is loaded
+        the first time the operations are introspected, and the suds client
+        is only built when an operation is invoked."""
+        if service_name not in self.services:
+            raise MythTVServiceException("Unknown service: {0}".format(service_name))
         self.service_name = service_name
         self.backend = backend
-        self.wsdl = None
-        self.wsdl_fname = join(get_tmp_dir(),
-                               "MythTV-{0}.wsdl".format(service_name))
-        self.client = self._client_for(service_name)
-        self.service = self.client.service
-        self.wsdl_namespaces = self.wsdl.getroot().nsmap
-        # FIXME: The wsdl namespace seems to have None as its name
-        self.wsdl_namespaces['wsdl'] = self.wsdl_namespaces[None]
-        del self.wsdl_namespaces[None]
-        self._operations = None
+        self.wsdl_fname = None
+        self._wsdl = None
+        self._wsdl_namespaces = None
+        # _clients.client is the current thread's suds client
+        self._clients = local()
+        self._index = None
+        # _wsdl_key is the backend version key of the cached WSDL in use,
+        # see check_version()
+        self._wsdl_key = None
+        self._lock = RLock()
         return
 
+    @property
+    def wsdl(self):
+        "Answer the receivers WSDL (lxml ElementTree)"
+        if self._wsdl is None:
+            self._wsdl = parse(self._wsdl_file())
+        return self._wsdl
+
+    @property
+    def wsdl_namespaces(self):
+        "Answer the namespaces used in the receivers WSDL"
+        if self._wsdl_namespaces is None:
+            namespaces = dict(self.wsdl.getroot().nsmap)
+            # FIXME: The wsdl namespace seems to have None as its name
+            namespaces['wsdl'] = namespaces[None]
+            del namespaces[None]
+            self._wsdl_namespaces = namespaces
+        return self._wsdl_namespaces
+
+    def check_version(self):
+        """Discard the receivers WSDL, index and suds clients if the
+        backend's version has changed since the WSDL was loaded, so that
+        they are rebuilt from the new WSDL when next needed"""
+        if self._wsdl_key is None:
+            return
+        key = self.backend.wsdl_cache.info()['key']
+        if key == self._wsdl_key:
+            return
+        with self._lock:
+            if self._wsdl_key is None or key == self._wsdl_key:
+                return
+            logger.info("{0}: backend version changed, reloading the WSDL".format(
+                self.service_name))
+            with _schema_sources_lock:
+                _schema_sources.clear()
+            self.wsdl_fname = None
+            self._wsdl = None
+            self._wsdl_namespaces = None
+            self._index = None
+            self._clients = local()
+            self._wsdl_key = None
+        return
+
+    @property
+    def index(self):
+        "Answer the receivers operation and type index, see build_index()"
+        self.check_version()
+        with self._lock:
+            if self._index is None:
+                wsdl_cache = self.backend.wsdl_cache
+                self._wsdl_file()
+                index = wsdl_cache.load_index(self.service_name)
+                if index is None or index.get('version') != INDEX_VERSION:
+                    index = build_index(self.wsdl)
+                    wsdl_cache.store_index(self.service_name, index)
+                self._index = index
+        return self._index
+
+    @property
+    def client(self):
+        "Answer the receivers suds client for the current thread"
+        self.check_version()
+        client = getattr(self._clients, 'client', None)
+        if client is None:
+            with self._lock:
+                client = self._client_for(self.service_name)
+            self._clients.client = client
+        return client
+
+    @property
+    def service(self):
+        "Answer the suds service proxy"
+        return self.client.service
+
     def _fetch_imports_includes(self, root, imports):
         """As part of working around suds-jurko and the MythTV wsdl
         not playing nicely together, search through the supplied Element and
-        fetch each import to be later inserted back in to the root WSDL."""
+        fetch each import to be later inserted back in to the root WSDL.
+
+        The import tree is walked a level at a time, with all the schema
+        at each level being retrieved concurrently."""
+        pending = self._remove_imports(root, imports, {})
+        workers = max(1, int(getattr(settings, "WSDL_FETCH_WORKERS", 8)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(pending) > 0:
+                locations = list(pending.keys())
+                sources = executor.map(fetch_schema, locations,
+                                       repeat(self.backend.http))
+                next_pending = {}
+                for location, source in zip(locations, sources):
+                    import_tree = parse(BytesIO(source))
+                    imports[location] = {
+                        'import': pending[location],
+                        'source': source,
+                        'tree': import_tree
+                        }
+                    self._remove_imports(import_tree, imports, next_pending)
+                pending = next_pending
+        return
+
+    def _remove_imports(self, root, imports, pending):
+        """Remove each import from the supplied Element, adding those that
+        haven't already been seen to pending (location -> import element).
+        Answer pending."""
         import_elements = root.findall(".//*[@schemaLocation]/..")
         for import_element in list(import_elements):
             for imp in list(import_element):
                 location = imp.get('schemaLocation')
                 if location is None:
                     continue
-                if location in imports.keys():
-                    continue
-                import_string = urlopen(location)
-                import_tree = parse(import_string)
-                imports[location] = {
-                    'import': imp,
-                    'source': import_string,
-                    'tree': import_tree
-                    }
-                self._fetch_imports_includes(import_tree, imports)
                 import_element.remove(imp)
-        return
+                if location in imports or location in pending:
+                    continue
+                pending[location] = imp
+        return pending
 
     def _write_wsdl_for(self, service):
         """Work around suds-jurko and the MythTV wsdl
@@ -77,7 +383,7 @@ class MythTVServiceAPI(object):
                 service=service,
                 hostname=self.backend.hostname,
                 port=self.backend.port)
-        wsdl_string = urlopen(url)
+        wsdl_string = BytesIO(self.backend.http.get(url))
         wsdl = parse(wsdl_string)
         root = wsdl.getroot()
         schema = root.find(".//*[@targetNamespace='http://mythtv.org']")
@@ -91,55 +397,63 @@ class MythTVServiceAPI(object):
                     continue
                 schema.insert(1, e)
         wsdl.write(self.wsdl_fname, encoding='utf-8', xml_declaration=True)
-        self.wsdl = wsdl
+        self._wsdl = wsdl
         return
 
-    def _get_wsdl_for(self, service):
-        """Retrieve the suds-jurko friendly wsdl definitions.
-        If the cache file exists, use it directly,
+    def _wsdl_file(self):
+        """Answer the file name of the suds-jurko friendly wsdl definitions.
+        If the backend's cache file is valid, use it directly,
         otherwise download it from the backend."""
-        if exists(self.wsdl_fname):
-            self.wsdl = parse(self.wsdl_fname)
-        else:
-            self._write_wsdl_for(service)
-        return
+        if self.wsdl_fname is not None:
+            return self.wsdl_fname
+        wsdl_cache = self.backend.wsdl_cache
+        self._wsdl_key = wsdl_cache.info()['key']
+        self.wsdl_fname = wsdl_cache.wsdl_fname(self.service_name)
+        if not wsdl_cache.is_valid(self.service_name):
+            try:
+                self._write_wsdl_for(self.service_name)
+            except:
+                self.wsdl_fname = None
+                self._wsdl_key = None
+                raise
+            wsdl_cache.stored(self.service_name)
+        return self.wsdl_fname
 
     def _client_for(self, service):
         """Return the suds client for the specified service"""
-        if service not in self.services:
-            raise MythTVServiceException("Unknown service: {0}".format(service))
-        self._get_wsdl_for(service)
-        url='file://{0}'.format(self.wsdl_fname)
-        client = Client(url)
+        url='file://{0}'.format(self._wsdl_file())
+        transport = MythTVSudsTransport(self.backend.http)
+        if getattr(settings, "SUDS_CLIENT_CACHE", True):
+            # Re-use the pickled client model instead of rebuilding it
+            # from the WSDL
+            location = self.backend.wsdl_cache.client_cache_location(service)
+            client = Client(url, transport=transport,
+                            cache=ObjectCache(location=location),
+                            cachingpolicy=1)
+        else:
+            client = Client(url, transport=transport, cache=None)
         return client
 
     def operations(self, types=['GET']):
         """Return the automatically supported command names for the receivers
         service.  Currently this means any operation that uses http get, and
         thus isn't expected to modify the database in any way."""
-        if self._operations is not None:
-            return self._operations
+        return [name for name, operation in self.index['operations'].items()
+                if operation['verb'] in types]
 
-        command_elements = self.wsdl.findall('.//wsdl:operation/wsdl:documentation/..', self.wsdl_namespaces)
-        ops = []
-        for operation in command_elements:
-            try:
-                optype = operation.find("./wsdl:documentation", self.wsdl_namespaces).text.strip()
-            except AttributeError:
-                optype = "None"
-            if optype in types:
-                ops.append(operation.get("name"))
-        self._operations = ops
-        return self._operations
+    def operation(self, operation):
+        "Answer the index entry of the requested operation"
+        try:
+            return self.index['operations'][operation]
+        except KeyError:
+            raise MythTVServiceException("Unknown {0} operation: {1}".format(
+                self.service_name, operation))
 
     def operation_parameters(self, operation):
-        """Return the list of parameters for the requested operation"""
-        operation_elements = self.wsdl.findall(".//xs:element[@name='{0}']".format(operation),
-                                               self.wsdl_namespaces)
-        assert len(operation_elements) == 1, "Expected single operation element"
-        parameters = operation_elements[0].findall(".//xs:element",
-                                                   self.wsdl_namespaces)
-        return parameters
+        """Return the list of parameters for the requested operation.
+        Each parameter is a dictionary with name, type, minOccurs and
+        nillable keys."""
+        return self.operation(operation)['parameters']
 
     def print_help(self, show_post=False):
         """Print the list of supported operations and their parameter names"""
@@ -147,8 +461,9 @@ class MythTVServiceAPI(object):
             types = ["GET", "POST"]
         else:
             types = ["GET"]
+        operations = self.operations(types)
         print("Supported Operations:")
-        for operation in self.operations(types):
+        for operation in operations:
             parameters = self.operation_parameters(operation)
             parameter_names = [x.get('name') for x in parameters]
             parameter_string = ", ".join(parameter_names)
@@ -173,6 +488,176 @@ class MythTVServiceAPI(object):
                 nillable=param.get('nillable')))
         return
 
+    def operation_verb(self, operation):
+        "Answer the HTTP verb (GET or POST) of the requested operation"
+        operation = self.index['operations'].get(operation)
+        if operation is None:
+            return None
+        return operation['verb']
+
+    def operation_return_type(self, operation):
+        "Answer the schema type name returned by the requested operation"
+        return self.operation(operation)['returns']
+
+    def _decode_json(self, type_name, value):
+        "Answer the python representation of the JSON value"
+        types = self.index['types']
+        arrays = self.index['arrays']
+        local_type = type_name.split(':')[-1]
+        item_type = arrays.get(local_type)
+        if item_type is not None:
+            return [self._decode_json(item_type, x) for x in value or []]
+        elements = types.get(local_type)
+        if elements is not None:
+            if not isinstance(value, dict):
+                return None
+            return MythTVServiceObject(local_type,
+                [(k, self._decode_json(elements.get(k, 'xs:string'), v))
+                 for k, v in value.items()])
+        return _decode_scalar(type_name, value)
+
+    def _decode_xml(self, type_name, element):
+        "Answer the python representation of the XML element"
+        types = self.index['types']
+        arrays = self.index['arrays']
+        local_type = type_name.split(':')[-1]
+        item_type = arrays.get(local_type)
+        if item_type is not None:
+            return [self._decode_xml(item_type, x) for x in element]
+        elements = types.get(local_type)
+        if elements is not None:
+            items = []
+            for child in element:
+                name = child.tag.split('}')[-1]
+                items.append((name,
+                    self._decode_xml(elements.get(name, 'xs:string'), child)))
+            return MythTVServiceObject(local_type, items)
+        return _decode_scalar(type_name, element.text)
+
+    def _parameters(self, operation, args, kwargs):
+        """Answer the supplied positional and keyword arguments as a dict of
+        parameter names and encoded values, omitting None"""
+        parameter_names = [x['name'] for x in self.operation_parameters(operation)]
+        parameters = dict(zip(parameter_names, args))
+        parameters.update(kwargs)
+        return dict((k, _encode_scalar(v))
+                    for k, v in parameters.items() if v is not None)
+
+    def _http_get(self, operation, args, kwargs):
+        """Invoke the GET operation directly over HTTP, answering the
+        decoded response and its size as received"""
+        query = urlencode(sorted(self._parameters(operation, args, kwargs).items()))
+        url = 'http://{hostname}:{port}/{service}/{operation}'.format(
+                hostname=self.backend.hostname,
+                port=self.backend.port,
+                service=self.service_name,
+                operation=operation)
+        if len(query) > 0:
+            url = "{0}?{1}".format(url, query)
+        if self.backend.transport == 'json':
+            accept = 'application/json'
+        else:
+            accept = 'text/xml'
+        response = self.backend.http.request('GET', url, headers={'Accept': accept})
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        data = response.data
+        return_type = self.operation_return_type(operation)
+        if 'json' in content_type:
+            value = json.loads(data.decode('utf-8'))
+            # The result is wrapped in an object named after its type
+            value = list(value.values())[0]
+            return self._decode_json(return_type, value), len(data)
+        return self._decode_xml(return_type, fromstring(data)), len(data)
+
+    def call(self, operation, *args, **kwargs):
+        """Invoke the requested operation, answering the response.
+
+        GET operations are answered from the backend's response cache if
+        possible, otherwise they are sent using the backend's transport,
+        falling back to suds if the response can't be retrieved or decoded.
+        All other operations are sent using suds, and discard the cached
+        responses of the receiver's service.
+
+        The call is recorded in the backend's metrics if enabled."""
+        metrics = self.backend.metrics
+        if not metrics.enabled:
+            return self._call(operation, args, kwargs)[0]
+        name = "{0}.{1}".format(self.service_name, operation)
+        start = metrics.begin_call(name)
+        try:
+            response, cache_hit = self._call(operation, args, kwargs)
+        except Exception:
+            metrics.end_call(name, start, error=True)
+            raise
+        metrics.end_call(name, start, cache_hit=cache_hit)
+        return response
+
+    def _call(self, operation, args, kwargs):
+        """Invoke the requested operation, answering the response and
+        whether it was found in the cache (None if it wasn't looked up)"""
+        if self.operation_verb(operation) != 'GET':
+            response = self._suds_call(operation, args, kwargs)[0]
+            self.backend.response_cache.invalidate(self.service_name)
+            return response, None
+        cache = self.backend.response_cache
+        ttl = cache.operation_ttl(self.service_name, operation)
+        if ttl <= 0:
+            return self._get(operation, args, kwargs)[0], None
+        key = cache.key(self.service_name, operation,
+                        self._parameters(operation, args, kwargs))
+        response = cache.get(key)
+        if response is not None:
+            return response, True
+        # A POST on the service while the GET is in flight makes its
+        # response stale
+        generation = cache.generation(self.service_name)
+        response, size = self._get(operation, args, kwargs)
+        cache.put(key, response, ttl, size, generation)
+        return response, False
+
+    def _get(self, operation, args, kwargs):
+        """Invoke the GET operation using the backend's transport,
+        answering the response and its size as received"""
+        if self.backend.transport != 'soap':
+            try:
+                return self._http_get(operation, args, kwargs)
+            except (HTTPError, ValueError, XMLSyntaxError) as e:
+                logger.debug("{0}.{1}: {2} failed ({3}), using suds".format(
+                    self.service_name, operation, self.backend.transport, e))
+        return self._suds_call(operation, args, kwargs)
+
+    def _suds_call(self, operation, args, kwargs):
+        """Invoke the operation using suds, answering the response and the
+        size of the reply (None if unknown).
+        The request and reply documents, which the suds client holds until
+        the next call (client.last_received()), aren't kept."""
+        client = self.client
+        try:
+            response = getattr(client.service, operation)(*args, **kwargs)
+        finally:
+            client.messages.update(tx=None, rx=None)
+        return response, getattr(client.options.transport, 'reply_size', None)
+
+    def validate_args(self, operation, args):
+        """Check the supplied (string) arguments against the operation's
+        parameters, raising MythTVServiceException if they are invalid"""
+        parameters = self.operation_parameters(operation)
+        if len(args) > len(parameters):
+            raise MythTVServiceException(
+                "{0} takes at most {1} parameter(s), got {2}".format(
+                    operation, len(parameters), len(args)))
+        for parameter, arg in zip(parameters, args):
+            local_type = (parameter['type'] or "").split(':')[-1]
+            if local_type in INTEGER_TYPES:
+                try:
+                    int(arg)
+                except ValueError:
+                    raise MythTVServiceException(
+                        "{0}: {1} must be an integer, got '{2}'".format(
+                            operation, parameter['name'], arg))
+        return
+
     def execute_args(self, args):
         op_name = args[0]
         op_args = args[1:]
@@ -180,7 +665,8 @@ class MythTVServiceAPI(object):
             self.print_operation_help(op_name)
             resp = ""
         else:
-            resp = getattr(self.client.service, op_name)(*op_args)
+            self.validate_args(op_name, op_args)
+            resp = self.call(op_name, *op_args)
         return resp
 
     def __repr__(self):
@@ -0,0 +1,242 @@
+"""
+Module: stats.py
+
+Instrumentation of the service calls and model construction.
+
+Each MythTVBackend has a MythTVStats (backend.metrics) which records, per
+"Service.Operation":
+
+- the number of calls, errors and response cache hits and misses,
+- the latency of the complete call, including suds unmarshalling,
+- the latency and request and response bytes of the HTTP requests sent
+  on behalf of the call,
+
+and, per model class, the time taken by MythTVClass.from_element().
+The difference between the call and HTTP latencies is the time spent
+encoding and decoding (suds or the json / xml decoders).
+
+Collection is disabled unless settings.COLLECT_STATS is True, or
+enabled is set (see the --stats option of the CLIs).  When disabled the
+instrumented code only tests MythTVStats.enabled.
+
+MythTVBackend.stats() answers a snapshot of the statistics as a dict, and
+format_stats() answers it as printable lines.
+"""
+
+import math
+import time
+from threading import Lock, local
+
+from mythtvlib.settings import settings
+
+
+
+class MythTVHistogram(object):
+    """A latency histogram with logarithmic buckets.
+
+    Each bucket is 2**(1/8) (about 9%) wider than the previous one, so the
+    answered percentiles are accurate to within that, while recording a
+    value is a constant time operation."""
+
+    # Bucket 0 holds values up to 1 microsecond
+    minimum = 1e-6
+    buckets_per_doubling = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        return
+
+    def add(self, value):
+        if value <= self.minimum:
+            bucket = 0
+        else:
+            bucket = int(math.ceil(
+                math.log2(value / self.minimum) * self.buckets_per_doubling))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        return
+
+    def percentile(self, percent):
+        "Answer the (upper bound of the) requested percentile"
+        if self.count == 0:
+            return 0.0
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                upper = self.minimum * 2 ** (bucket / self.buckets_per_doubling)
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        "Answer the count, mean, percentiles and max in milliseconds"
+        mean = self.total / self.count if self.count > 0 else 0.0
+        return {
+            'count': self.count,
+            'mean': mean * 1000,
+            'p50': self.percentile(50) * 1000,
+            'p95': self.percentile(95) * 1000,
+            'p99': self.percentile(99) * 1000,
+            'max': self.max * 1000,
+            }
+
+
+
+class MythTVOperationStats(object):
+    """The statistics of a single operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = MythTVHistogram()
+        self.http_requests = 0
+        self.http_latency = MythTVHistogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        return
+
+    def summary(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'latency': self.latency.summary(),
+            'http_requests': self.http_requests,
+            'http_latency': self.http_latency.summary(),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            }
+
+
+
+class MythTVStats(object):
+    """Collect the statistics of a single backend"""
+
+    def __init__(self, enabled=None):
+        self.enabled = enabled
+        if self.enabled is None:
+            self.enabled = bool(getattr(settings, "COLLECT_STATS", False))
+        self._lock = Lock()
+        # The name of the operation being called by each thread,
+        # HTTP requests are recorded against it
+        self._current = local()
+        self.operations = {}
+        self.models = {}
+        return
+
+    def _operation(self, name):
+        "Answer the MythTVOperationStats for name (with the lock held)"
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = MythTVOperationStats()
+            self.operations[name] = stats
+        return stats
+
+    def begin_call(self, name):
+        "Note that the current thread is calling operation name"
+        self._current.name = name
+        return time.perf_counter()
+
+    def end_call(self, name, start, error=False, cache_hit=None):
+        """Record the call of name started at start (see begin_call()).
+        cache_hit is None if the response cache wasn't consulted."""
+        elapsed = time.perf_counter() - start
+        self._current.name = None
+        with self._lock:
+            stats = self._operation(name)
+            stats.calls += 1
+            stats.latency.add(elapsed)
+            if error:
+                stats.errors += 1
+            if cache_hit is True:
+                stats.cache_hits += 1
+            elif cache_hit is False:
+                stats.cache_misses += 1
+        return
+
+    def record_http(self, elapsed, request_bytes, response_bytes):
+        """Record an HTTP request against the operation being called by
+        the current thread, or '(none)', e.g. the WSDL"""
+        name = getattr(self._current, 'name', None) or '(none)'
+        with self._lock:
+            stats = self._operation(name)
+            stats.http_requests += 1
+            stats.http_latency.add(elapsed)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+        return
+
+    def record_model(self, name, elapsed):
+        "Record the construction of a model of class name"
+        with self._lock:
+            histogram = self.models.get(name)
+            if histogram is None:
+                histogram = MythTVHistogram()
+                self.models[name] = histogram
+            histogram.add(elapsed)
+        return
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.models = {}
+        return
+
+    def summary(self):
+        "Answer the statistics as a dict"
+        with self._lock:
+            return {
+                'operations': dict((k, v.summary())
+                                   for k, v in self.operations.items()),
+                'models': dict((k, v.summary()) for k, v in self.models.items()),
+                }
+
+
+
+def format_stats(stats):
+    "Answer the lines describing the supplied MythTVBackend.stats()"
+    latency_header = "{0:>8} {1:>8} {2:>8} {3:>8} {4:>8}".format(
+        "mean ms", "p50", "p95", "p99", "max")
+    latency_format = "{mean:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {max:>8.1f}"
+    lines = ["Operations:"]
+    lines.append("    {0:<36} {1:>6} {2:>6} {3:>11} {4}  {5:>5} {6:>10} {7:>10}".format(
+        "Name", "Calls", "Errors", "Cache h/m", latency_header, "HTTP", "Sent",
+        "Received"))
+    for name in sorted(stats['operations']):
+        op = stats['operations'][name]
+        lines.append("    {0:<36} {1:>6} {2:>6} {3:>11} {4}  {5:>5} {6:>10} {7:>10}".format(
+            name, op['calls'], op['errors'],
+            "{0}/{1}".format(op['cache_hits'], op['cache_misses']),
+            latency_format.format(**op['latency']), op['http_requests'],
+            op['request_bytes'], op['response_bytes']))
+    lines.append("HTTP latency:")
+    lines.append("    {0:<36} {1:>6} {2}".format("Name", "Count", latency_header))
+    for name in sorted(stats['operations']):
+        latency = stats['operations'][name]['http_latency']
+        if latency['count'] > 0:
+            lines.append("    {0:<36} {1:>6} {2}".format(
+                name, latency['count'], latency_format.format(**latency)))
+    if len(stats['models']) > 0:
+        lines.append("Models (from_element):")
+        lines.append("    {0:<36} {1:>6} {2}".format("Name", "Count", latency_header))
+        for name in sorted(stats['models']):
+            latency = stats['models'][name]
+            lines.append("    {0:<36} {1:>6} {2}".format(
+                name, latency['count'], latency_format.format(**latency)))
+    http = stats['http']
+    lines.append(("Connections: {connections} opened, {requests} requests, "
+                  "{reused} reused, {retries} retries").format(**http))
+    cache = stats['response_cache']
+    lines.append(("Response cache: {hits} hits, {misses} misses, {entries} entries, "
+                  "{bytes} bytes").format(**cache))
+    return lines
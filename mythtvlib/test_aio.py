@@ -0,0 +1,110 @@
+"""
+Test the mythtvlib.aio module
+"""
+
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from mythtvlib.aio import MythTVAsyncBackend, MythTVAsyncQuerySet
+from mythtvlib.object import MythTVClass
+from mythtvlib.query import MythTVObjectDoesNotExist
+
+
+class AsyncTestRecord(MythTVClass):
+    "A model with two partitions, each of which waits for the other"
+
+    barrier = None
+
+    @classmethod
+    def definition(cls):
+        return {'name': 'AsyncTestRecord', 'keys': ['Id'], 'primary_key': ('Id',)}
+
+    @classmethod
+    def partitions(cls, backend=None):
+        return [1, 2]
+
+    @classmethod
+    def partition(cls, key, backend=None):
+        cls.barrier.wait()
+        return [cls(Id=str(key * 10 + x)) for x in range(2)]
+
+
+
+class TestAsync(unittest.TestCase):
+
+    def setUp(self):
+        AsyncTestRecord.barrier = threading.Barrier(2, timeout=5)
+        self.backend = mock.Mock()
+        self.backend.http.size = 4
+        self.async_backend = MythTVAsyncBackend(backend=self.backend)
+        self.addCleanup(self.async_backend.close)
+        return
+
+    def test_call(self):
+        "Service calls are run in the executor"
+        api = self.backend.service_api.return_value
+        api.call.side_effect = lambda op, *args: (op, threading.current_thread())
+        response = asyncio.run(
+            self.async_backend.service_api("Channel").call("GetChannelInfo", 1001))
+        self.assertEqual(response[0], "GetChannelInfo")
+        self.assertIsNot(response[1], threading.current_thread())
+        api.call.assert_called_once_with("GetChannelInfo", 1001)
+        return
+
+    def test_partitions_concurrent(self):
+        "The partitions are retrieved concurrently and filtered"
+        with mock.patch('mythtvlib.object.MythTVBackend'):
+            query = MythTVAsyncQuerySet('AsyncTestRecord', self.async_backend)
+            records = asyncio.run(query.filter(Id='1$').all())
+
+            async def iterate():
+                return [x.Id async for x in MythTVAsyncQuerySet(
+                    'AsyncTestRecord', self.async_backend)]
+            ids = asyncio.run(iterate())
+        self.assertEqual([x.Id for x in records], ['11', '21'])
+        self.assertEqual(ids, ['10', '11', '20', '21'])
+        return
+
+    def test_queries(self):
+        "The methods that retrieve records are coroutines"
+        AsyncTestRecord.barrier = threading.Barrier(1)
+        with mock.patch('mythtvlib.object.MythTVBackend'):
+            query = MythTVAsyncQuerySet('AsyncTestRecord', self.async_backend)
+
+            async def queries():
+                return (await query.count(), (await query.first()).Id,
+                        await query.filter(Id='^3').exists(),
+                        (await query.get(Id='21')).Id,
+                        sorted(await query.in_bulk('Id', ['10', '99'])),
+                        sorted(await query.index_by('Id')))
+            results = asyncio.run(queries())
+            with self.assertRaises(MythTVObjectDoesNotExist):
+                asyncio.run(query.get(Id='99'))
+        self.assertEqual(results, (4, '10', False, '21', ['10'],
+                                   ['10', '11', '20', '21']))
+        return
+
+    def test_blocking(self):
+        "The synchronous retrieval raises TypeError"
+        query = MythTVAsyncQuerySet('AsyncTestRecord', self.async_backend)
+        with self.assertRaises(TypeError):
+            list(query)
+        with self.assertRaises(TypeError):
+            len(query)
+        with self.assertRaises(TypeError):
+            query[0]
+        return
+
+    def test_default(self):
+        "The default async backend is created once"
+        with mock.patch.object(MythTVAsyncBackend, '_default', None), \
+                mock.patch('mythtvlib.aio.MythTVBackend') as backend_class:
+            backend_class.default.return_value.http.size = 2
+            default = MythTVAsyncBackend.default()
+            self.addCleanup(default.close)
+            self.assertIs(MythTVAsyncBackend.default(), default)
+            self.assertIs(MythTVAsyncQuerySet('AsyncTestRecord').async_backend,
+                          default)
+        return
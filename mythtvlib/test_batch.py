@@ -0,0 +1,59 @@
+"""
+Test the mythtvlib.batch module
+"""
+
+import unittest
+from io import StringIO
+from unittest import mock
+
+from mythtvlib.batch import MythTVBatch, read_batch
+from mythtvlib.services import MythTVServiceException
+
+BATCH = """# Channels
+Channel GetChannelInfo 1001
+
+Channel GetChannelInfo 1002
+Channel GetChanelInfo
+Myth "GetHostName
+Channel GetChannelInfo help
+"""
+
+
+def execute_args(args):
+    if args[0] != 'GetChannelInfo':
+        raise MythTVServiceException("Unknown Channel operation: " + args[0])
+    return "(ChannelInfo){{\n   ChanId = {0}\n }}".format(args[1])
+
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = mock.Mock()
+        self.backend.service_api.return_value.execute_args.side_effect = execute_args
+        self.items = read_batch(StringIO(BATCH))
+        return
+
+    def test_read(self):
+        "Blank and comment lines are skipped, invalid lines are errors"
+        self.assertEqual([x.line_number for x in self.items], [2, 4, 5, 6, 7])
+        self.assertEqual([x.error is None for x in self.items],
+                         [True, True, True, False, False])
+        self.assertEqual(self.items[1].args, ['1002'])
+        return
+
+    def test_run(self):
+        "Each outcome is written tagged with its line number"
+        output = StringIO()
+        runner = MythTVBatch(self.backend, workers=2)
+        self.assertEqual(runner.run(self.items, output), 3)
+        lines = output.getvalue().splitlines()
+        self.assertIn("2:    ChanId = 1001", lines)
+        self.assertIn("4:    ChanId = 1002", lines)
+        self.assertIn("5: ERROR: Unknown Channel operation: GetChanelInfo", lines)
+        self.assertEqual(len([x for x in lines if x.startswith("6: ERROR")]), 1)
+        summary = runner.summary(self.items)
+        self.assertTrue(summary[0].startswith("5 operation(s), 3 failed"))
+        self.assertEqual(summary[2].split()[:3], ['Channel.GetChanelInfo', '1', '1'])
+        self.assertEqual(summary[3].split()[:3], ['Channel.GetChannelInfo', '2', '0'])
+        return
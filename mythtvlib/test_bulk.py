@@ -0,0 +1,136 @@
+"""
+Test the mythtvlib.bulk module and the MythTVClass change tracking
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mythtvlib.bulk import MythTVBulkSave, MythTVRateLimiter
+from mythtvlib.object import MythTVClass, MythTVObjectException
+from mythtvlib.services import MythTVServiceObject
+
+
+class BulkTestRecord(MythTVClass):
+    "A model whose saves are recorded, failing for Id 3"
+
+    saved = []
+
+    @classmethod
+    def definition(cls):
+        return {'name': 'BulkTestRecord', 'keys': ['Id', 'CallSign'],
+                'primary_key': ('Id',), 'update_attributes': ['CallSign']}
+
+    def save(self):
+        time.sleep(0.01)
+        if self.Id == 3:
+            raise ValueError("bad channel")
+        BulkTestRecord.saved.append((self.Id, threading.get_ident()))
+        self._changes.clear()
+        return
+
+
+
+def loaded_records(count):
+    backend = mock.Mock()
+    return [BulkTestRecord.from_element(
+                MythTVServiceObject('BulkTestRecord', {'Id': i, 'CallSign': 'C{0}'.format(i)}),
+                backend=backend)
+            for i in range(count)]
+
+
+
+class TestChanges(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('mythtvlib.object.MythTVBackend')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return
+
+    def test_changes(self):
+        "Only changes to the loaded values are tracked"
+        record = loaded_records(1)[0]
+        self.assertFalse(record.needs_save())
+        record.CallSign = 'C0'
+        self.assertEqual(record.changes(), {})
+        record.CallSign = 'New'
+        record.CallSign = 'Newer'
+        self.assertEqual(record.changes(), {'CallSign': ('C0', 'Newer')})
+        self.assertTrue(record.needs_save())
+        record.CallSign = 'C0'
+        self.assertFalse(record.needs_save())
+        with self.assertRaises(MythTVObjectException):
+            record.Id = 5
+        # Records that weren't retrieved always need saving
+        self.assertTrue(BulkTestRecord(Id=1, CallSign='x').needs_save())
+        return
+
+
+
+class TestBulkSave(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('mythtvlib.object.MythTVBackend')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        BulkTestRecord.saved = []
+        return
+
+    def test_report(self):
+        "Unchanged records are skipped, failures are reported per record"
+        records = loaded_records(6)
+        for record in records[1:5]:
+            record.CallSign = 'New'
+        report = BulkTestRecord.bulk_save(records, workers=4)
+        self.assertEqual(sorted([x[0] for x in BulkTestRecord.saved]), [1, 2, 4])
+        self.assertEqual(len(set([x[1] for x in BulkTestRecord.saved])), 3)
+        self.assertEqual([x.record.Id for x in report.saved], [1, 2, 4])
+        self.assertEqual([x.record.Id for x in report.unchanged], [0, 5])
+        self.assertEqual([x.record.Id for x in report.failed], [3])
+        self.assertEqual(report.failed[0].error, "ValueError: bad channel")
+        self.assertEqual(report.saved[0].changes, {'CallSign': ('C1', 'New')})
+        self.assertTrue(report.summary().startswith(
+            "6 record(s): 3 saved, 2 unchanged, 1 failed"))
+        # The failed record still needs saving
+        report = BulkTestRecord.bulk_save(records, workers=4)
+        self.assertEqual([x.record.Id for x in report.failed], [3])
+        self.assertEqual(len(report.unchanged), 5)
+        return
+
+    def test_serial(self):
+        "A single worker saves in order on the calling thread"
+        records = loaded_records(4)
+        for record in records:
+            record.CallSign = 'New'
+        report = MythTVBulkSave(workers=1, rate=0).run(records)
+        self.assertEqual(BulkTestRecord.saved, [(0, threading.get_ident()),
+                                                (1, threading.get_ident()),
+                                                (2, threading.get_ident())])
+        self.assertEqual(report.workers, 1)
+        return
+
+    def test_rate(self):
+        "The rate limiter spaces the calls across threads"
+        limiter = MythTVRateLimiter(50)
+        starts = []
+        def call():
+            limiter.wait()
+            starts.append(time.monotonic())
+        threads = [threading.Thread(target=call) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        starts.sort()
+        self.assertGreaterEqual(starts[-1] - starts[0], 0.075)
+        start = time.monotonic()
+        MythTVRateLimiter(0).wait()
+        self.assertLess(time.monotonic() - start, 0.01)
+        return
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+"""
+Test mythtvlib against the stand-in backend, mythtvlib.fake_backend
+"""
+
+import asyncio
+import time
+import unittest
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from suds import WebFault
+from suds.bindings.multiref import MultiRef
+
+from mythtvlib import services, wsdl_cache
+from mythtvlib.aio import MythTVAsyncBackend, MythTVAsyncQuerySet
+from mythtvlib.backend import MythTVBackend
+from mythtvlib.batch import MythTVBatch, read_batch
+from mythtvlib.fake_backend import MythTVFakeBackend
+from mythtvlib.models import ChannelInfo
+from mythtvlib.query import MythTVQuerySet
+from mythtvlib.services import array_items
+
+
+class FakeBackendTestCase(unittest.TestCase):
+    "Start a fake backend and use a temporary WSDL cache"
+
+    channels = 30
+    sources = 2
+
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = mock.patch.object(wsdl_cache, 'get_tmp_dir',
+                                    return_value=tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        services._schema_sources.clear()
+        self.fake = MythTVFakeBackend(channels=self.channels, sources=self.sources)
+        self.fake.start()
+        self.addCleanup(self.fake.stop)
+        return
+
+    def new_backend(self, transport='soap'):
+        backend = MythTVBackend(self.fake.hostname, self.fake.port, transport)
+        self.addCleanup(backend.http.close)
+        return backend
+
+    def slow_replies(self):
+        """Widen the window in which suds processes each reply, so that
+        concurrent calls overlap"""
+        build_catalog = MultiRef.build_catalog
+        def slow_build_catalog(multiref, body):
+            time.sleep(0.002)
+            return build_catalog(multiref, body)
+        patcher = mock.patch.object(MultiRef, 'build_catalog', slow_build_catalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return
+
+
+
+class TestFakeBackend(FakeBackendTestCase):
+
+    def test_transports_agree(self):
+        "Each transport answers the same channels"
+        results = []
+        for transport in services.TRANSPORTS:
+            api = self.new_backend(transport).service_api("Channel")
+            channels = api.call("GetChannelInfoList", 2)
+            results.append([(x.ChanId, x.CallSign, x.Visible, x.XMLTVID)
+                            for x in array_items(channels.ChannelInfos)])
+        self.assertEqual(len(results[0]), self.channels // self.sources)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        return
+
+    def test_save(self):
+        "Updated channels are saved on the backend"
+        backend = self.new_backend()
+        channel = MythTVQuerySet('ChannelInfo', backend).filter(
+            ChanId='^100001$').all()[0]
+        channel.CallSign = 'Updated'
+        channel.save()
+        self.assertEqual(self.fake.data.channels[100001]['CallSign'], 'Updated')
+        channel = MythTVQuerySet('ChannelInfo', backend).filter(
+            ChanId='^100001$').all()[0]
+        self.assertEqual(channel.CallSign, 'Updated')
+        return
+
+    def test_update(self):
+        "update() saves the changed channels concurrently"
+        backend = self.new_backend()
+        query = MythTVQuerySet('ChannelInfo', backend).filter(SourceId__exact=1)
+        report = query.filter(ChanNum__in=['1', '3', '5']).update(XMLTVID='new.example.com')
+        self.assertEqual(len(report.saved), 3)
+        self.assertEqual(self.fake.data.channels[100003]['XMLTVID'], 'new.example.com')
+        requests = self.fake.request_count
+        report = query.update(XMLTVID='new.example.com')
+        self.assertEqual((len(report.saved), len(report.unchanged)), (12, 3))
+        self.assertEqual(self.fake.request_count, requests + 1 + 12)
+        self.assertEqual(len(query.filter(XMLTVID__exact='new.example.com')), 15)
+        return
+
+    def test_update_concurrent(self):
+        "Concurrent saves are each reported against their own record"
+        self.slow_replies()
+        query = MythTVQuerySet('ChannelInfo', self.new_backend())
+        channels = query.all()
+        for channel in channels:
+            channel.CallSign = 'New{0}'.format(channel.ChanId)
+        report = channels[0].bulk_save(channels, workers=8)
+        self.assertEqual(len(report.saved), self.channels)
+        for chan_id, channel in self.fake.data.channels.items():
+            self.assertEqual(channel['CallSign'], 'New{0}'.format(chan_id))
+        return
+
+    def test_async_partitions(self):
+        "The partitions retrieved concurrently by asyncio each get their own reply"
+        self.slow_replies()
+        async_backend = MythTVAsyncBackend(backend=self.new_backend('soap'))
+        self.addCleanup(async_backend.executor.shutdown)
+        channels = asyncio.run(MythTVAsyncQuerySet('ChannelInfo', async_backend).all())
+        self.assertEqual(sorted([x.ChanId for x in channels]),
+                         sorted(self.fake.data.channels))
+        for channel in channels:
+            self.assertEqual(channel.SourceId, channel.ChanId // 100000)
+        return
+
+    def test_plain_values(self):
+        "Records hold plain python values, whatever the transport"
+        for transport in services.TRANSPORTS:
+            backend = self.new_backend(transport)
+            channel = MythTVQuerySet('ChannelInfo', backend).filter(
+                ChanId__exact=100001).all()[0]
+            self.assertIs(type(channel.CallSign), str, transport)
+            self.assertIs(type(channel.ChanId), int, transport)
+            self.assertIsNone(backend.service_api("Channel").client.last_received())
+        return
+
+    def test_concurrent_soap(self):
+        "Concurrent suds calls each answer their own reply"
+        self.slow_replies()
+        chan_ids = sorted(self.fake.data.channels) * 2
+        lines = ["Channel GetChannelInfo {0}\n".format(x) for x in chan_ids]
+        items = read_batch(StringIO("".join(lines)))
+        backend = self.new_backend('soap')
+        # Send every call to the backend
+        backend.response_cache.ttl = 0
+        runner = MythTVBatch(backend, workers=8)
+        self.assertEqual(runner.run(items, StringIO()), 0)
+        self.assertEqual([x.response.ChanId for x in items], chan_ids)
+        return
+
+    def test_fault(self):
+        "Unknown channels raise a SOAP fault"
+        with self.assertRaises(WebFault):
+            self.new_backend().service_api("Channel").call("GetChannelInfo", 1)
+        return
+
+    def test_profile(self):
+        "The profile describes the fake backend"
+        backend = self.new_backend('json')
+        profile = MythTVQuerySet('Profile', backend).all()[0]
+        self.assertEqual(profile.channel_count, self.channels)
+        self.assertEqual(profile.sourcecount, self.sources)
+        return
+
+    def test_wsdl_cached(self):
+        "A second backend process uses the cached WSDL"
+        self.new_backend().service_api("Channel").call("GetVideoSourceList")
+        count = self.fake.request_count
+        services._schema_sources.clear()
+        self.new_backend().service_api("Channel").call("GetVideoSourceList")
+        self.assertEqual(self.fake.request_count, count + 1)
+        return
+
+    def test_version_upgrade(self):
+        "A running process reloads the WSDL once the backend is upgraded"
+        backend = self.new_backend()
+        api = backend.service_api("Channel")
+        api.call("GetVideoSourceList")
+        old_fname = api.wsdl_fname
+        old_client = api.client
+        self.fake.data.version = 'v0.28-1-g0123abcd'
+        api.call("GetVideoSourceList")
+        self.assertEqual(api.wsdl_fname, old_fname)
+        ttl = backend.wsdl_cache.ttl
+        with mock.patch.object(wsdl_cache.time, 'time',
+                               return_value=time.time() + ttl + 1):
+            api.call("GetVideoSourceList")
+            self.assertNotEqual(api.wsdl_fname, old_fname)
+            self.assertIsNot(api.client, old_client)
+        self.assertIn('0.28', backend.wsdl_cache.info()['version'])
+        return
+
+    def test_pushdown(self):
+        "Exact ChanId and SourceId filters only retrieve the matching channels"
+        backend = self.new_backend()
+        backend.metrics.enabled = True
+        query = MythTVQuerySet('ChannelInfo', backend)
+        tests = [({'ChanId': '^100003$'}, [100003], 'Channel.GetChannelInfo'),
+                 ({'ChanId': '^100004$'}, [], 'Channel.GetChannelInfo'),
+                 ({'SourceId': '^2$', 'ChanNum': '^1'}, [200010, 200012, 200014,
+                  200016, 200018], 'Channel.GetChannelInfoList')]
+        for filters, chan_ids, operation in tests:
+            backend.metrics.reset()
+            channels = query.filter(**filters).all()
+            self.assertEqual([x.ChanId for x in channels], chan_ids)
+            calls = [k for k, v in backend.stats()['operations'].items()
+                     if v['calls'] > 0]
+            self.assertEqual(calls, [operation])
+        return
+
+    def test_pushdown_lazy(self):
+        "count(), exists() and first() with pushed down filters build few records"
+        query = MythTVQuerySet('ChannelInfo', self.new_backend('json'))
+        with mock.patch.object(ChannelInfo, 'from_element',
+                               wraps=ChannelInfo.from_element) as from_element:
+            self.assertEqual(query.filter(SourceId__exact=1).count(),
+                             self.channels // self.sources)
+            self.assertTrue(query.filter(ChanId__exact=100003).exists())
+            from_element.assert_not_called()
+            channel = query.filter(SourceId__exact=2).first()
+            self.assertEqual(channel.SourceId, 2)
+            self.assertEqual(from_element.call_count, 1)
+        return
@@ -0,0 +1,84 @@
+"""
+Test the start up cost of the console entry points.
+
+--help, --version and argument errors must not import the heavy modules
+(suds, lxml, the backend and models) or the settings, and the total time
+spent importing, as reported by python -X importtime, must stay within
+IMPORT_TIME_BUDGET.
+"""
+
+import subprocess
+import sys
+import unittest
+from os.path import abspath, dirname, join
+from tempfile import TemporaryDirectory
+
+# Total self time of all imports, in seconds.  Loading the whole of
+# mythtvlib at start up takes around 0.19s, the entry points currently
+# take around 0.05s.
+IMPORT_TIME_BUDGET = 0.12
+
+# Modules that must only be imported by the commands that need them
+DEFERRED_MODULES = ['suds', 'lxml', 'logging.config', 'mythtvlib.backend',
+                    'mythtvlib.models', 'mythtvlib.query', 'mythtvlib.services',
+                    'mythtvlib.settings', 'mythtv_cli_settings']
+
+ENTRY_POINTS = ['mythtv_cli', 'mythtv_chanmaint']
+
+
+def import_times(script, args):
+    """Answer a dictionary of module name -> self import time (seconds)
+    of running the script with args"""
+    with TemporaryDirectory() as tmp_dir:
+        # Run from an empty directory so no settings file is found
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', script] + args,
+            cwd=tmp_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            # Header
+            continue
+        times[fields[2].strip()] = int(fields[0]) / 1e6
+    return times
+
+
+
+class TestImportTime(unittest.TestCase):
+
+    def check_entry_point(self, name, args):
+        script = join(dirname(abspath(__file__)), name + '.py')
+        times = import_times(script, args)
+        self.assertIn('argparse', times)
+        for module in DEFERRED_MODULES:
+            imported = [x for x in times if x == module or x.startswith(module + '.')]
+            self.assertEqual(imported, [],
+                             "{0} {1} imported {2}".format(name, " ".join(args), module))
+        total = sum(times.values())
+        self.assertLess(total, IMPORT_TIME_BUDGET,
+                        "{0} {1} spent {2:.3f}s importing".format(name, " ".join(args), total))
+        return
+
+    def test_version(self):
+        for name in ENTRY_POINTS:
+            self.check_entry_point(name, ['--version'])
+        return
+
+    def test_help(self):
+        for name in ENTRY_POINTS:
+            self.check_entry_point(name, ['--help'])
+        return
+
+    def test_argument_error(self):
+        for name in ENTRY_POINTS:
+            self.check_entry_point(name, ['bogus'])
+        return
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Test the mythtvlib.object model registry and metadata
+"""
+
+import copy
+import pickle
+import unittest
+from unittest import mock
+
+from mythtvlib.models import ChannelInfo, Profile
+from mythtvlib.object import MythTVClass, MythTVObjectException
+from mythtvlib.services import MythTVServiceObject
+
+
+class MetaTestRecord(MythTVClass):
+    "A model defined outside mythtvlib"
+
+    @classmethod
+    def definition(cls):
+        return {'name': 'MetaTestRecord', 'keys': ['Id', 'Name'],
+                'primary_key': ('Id',), 'update_attributes': ['Name']}
+
+
+
+class AbstractTestRecord(MythTVClass):
+    "A model without a definition"
+    pass
+
+
+
+class TestModelMeta(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('mythtvlib.object.MythTVBackend')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return
+
+    def test_registry(self):
+        "Every model class with a definition is registered when created"
+        self.assertIs(MythTVClass.classname('ChannelInfo'), ChannelInfo)
+        self.assertIs(MythTVClass.classname('Profile'), Profile)
+        self.assertIs(MythTVClass.classname('MetaTestRecord'), MetaTestRecord)
+        self.assertIsNone(MythTVClass.classname('AbstractTestRecord'))
+        self.assertIsNone(MythTVClass.classname('Unknown'))
+        self.assertIsNone(ChannelInfo.classname('Profile'))
+        self.assertIsNone(AbstractTestRecord._meta)
+        return
+
+    def test_meta(self):
+        "The definition's lookup tables are computed once"
+        meta = ChannelInfo._meta
+        self.assertIs(meta.definition, ChannelInfo.definition())
+        self.assertIn('ChanId', meta.key_set)
+        self.assertEqual(meta.update_set, frozenset(['ChanNum', 'CallSign', 'ChannelName',
+                                                     'IconURL', 'Visible', 'XMLTVID']))
+        self.assertIn(('ChanId', 'ChannelID'), meta.post_mapping)
+        self.assertEqual(ChannelInfo.keys()[0], 'ChanId')
+        self.assertEqual(MetaTestRecord._meta.post_mapping, ())
+        return
+
+    def test_records(self):
+        "Records use their class's metadata"
+        record = MetaTestRecord(Id=1, Name='x')
+        self.assertEqual(repr(record), 'MetaTestRecord(Id=1)')
+        with self.assertRaises(TypeError):
+            MetaTestRecord(Id=1, Other='x')
+        backend = mock.Mock()
+        self.assertIs(MetaTestRecord(Id=1, _backend=backend)._backend, backend)
+        record._safe_mode = True
+        record.Name = 'y'
+        self.assertEqual(record.changes(), {'Name': ('x', 'y')})
+        with self.assertRaises(MythTVObjectException):
+            record.Id = 2
+        return
+
+    def test_slots(self):
+        "Records store their fields in slots rather than a __dict__"
+        record = MetaTestRecord(Id=1, Name='x')
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertIn('Name', MetaTestRecord.__slots__)
+        self.assertNotIn('_changes', MetaTestRecord.__slots__)
+        # Fields missing from the response are unset, as before
+        self.assertFalse(hasattr(MetaTestRecord.from_element(
+            MythTVServiceObject('MetaTestRecord', {'Id': 2})), 'Name'))
+        with self.assertRaises(AttributeError):
+            record.Other = 'x'
+        self.assertFalse(hasattr(ChannelInfo(ChanId=1), '__dict__'))
+        # The slots are computed without creating another class
+        self.assertEqual(len([x for x in MythTVClass.__subclasses__()
+                              if x.__name__ == 'MetaTestRecord']), 1)
+        return
+
+    def test_copy(self):
+        "Records can be copied and pickled"
+        backend = mock.Mock()
+        record = MetaTestRecord.from_element(
+            MythTVServiceObject('MetaTestRecord', {'Id': 1, 'Name': 'x'}),
+            backend=backend)
+        record.Name = 'y'
+        duplicate = copy.copy(record)
+        self.assertIs(duplicate._backend, backend)
+        self.assertEqual(duplicate.changes(), {'Name': ('x', 'y')})
+        duplicate.Name = 'x'
+        self.assertEqual(duplicate.changes(), {})
+        self.assertEqual(record.changes(), {'Name': ('x', 'y')})
+        with self.assertRaises(MythTVObjectException):
+            duplicate.Id = 2
+        for duplicate in (pickle.loads(pickle.dumps(record)), copy.deepcopy(record)):
+            self.assertEqual((duplicate.Id, duplicate.Name), (1, 'y'))
+            self.assertEqual(duplicate.changes(), {'Name': ('x', 'y')})
+            self.assertTrue(duplicate._safe_mode)
+            self.assertIsNot(duplicate._backend, backend)
+        unsaved = copy.copy(MetaTestRecord(Id=3))
+        self.assertFalse(hasattr(unsaved, 'Name'))
+        self.assertTrue(unsaved.needs_save())
+        return
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Test the mythtvlib.profiling module
+"""
+
+import importlib
+import pstats
+import sys
+import unittest
+from io import StringIO
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from mythtvlib.profiling import MythTVProfiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_from_argv(self):
+        "The profile options are read from, and stripped from, the arguments"
+        self.assertIsNone(MythTVProfiler.from_argv(['mythtv_cli', 'dump', 'Myth']))
+        profiler = MythTVProfiler.from_argv(
+            ['/usr/bin/mythtv_cli', '--profile', 'dump', 'Myth', 'help'])
+        self.assertEqual(profiler.mode, 'cprofile')
+        self.assertTrue(profiler.output.startswith('mythtv_cli-'))
+        self.assertTrue(profiler.output.endswith('.prof'))
+        argv = ['mythtv_chanmaint', '--profile=tracemalloc',
+                '--profile-output=x.tm', 'list', 'channels']
+        profiler = MythTVProfiler.from_argv(argv)
+        self.assertEqual((profiler.mode, profiler.output), ('tracemalloc', 'x.tm'))
+        self.assertEqual(MythTVProfiler.strip_args(argv[1:]), ['list', 'channels'])
+        argv = ['mythtv_cli', '--profile', 'tracemalloc', '--profile-output',
+                'x.tm', 'dump', 'Myth', 'help']
+        profiler = MythTVProfiler.from_argv(argv)
+        self.assertEqual((profiler.mode, profiler.output), ('tracemalloc', 'x.tm'))
+        self.assertEqual(MythTVProfiler.strip_args(argv[1:]), ['dump', 'Myth', 'help'])
+        with self.assertRaises(SystemExit):
+            MythTVProfiler.from_argv(['mythtv_cli', '--profile=bogus'])
+        return
+
+    def test_import(self):
+        "Importing the scripts doesn't start profiling"
+        with mock.patch.object(sys, 'argv', ['mythtv_cli', '--profile', 'dump']), \
+                mock.patch.object(MythTVProfiler, 'start') as start:
+            for name in ('mythtvlib.mythtv_cli', 'mythtvlib.mythtv_chanmaint'):
+                sys.modules.pop(name, None)
+                importlib.import_module(name)
+        start.assert_not_called()
+        return
+
+    def test_modes(self):
+        "Each mode writes its profile and a summary"
+        with TemporaryDirectory() as tmp_dir:
+            for mode in ('cprofile', 'tracemalloc'):
+                output = join(tmp_dir, mode)
+                profiler = MythTVProfiler(mode, output, top=5)
+                with mock.patch('mythtvlib.profiling.atexit'):
+                    profiler.start()
+                sorted(str(x) for x in range(1000))
+                stream = StringIO()
+                profiler.stop(stream=stream)
+                self.assertTrue(exists(output))
+                self.assertIn(output, stream.getvalue())
+            pstats.Stats(join(tmp_dir, 'cprofile'))
+        return
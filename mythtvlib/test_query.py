@@ -0,0 +1,327 @@
+"""
+Test the mythtvlib.query module
+"""
+
+import re
+import unittest
+from unittest import mock
+
+from mythtvlib.object import MythTVClass
+from mythtvlib.query import (MythTVMultipleObjectsReturned, MythTVObjectDoesNotExist,
+                             MythTVQueryException, MythTVQuerySet, compile_filters,
+                             filter_matcher)
+from mythtvlib.services import MythTVServiceObject
+
+
+class QueryTestRecord(MythTVClass):
+    "A model answering a fixed list of records, counting the retrievals"
+
+    fetches = 0
+
+    @classmethod
+    def definition(cls):
+        return {'name': 'QueryTestRecord', 'keys': ['Id', 'CallSign', 'SourceId'],
+                'primary_key': ('Id',), 'update_attributes': ['CallSign'],
+                'field_types': {'Id': int, 'SourceId': int}}
+
+    @classmethod
+    def partition(cls, key, backend=None):
+        cls.fetches += 1
+        return [cls(Id=i, CallSign='Channel {0}'.format(i // 2), SourceId=1 + i % 2)
+                for i in range(20)]
+
+
+
+class LazyTestRecord(MythTVClass):
+    "A model built from elements, recording the partitions retrieved"
+
+    retrieved = []
+
+    @classmethod
+    def definition(cls):
+        return {'name': 'LazyTestRecord', 'keys': ['Id', 'SourceId'],
+                'primary_key': ('Id',)}
+
+    @classmethod
+    def partitions(cls, backend=None):
+        return [1, 2, 3]
+
+    @classmethod
+    def partition_elements(cls, key, backend=None):
+        cls.retrieved.append(key)
+        return [MythTVServiceObject('LazyTestRecord', {'Id': key * 10 + i, 'SourceId': key})
+                for i in range(5)]
+
+
+
+class TestQuerySet(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('mythtvlib.object.MythTVBackend')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        QueryTestRecord.fetches = 0
+        return
+
+    def ids(self, records):
+        return [x.Id for x in records]
+
+    def test_and(self):
+        "Multiple filters must all match, each record is answered once"
+        query = MythTVQuerySet('QueryTestRecord')
+        records = query.filter(CallSign='Channel 1', SourceId='^2$').all()
+        self.assertEqual(self.ids(records), [3])
+        records = query.filter(CallSign='^Channel [12]$').filter(SourceId='1').all()
+        self.assertEqual(self.ids(records), [2, 4])
+        return
+
+    def test_filter_copies(self):
+        "filter() answers a new query, leaving the receiver unchanged"
+        query = MythTVQuerySet('QueryTestRecord')
+        self.assertEqual(len(query.all()), 20)
+        odd = query.filter(SourceId='2')
+        self.assertEqual(len(query._filters), 0)
+        self.assertEqual(len(query.all()), 20)
+        self.assertEqual(len(odd.all()), 10)
+        self.assertEqual(self.ids(odd.filter(Id='^1').all()), [1, 11, 13, 15, 17, 19])
+        self.assertEqual(len(odd.all()), 10)
+        self.assertEqual(QueryTestRecord.fetches, 1)
+        return
+
+    def test_lazy(self):
+        "The records are only retrieved and filtered by all()"
+        query = MythTVQuerySet('QueryTestRecord').filter(Id='0')
+        self.assertEqual(QueryTestRecord.fetches, 0)
+        with mock.patch('mythtvlib.query.compile_filters',
+                        wraps=compile_filters) as compiler:
+            self.assertEqual(self.ids(query.all()), [0, 10])
+            self.assertEqual(self.ids(query.all()), [0, 10])
+        self.assertEqual(compiler.call_count, 1)
+        self.assertEqual(QueryTestRecord.fetches, 1)
+        return
+
+    def test_pushdown(self):
+        "Exact filters are passed to the model, which may select the records"
+        query = MythTVQuerySet('QueryTestRecord')
+        selected = [MythTVServiceObject('QueryTestRecord',
+                                        {'Id': 3, 'CallSign': 'Channel 1', 'SourceId': 2}),
+                    MythTVServiceObject('QueryTestRecord',
+                                        {'Id': 4, 'CallSign': 'Channel 2', 'SourceId': 1})]
+        with mock.patch.object(QueryTestRecord, 'pushdown',
+                               return_value=selected) as pushdown:
+            records = query.filter(Id='^3$', CallSign='Channel').all()
+            # The remaining filters are applied to the selected records
+            self.assertEqual(self.ids(records), [3])
+            pushdown.assert_called_once_with({'Id': '3'}, backend=None)
+            self.assertEqual(QueryTestRecord.fetches, 0)
+            self.assertEqual(len(query.filter(CallSign='^Channel').all()), 20)
+            self.assertEqual(pushdown.call_count, 1)
+            # The selected elements are only built into records when needed
+            with mock.patch.object(QueryTestRecord, 'from_element') as from_element:
+                self.assertEqual(query.filter(Id__exact=3).count(), 1)
+                self.assertTrue(query.filter(Id__exact=3).exists())
+                from_element.assert_not_called()
+                query.filter(Id__exact=3).first()
+                self.assertEqual(from_element.call_count, 1)
+        # The default pushdown() can't select, so all the records are filtered
+        self.assertEqual(self.ids(query.filter(Id='^3$').all()), [3])
+        self.assertEqual(QueryTestRecord.fetches, 2)
+        return
+
+    def test_lazy_iteration(self):
+        "Iteration, indexing, slicing, first() and exists() stop early"
+        LazyTestRecord.retrieved = []
+        query = MythTVQuerySet('LazyTestRecord')
+        self.assertEqual(query.first().Id, 10)
+        self.assertTrue(query.exists())
+        self.assertEqual(query[6].Id, 21)
+        self.assertEqual(self.ids(query[3:7]), [13, 14, 20, 21])
+        for record in query.filter(SourceId='2'):
+            break
+        self.assertEqual(record.Id, 20)
+        self.assertEqual(LazyTestRecord.retrieved, [1, 1, 1, 2, 1, 2, 1, 2])
+        self.assertFalse(query.filter(Id='^99$').exists())
+        with self.assertRaises(IndexError):
+            query.filter(SourceId='3')[5]
+        self.assertEqual(query[-1].Id, 34)
+        self.assertEqual(len(query), 15)
+        return
+
+    def test_count(self):
+        "count() doesn't build records"
+        query = MythTVQuerySet('LazyTestRecord').filter(Id='[02]$')
+        with mock.patch.object(LazyTestRecord, 'from_element') as from_element:
+            self.assertEqual(query.count(), 6)
+        from_element.assert_not_called()
+        self.assertEqual(self.ids(query.all()), [10, 12, 20, 22, 30, 32])
+        self.assertEqual(query.count(), 6)
+        return
+
+    def test_indexes(self):
+        "Records are looked up by value, using indexes built once"
+        query = MythTVQuerySet('QueryTestRecord').filter(SourceId='1')
+        self.assertEqual(query.get(Id=4).CallSign, 'Channel 2')
+        self.assertEqual(query.get(CallSign='Channel 2').Id, 4)
+        self.assertEqual(self.ids(query.index_by('CallSign')['Channel 3']), [6])
+        self.assertEqual(sorted(query.in_bulk('Id', [0, 1, 2])), [0, 2])
+        # Values are converted to the field's type, as by filter()
+        self.assertEqual(query.get(Id='4').Id, 4)
+        self.assertEqual(query.get(Id='4', SourceId='1').Id, 4)
+        self.assertEqual(sorted(query.in_bulk('Id', ['0', '1', '2'])), ['0', '2'])
+        with self.assertRaises(MythTVObjectDoesNotExist):
+            query.get(Id=1)
+        with self.assertRaises(MythTVMultipleObjectsReturned):
+            MythTVQuerySet('QueryTestRecord').get(CallSign='Channel 2')
+        self.assertEqual(MythTVQuerySet('QueryTestRecord').get(
+            CallSign='Channel 2', SourceId=2).Id, 5)
+        index = query.index_by('Id')
+        self.assertIs(query.index_by('Id'), index)
+        # Changing a retrieved record invalidates the indexes
+        record = query.get(Id=4)
+        record._safe_mode = True
+        record.CallSign = 'Renamed'
+        self.assertIsNot(query.index_by('Id'), index)
+        self.assertEqual(query.get(CallSign='Renamed').Id, 4)
+        self.assertNotIn('Channel 2', query.index_by('CallSign'))
+        return
+
+    def test_lookups(self):
+        "Field lookups compare typed fields as their type, the others as strings"
+        query = MythTVQuerySet('QueryTestRecord')
+        self.assertEqual(self.ids(query.filter(Id__exact=3)), [3])
+        self.assertEqual(self.ids(query.filter(Id__exact='3')), [3])
+        self.assertEqual(self.ids(query.filter(CallSign__iexact='CHANNEL 1')), [2, 3])
+        self.assertEqual(self.ids(query.filter(Id__in=[1, 5, 50])), [1, 5])
+        self.assertEqual(self.ids(query.filter(CallSign__startswith='Channel 9')), [18, 19])
+        self.assertEqual(self.ids(query.filter(CallSign__contains='l 1')), [2, 3])
+        # Numeric, not string, comparisons
+        self.assertEqual(self.ids(query.filter(Id__gt=17)), [18, 19])
+        self.assertEqual(self.ids(query.filter(Id__gte=18)), [18, 19])
+        self.assertEqual(self.ids(query.filter(Id__lt=2)), [0, 1])
+        self.assertEqual(self.ids(query.filter(Id__lte='1')), [0, 1])
+        self.assertEqual(self.ids(query.filter(Id__range=(9, 11))), [9, 10, 11])
+        self.assertEqual(self.ids(query.filter(CallSign__regex='^Channel [12]$',
+                                               SourceId__exact=1)), [2, 4])
+        self.assertEqual(len(query.filter(CallSign__isnull=True)), 0)
+        self.assertEqual(len(query.filter(CallSign__isnull=False)), 20)
+        self.assertEqual(self.ids(query.filter(Id__lt=4, CallSign__exact='Channel 1')), [2, 3])
+        with self.assertRaises(MythTVQueryException):
+            query.filter(Id__gt='many')
+        with self.assertRaises(MythTVQueryException):
+            query.filter(Id__like='1')
+        return
+
+    def test_exclude(self):
+        "exclude() rejects the records matching all of its filters"
+        query = MythTVQuerySet('QueryTestRecord').filter(Id__lt=6)
+        self.assertEqual(self.ids(query.exclude(SourceId__exact=1)), [1, 3, 5])
+        self.assertEqual(self.ids(query.exclude(SourceId__exact=1, Id__gt=2)), [0, 1, 2, 3, 5])
+        self.assertEqual(self.ids(query.exclude(Id__in=[0, 1]).exclude(Id='^5$')), [2, 3, 4])
+        self.assertEqual(len(query._filters), 1)
+        self.assertEqual(self.ids(query.exclude()), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(len(MythTVQuerySet('QueryTestRecord').exclude()), 20)
+        # Excluded values aren't pushed down
+        with mock.patch.object(QueryTestRecord, 'pushdown', return_value=None) as pushdown:
+            query.exclude(Id__exact=1).all()
+            pushdown.assert_not_called()
+            query.filter(Id__exact=1).all()
+            pushdown.assert_called_once_with({'Id': 1}, backend=None)
+        return
+
+    def test_values(self):
+        "values() and values_list() answer projections without building records"
+        query = MythTVQuerySet('LazyTestRecord').filter(Id__lt=22)
+        with mock.patch.object(LazyTestRecord, 'from_element') as from_element:
+            self.assertEqual(query.values('Id')[:2], [{'Id': 10}, {'Id': 11}])
+            self.assertEqual(query.values().first(), {'Id': 10, 'SourceId': 1})
+            self.assertEqual(query.values_list('SourceId', 'Id')[5:], [(2, 20), (2, 21)])
+            self.assertEqual(query.values_list('Id')[0], (10,))
+            self.assertEqual(list(query.values_list('Id', flat=True)),
+                             [10, 11, 12, 13, 14, 20, 21])
+        from_element.assert_not_called()
+        with self.assertRaises(MythTVQueryException):
+            query.values_list('Id', 'SourceId', flat=True)
+        with self.assertRaises(MythTVQueryException):
+            query.values('Name')
+        with self.assertRaises(MythTVQueryException):
+            query.values('Id').index_by('Id')
+        return
+
+    def test_order_distinct(self):
+        "order_by() and distinct() apply to records and projections"
+        query = MythTVQuerySet('QueryTestRecord').filter(Id__lt=6)
+        self.assertEqual(self.ids(query.order_by('-Id')), [5, 4, 3, 2, 1, 0])
+        self.assertEqual(self.ids(query.order_by('-SourceId', 'Id')), [1, 3, 5, 0, 2, 4])
+        self.assertEqual(query.values_list('SourceId', flat=True).distinct().all(), [1, 2])
+        self.assertEqual(query.values('CallSign').order_by('-CallSign').distinct()[:2],
+                         [{'CallSign': 'Channel 2'}, {'CallSign': 'Channel 1'}])
+        self.assertEqual(query.values_list('SourceId').distinct().count(), 2)
+        self.assertEqual(query.values('SourceId').count(), 6)
+        # List and object values are compared by value
+        programs = MythTVQuerySet('QueryTestRecord')
+        programs._records = [
+            QueryTestRecord(Id=i, SourceId=1, CallSign=[MythTVServiceObject(
+                'Program', {'Title': 'News', 'Cast': [str(i % 2)]})])
+            for i in range(4)]
+        self.assertEqual(programs.values_list('CallSign', flat=True).distinct().count(), 2)
+        self.assertEqual(len(programs.values('SourceId', 'CallSign').distinct().all()), 2)
+        with self.assertRaises(MythTVQueryException):
+            query.order_by('-Name')
+        # Projections of retrieved records don't change them
+        records = query.all()
+        QueryTestRecord.fetches = 0
+        self.assertEqual(query.values_list('Id', flat=True).order_by('-Id')[0], 5)
+        self.assertEqual(query.values('Id').filter(SourceId__exact=2).values_list(
+            'Id', flat=True).all(), [1, 3, 5])
+        self.assertIs(query.all(), records)
+        self.assertEqual(QueryTestRecord.fetches, 0)
+        return
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(Exception):
+            MythTVQuerySet('QueryTestRecord').filter(Name='x')
+        with self.assertRaises(Exception):
+            MythTVQuerySet('QueryTestRecord').exclude(Name__exact='x')
+        return
+
+
+
+class TestCompileFilters(unittest.TestCase):
+
+    def test_matchers(self):
+        "The fast paths match the same values as the regex"
+        patterns = ['ABC', '^ABC', 'ABC$', '^ABC$', '^', '', 'A.C', '^A C$', '^(AB|C)']
+        values = ['ABC', 'xABC', 'ABCx', 'AB', 'ABC\n', 'A C', 'AxC', '']
+        for pattern in patterns:
+            regex = re.compile(pattern)
+            cost, matcher = filter_matcher(pattern, regex)
+            for value in values:
+                self.assertEqual(matcher(value), regex.search(value) is not None,
+                                 "{0!r} {1!r}".format(pattern, value))
+        return
+
+    def test_order(self):
+        "Cheap checks run first and the record is rejected by the first failure"
+        record = mock.Mock(A=1, B=2)
+        regex = mock.Mock()
+        regex.search.return_value = None
+        regex.pattern = '(x|y)+z'
+        regex_filter = ('B', 'regex', regex)
+        literal_filter = ('A', 'regex', re.compile('nomatch'))
+        predicate = compile_filters([(False, [regex_filter, literal_filter])])
+        self.assertFalse(predicate(record))
+        regex.search.assert_not_called()
+        predicate = compile_filters([(False, [regex_filter, ('A', 'exact', 2)])], {'A': int})
+        self.assertFalse(predicate(record))
+        regex.search.assert_not_called()
+        self.assertIsNone(compile_filters([]))
+        return
+
+    def test_none(self):
+        "Comparisons never match missing values"
+        record = mock.Mock(A=None)
+        for lookup, value in [('gt', 1), ('lt', 1), ('range', (0, 1)), ('in', {1})]:
+            predicate = compile_filters([(False, [('A', lookup, value)])], {'A': int})
+            self.assertFalse(predicate(record), lookup)
+        self.assertTrue(compile_filters([(False, [('A', 'isnull', True)])])(record))
+        return
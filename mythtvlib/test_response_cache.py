@@ -0,0 +1,120 @@
+"""
+Test the mythtvlib.response_cache module
+"""
+
+import time
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from mythtvlib import response_cache
+from mythtvlib.response_cache import MythTVResponseCache
+from mythtvlib.services import MythTVServiceAPI, MythTVServiceObject
+from mythtvlib.testing import StubBackend
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = StubBackend()
+        self.cache = MythTVResponseCache(self.backend, max_bytes=200, ttl=60,
+                                         ttls={'Channel.GetChannelInfo': 0})
+        return
+
+    def test_ttl(self):
+        "Responses expire after the operation's TTL"
+        key = self.cache.key('Channel', 'GetVideoSourceList', {})
+        self.cache.put(key, 'sources', 60, 100)
+        self.assertEqual(self.cache.get(key), 'sources')
+        with mock.patch.object(response_cache.time, 'time',
+                               return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.operation_ttl('Channel', 'GetChannelInfo'), 0)
+        self.assertEqual(self.cache.operation_ttl('Myth', 'GetChannelInfo'), 60)
+        return
+
+    def test_lru(self):
+        "The least recently used response is discarded"
+        keys = [self.cache.key('Channel', 'GetChannelInfoList', {'SourceID': str(x)})
+                for x in range(3)]
+        self.cache.put(keys[0], 0, 60, 100)
+        self.cache.put(keys[1], 1, 60, 100)
+        self.cache.get(keys[0])
+        self.cache.put(keys[2], 2, 60, 100)
+        self.assertEqual([self.cache.get(k) for k in keys], [0, None, 2])
+        return
+
+    def test_max_bytes(self):
+        "The cache is bounded by the size of the responses"
+        keys = [self.cache.key('Channel', 'GetChannelInfoList', {'SourceID': str(x)})
+                for x in range(3)]
+        self.cache.put(keys[0], 0, 60, 50)
+        self.cache.put(keys[1], 1, 60, 100)
+        self.cache.put(keys[2], 2, 60, 201)
+        self.assertEqual(self.cache.bytes, 150)
+        self.cache.put(keys[0], 0, 60, 150)
+        self.assertEqual([self.cache.get(k) for k in keys], [0, None, None])
+        self.assertEqual(self.cache.bytes, 150)
+        self.cache.invalidate('Channel')
+        self.assertEqual((len(self.cache), self.cache.bytes), (0, 0))
+        return
+
+    def test_persist(self):
+        "Picklable responses are kept between processes"
+        with TemporaryDirectory() as tmp_dir:
+            fname = join(tmp_dir, 'responses.pickle')
+            cache = MythTVResponseCache(self.backend, ttl=60, fname=fname)
+            key = cache.key('Myth', 'GetHostName', {})
+            cache.put(key, MythTVServiceObject('String', {'String': 'backend'}), 60, 10)
+            cache.put(cache.key('Myth', 'GetTimeZone', {}), lambda: None, 60, 10)
+            cache.save()
+            cache = MythTVResponseCache(self.backend, ttl=60, fname=fname)
+            self.assertEqual(cache.get(key).String, 'backend')
+            self.assertEqual(len(cache), 1)
+        return
+
+
+
+class TestCachedCall(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = StubBackend()
+        self.backend.response_cache = MythTVResponseCache(self.backend, ttl=60)
+        self.api = MythTVServiceAPI('Channel', self.backend)
+        self.api._index = {'operations': {
+            'GetChannelInfo': {'verb': 'GET', 'returns': 'tns:ChannelInfo',
+                               'parameters': [{'name': 'ChanID'}]},
+            'UpdateDBChannel': {'verb': 'POST', 'returns': 'xs:boolean',
+                                'parameters': [{'name': 'ChannelID'}]}}}
+        self.api._http_get = mock.Mock(side_effect=lambda o, a, k: (object(), 100))
+        self.api._clients.client = mock.Mock()
+        return
+
+    def test_get_cached(self):
+        "Repeated GET operations are sent once, whichever way they're called"
+        response = self.api.call('GetChannelInfo', 1001)
+        self.assertIs(self.api.call('GetChannelInfo', ChanID='1001'), response)
+        self.assertIsNot(self.api.call('GetChannelInfo', 1002), response)
+        self.assertEqual(self.api._http_get.call_count, 2)
+        return
+
+    def test_post_during_get(self):
+        "A GET response isn't cached if a POST completed while it was in flight"
+        def http_get(operation, args, kwargs):
+            self.api.call('UpdateDBChannel', ChannelID=1001)
+            return object(), 100
+        self.api._http_get.side_effect = http_get
+        response = self.api.call('GetChannelInfo', 1001)
+        self.api._http_get.side_effect = lambda o, a, k: (object(), 100)
+        self.assertIsNot(self.api.call('GetChannelInfo', 1001), response)
+        self.assertEqual(self.api._http_get.call_count, 2)
+        return
+
+    def test_post_invalidates(self):
+        "A successful POST discards the service's cached responses"
+        response = self.api.call('GetChannelInfo', 1001)
+        self.api.call('UpdateDBChannel', ChannelID=1001)
+        self.assertIsNot(self.api.call('GetChannelInfo', 1001), response)
+        self.assertEqual(self.api._http_get.call_count, 2)
+        return
@@ -0,0 +1,205 @@
+"""
+Test the mythtvlib.services module
+"""
+
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from lxml.etree import fromstring, parse
+
+from mythtvlib import services
+from mythtvlib.services import MythTVServiceAPI
+
+XS = 'http://www.w3.org/2001/XMLSchema'
+
+SCHEMA = """<xs:schema xmlns:xs="{xs}" targetNamespace="http://mythtv.org">
+{imports}
+<xs:complexType name="{name}"/>
+</xs:schema>"""
+
+WSDL = """<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:xs="{xs}" xmlns:tns="http://mythtv.org">
+<types><xs:schema targetNamespace="http://mythtv.org">
+<xs:element name="GetChannelInfo"><xs:complexType><xs:sequence>
+<xs:element minOccurs="0" name="ChanID" type="xs:unsignedInt"/>
+</xs:sequence></xs:complexType></xs:element>
+<xs:element name="GetChannelInfoResponse"><xs:complexType><xs:sequence>
+<xs:element minOccurs="0" name="GetChannelInfoResult" type="tns:ChannelInfo"/>
+</xs:sequence></xs:complexType></xs:element>
+<xs:complexType name="ChannelInfo"><xs:sequence>
+<xs:element minOccurs="0" name="ChanId" type="xs:unsignedInt"/>
+<xs:element minOccurs="0" name="CallSign" type="xs:string"/>
+</xs:sequence></xs:complexType>
+<xs:complexType name="ArrayOfChannelInfo"><xs:sequence>
+<xs:element maxOccurs="unbounded" name="ChannelInfo" type="tns:ChannelInfo"/>
+</xs:sequence></xs:complexType>
+</xs:schema></types>
+<portType name="ChannelServices">
+<operation name="GetChannelInfo"><documentation>GET </documentation></operation>
+</portType>
+</definitions>"""
+
+IMPORT = '<xs:import schemaLocation="http://backend/xsd?type={0}"/>'
+
+# type name -> imported type names
+IMPORT_TREE = {
+    'ChannelInfoList': ['ChannelInfo', 'ArrayOfChannelInfo'],
+    'ArrayOfChannelInfo': ['ChannelInfo'],
+    'ChannelInfo': ['Program'],
+    'Program': [],
+    }
+
+
+def fake_get(location):
+    name = location.split('=')[-1]
+    imports = "\n".join(IMPORT.format(x) for x in IMPORT_TREE[name])
+    return SCHEMA.format(xs=XS, imports=imports, name=name).encode()
+
+
+
+class TestFetchImports(unittest.TestCase):
+
+    def setUp(self):
+        services._schema_sources.clear()
+        self.backend = mock.Mock()
+        self.backend.http.get.side_effect = fake_get
+        self.api = MythTVServiceAPI('Channel', self.backend)
+        return
+
+    def wsdl_root(self):
+        source = SCHEMA.format(xs=XS, name='Wsdl',
+                               imports=IMPORT.format('ChannelInfoList'))
+        return parse(BytesIO(source.encode())).getroot()
+
+    def test_import_tree_fetched_once(self):
+        "Each schema in the import tree is retrieved exactly once"
+        get = self.backend.http.get
+        imports = {}
+        root = self.wsdl_root()
+        self.api._fetch_imports_includes(root, imports)
+        self.assertEqual(get.call_count, len(IMPORT_TREE))
+        self.assertEqual(len(imports), len(IMPORT_TREE))
+        self.assertEqual(root.findall(".//*[@schemaLocation]"), [])
+        for imp in imports.values():
+            self.assertEqual(
+                imp['tree'].findall(".//*[@schemaLocation]"), [])
+        # A second service re-uses the retrieved schema
+        self.api._fetch_imports_includes(self.wsdl_root(), {})
+        self.assertEqual(get.call_count, len(IMPORT_TREE))
+        return
+
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MythTVServiceAPI('Channel', mock.Mock())
+        self.api._index = services.build_index(
+            parse(BytesIO(WSDL.format(xs=XS).encode())))
+        return
+
+    def test_build_index(self):
+        "Operations, parameters and types are read from the WSDL"
+        index = self.api.index
+        self.assertEqual(self.api.operations(), ['GetChannelInfo'])
+        self.assertEqual(self.api.operation_verb('GetChannelInfo'), 'GET')
+        self.assertEqual(self.api.operation_return_type('GetChannelInfo'),
+                         'tns:ChannelInfo')
+        self.assertEqual(
+            [x['name'] for x in self.api.operation_parameters('GetChannelInfo')],
+            ['ChanID'])
+        self.assertEqual(index['types']['ChannelInfo'],
+                         {'ChanId': 'xs:unsignedInt', 'CallSign': 'xs:string'})
+        self.assertEqual(index['arrays'],
+                         {'ArrayOfChannelInfo': 'tns:ChannelInfo'})
+        return
+
+    def test_wsdl_namespaces(self):
+        "The WSDL's namespaces are answered by prefix"
+        self.api._wsdl = parse(BytesIO(WSDL.format(xs=XS).encode()))
+        self.assertEqual(self.api.wsdl_namespaces, {
+            'wsdl': 'http://schemas.xmlsoap.org/wsdl/', 'xs': XS,
+            'tns': 'http://mythtv.org'})
+        return
+
+    def test_validate_args(self):
+        "Invalid arguments are rejected before contacting the backend"
+        self.api.validate_args('GetChannelInfo', ['1001'])
+        for args in (['abc'], ['1001', '1002']):
+            with self.assertRaises(services.MythTVServiceException):
+                self.api.validate_args('GetChannelInfo', args)
+        with self.assertRaises(services.MythTVServiceException):
+            self.api.validate_args('NoSuchOperation', [])
+        return
+
+
+
+class TestLazyService(unittest.TestCase):
+
+    def test_construction_is_lazy(self):
+        "Creating the service API doesn't touch the WSDL or build a client"
+        backend = mock.Mock()
+        api = MythTVServiceAPI('Channel', backend)
+        self.assertEqual(backend.mock_calls, [])
+        self.assertFalse(hasattr(api._clients, 'client'))
+        return
+
+    def test_unknown_service(self):
+        "Unknown services are rejected immediately"
+        with self.assertRaises(services.MythTVServiceException):
+            MythTVServiceAPI('NoSuchService', mock.Mock())
+        return
+
+
+
+class TestDecode(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MythTVServiceAPI('Channel', mock.Mock())
+        self.api._index = {
+            'version': services.INDEX_VERSION,
+            'operations': {},
+            'types': {
+                'ChannelInfoList': {'Count': 'xs:int',
+                                    'ChannelInfos': 'tns:ArrayOfChannelInfo'},
+                'ArrayOfChannelInfo': {'ChannelInfo': 'tns:ChannelInfo'},
+                'ChannelInfo': {'ChanId': 'xs:unsignedInt',
+                                'CallSign': 'xs:string',
+                                'Visible': 'xs:boolean',
+                                'XMLTVID': 'xs:string'}},
+            'arrays': {'ArrayOfChannelInfo': 'tns:ChannelInfo'}}
+        return
+
+    def check(self, channels):
+        self.assertEqual(channels.Count, 2)
+        items = services.array_items(channels.ChannelInfos)
+        self.assertEqual([dict(x) for x in items], [
+            {'ChanId': 1001, 'CallSign': 'ABC', 'Visible': True, 'XMLTVID': None},
+            {'ChanId': 1002, 'CallSign': 'DEF', 'Visible': False, 'XMLTVID': 'x.y'}])
+        return
+
+    def test_json(self):
+        "JSON responses are decoded using the schema types"
+        value = {'Count': '2', 'ChannelInfos': [
+            {'ChanId': '1001', 'CallSign': 'ABC', 'Visible': 'true', 'XMLTVID': ''},
+            {'ChanId': '1002', 'CallSign': 'DEF', 'Visible': 'false', 'XMLTVID': 'x.y'}]}
+        self.check(self.api._decode_json('tns:ChannelInfoList', value))
+        # JSON numbers and booleans are answered as they are
+        value = {'Count': 2, 'ChannelInfos': [
+            {'ChanId': 1001, 'CallSign': 'ABC', 'Visible': True, 'XMLTVID': None},
+            {'ChanId': 1002, 'CallSign': 'DEF', 'Visible': False, 'XMLTVID': 'x.y'}]}
+        self.check(self.api._decode_json('tns:ChannelInfoList', value))
+        return
+
+    def test_xml(self):
+        "XML responses are decoded using the schema types"
+        value = fromstring(
+            "<ChannelInfoList><Count>2</Count><ChannelInfos>"
+            "<ChannelInfo><ChanId>1001</ChanId><CallSign>ABC</CallSign>"
+            "<Visible>true</Visible><XMLTVID/></ChannelInfo>"
+            "<ChannelInfo><ChanId>1002</ChanId><CallSign>DEF</CallSign>"
+            "<Visible>false</Visible><XMLTVID>x.y</XMLTVID></ChannelInfo>"
+            "</ChannelInfos></ChannelInfoList>")
+        self.check(self.api._decode_xml('tns:ChannelInfoList', value))
+        return
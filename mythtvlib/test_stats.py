@@ -0,0 +1,83 @@
+"""
+Test the mythtvlib.stats module
+"""
+
+import unittest
+from unittest import mock
+
+from mythtvlib.response_cache import MythTVResponseCache
+from mythtvlib.services import MythTVServiceAPI
+from mythtvlib.stats import MythTVHistogram, MythTVStats, format_stats
+from mythtvlib.testing import StubBackend
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        "Percentiles are accurate to within a bucket"
+        histogram = MythTVHistogram()
+        for ms in range(1, 101):
+            histogram.add(ms / 1000.0)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['mean'], 50.5)
+        self.assertAlmostEqual(summary['max'], 100.0)
+        for name, expected in (('p50', 50), ('p95', 95), ('p99', 99)):
+            self.assertGreaterEqual(summary[name], expected)
+            self.assertLess(summary[name], expected * 1.1)
+        return
+
+
+
+class TestCallStats(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = StubBackend()
+        self.backend.metrics = MythTVStats(enabled=True)
+        self.backend.response_cache = MythTVResponseCache(self.backend, ttl=60)
+        self.api = MythTVServiceAPI('Channel', self.backend)
+        self.api._index = {'operations': {
+            'GetChannelInfo': {'verb': 'GET', 'returns': 'tns:ChannelInfo',
+                               'parameters': [{'name': 'ChanID'}]}}}
+        return
+
+    def http_get(self, operation, args, kwargs):
+        if args[0] == 0:
+            raise ValueError("No such channel")
+        # As recorded by the connection pool
+        if self.backend.metrics.enabled:
+            self.backend.metrics.record_http(0.002, 100, 2000)
+        return object(), 2000
+
+    def test_call_recorded(self):
+        "Calls, errors, cache hits and HTTP requests are recorded per operation"
+        self.api._http_get = self.http_get
+        self.api._clients.client = mock.Mock()
+        self.api._clients.client.service.GetChannelInfo.side_effect = ValueError("Failed")
+        self.api.call('GetChannelInfo', 1001)
+        self.api.call('GetChannelInfo', 1001)
+        with self.assertRaises(ValueError):
+            self.api.call('GetChannelInfo', 0)
+        self.backend.metrics.record_http(0.001, 0, 10)
+        stats = self.backend.metrics.summary()
+        op = stats['operations']['Channel.GetChannelInfo']
+        self.assertEqual((op['calls'], op['errors']), (3, 1))
+        # Failed calls only count as errors
+        self.assertEqual((op['cache_hits'], op['cache_misses']), (1, 1))
+        self.assertEqual((op['http_requests'], op['request_bytes'],
+                          op['response_bytes']), (1, 100, 2000))
+        self.assertEqual(stats['operations']['(none)']['http_requests'], 1)
+        stats['http'] = {'connections': 1, 'requests': 2, 'reused': 1, 'retries': 0}
+        stats['response_cache'] = {'hits': 1, 'misses': 2, 'entries': 1, 'bytes': 2000}
+        lines = format_stats(stats)
+        self.assertTrue(any(x.split()[:3] == ['Channel.GetChannelInfo', '3', '1']
+                            for x in lines))
+        return
+
+    def test_disabled(self):
+        "Nothing is recorded when disabled"
+        self.backend.metrics.enabled = False
+        self.api._http_get = self.http_get
+        self.api.call('GetChannelInfo', 1001)
+        self.assertEqual(self.backend.metrics.summary()['operations'], {})
+        return
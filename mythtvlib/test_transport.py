@@ -0,0 +1,84 @@
+"""
+Test the mythtvlib.transport module
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.error import HTTPError, URLError
+
+from mythtvlib.transport import MythTVConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        return
+
+    def do_GET(self):
+        status = 404 if self.path == '/missing' else 200
+        body = self.path.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.path == '/truncated':
+            # Close the connection part way through the body
+            self.wfile.write(body[:4])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+        return
+
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('localhost', 0), KeepAliveHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.pool = MythTVConnectionPool('localhost', self.server.server_address[1])
+        self.base_url = 'http://localhost:{0}'.format(self.server.server_address[1])
+        return
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        return
+
+    def test_connection_reused(self):
+        "Sequential requests share a single connection"
+        for i in range(3):
+            path = '/Channel/GetChannelInfo?ChanID={0}'.format(i)
+            self.assertEqual(self.pool.get(self.base_url + path),
+                             path.encode('utf-8'))
+        counters = self.pool.counters()
+        self.assertEqual(counters['connections'], 1)
+        self.assertEqual(counters['requests'], 3)
+        self.assertEqual(counters['reused'], 2)
+        return
+
+    def test_http_error(self):
+        "Unsuccessful requests raise HTTPError"
+        with self.assertRaises(HTTPError):
+            self.pool.get(self.base_url + '/missing')
+        return
+
+    def test_incomplete_reply(self):
+        "A reply cut short raises URLError, and the connection isn't reused"
+        with self.assertRaises(URLError):
+            self.pool.get(self.base_url + '/truncated')
+        self.assertEqual(self.pool.counters()['idle'], 0)
+        self.assertEqual(self.pool.get(self.base_url + '/ok'), b'/ok')
+        return
+
+    def test_other_host(self):
+        "Only URLs on the pool's backend are handled"
+        self.assertTrue(self.pool.handles(self.base_url + '/Myth/wsdl'))
+        self.assertFalse(self.pool.handles('file:///tmp/MythTV-Myth.wsdl'))
+        self.assertFalse(self.pool.handles('http://otherhost:6544/Myth/wsdl'))
+        return
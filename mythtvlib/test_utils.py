@@ -2,11 +2,15 @@
 Test the mythtvlib.utils module
 """
 
+import logging
 import unittest
+from logging.handlers import QueueHandler
 from os.path import isdir, join, split, abspath
+from tempfile import TemporaryDirectory
 
 from mythtvlib.settings import settings
-from mythtvlib.utils import get_tmp_dir
+from mythtvlib.utils import (RECORD, MythTVConsoleFormatter, configure_logging,
+                             get_tmp_dir, stop_queue_listeners)
 
 
 class TestUtils(unittest.TestCase):
@@ -30,3 +34,84 @@ class TestUtils(unittest.TestCase):
                         "tmp dir name = '{0}', expected '{1}'".format(
                             dir_name, settings.TMP_DIR_NAME))
         return
+
+
+
+class TestConfigureLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.fname = join(self.tmp_dir.name, 'test.log')
+        self.logger = logging.getLogger('mythtvlib.test_utils')
+        return
+
+    def tearDown(self):
+        stop_queue_listeners()
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        self.tmp_dir.cleanup()
+        return
+
+    def config(self, level):
+        return {
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {
+                'file': {
+                    'level': level,
+                    'class': 'logging.FileHandler',
+                    'filename': self.fname,
+                    },
+                },
+            'loggers': {
+                'mythtvlib.test_utils': {
+                    'handlers': ['file'],
+                    'propagate': False,
+                    'level': 'DEBUG',
+                    },
+                },
+            }
+
+    def log_update(self):
+        for i in range(3):
+            self.logger.log(RECORD, "record {0}".format(i))
+        self.logger.info("Updated 3 record(s)")
+        return
+
+    def test_queue(self):
+        "The handlers run in a background thread, all records are written"
+        configure_logging(self.config('RECORD'), queue=True)
+        self.assertEqual([x.__class__ for x in self.logger.handlers], [QueueHandler])
+        self.log_update()
+        stop_queue_listeners()
+        with open(self.fname) as fp:
+            self.assertEqual(fp.read().splitlines(),
+                             ["record 0", "record 1", "record 2", "Updated 3 record(s)"])
+        return
+
+    def test_console_format(self):
+        "The console shows RECORD messages as INFO, as before the level was added"
+        config = self.config('RECORD')
+        config['formatters'] = {'simple': {
+            'class': 'mythtvlib.utils.MythTVConsoleFormatter',
+            'format': '%(levelname)s: %(message)s'}}
+        config['handlers']['file']['formatter'] = 'simple'
+        configure_logging(config, queue=False)
+        self.assertIsInstance(self.logger.handlers[0].formatter, MythTVConsoleFormatter)
+        self.log_update()
+        self.logger.warning("Check")
+        with open(self.fname) as fp:
+            self.assertEqual(fp.read().splitlines(),
+                             ["INFO: record 0", "INFO: record 1", "INFO: record 2",
+                              "INFO: Updated 3 record(s)", "WARNING: Check"])
+        return
+
+    def test_summary(self):
+        "At INFO only the bulk summary is written"
+        configure_logging(self.config('INFO'), queue=False)
+        self.assertFalse(isinstance(self.logger.handlers[0], QueueHandler))
+        self.log_update()
+        with open(self.fname) as fp:
+            self.assertEqual(fp.read().splitlines(), ["Updated 3 record(s)"])
+        return
@@ -0,0 +1,115 @@
+"""
+Test the mythtvlib.wsdl_cache module
+"""
+
+import time
+import unittest
+from os import listdir, mkdir
+from os.path import basename, isdir
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from mythtvlib import wsdl_cache
+from mythtvlib.testing import StubBackend
+from mythtvlib.wsdl_cache import MythTVWSDLCache
+
+
+class TestWSDLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        patcher = mock.patch.object(wsdl_cache, 'get_tmp_dir',
+                                    return_value=self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.backend = StubBackend()
+        return
+
+    def new_cache(self, version):
+        cache = MythTVWSDLCache(self.backend, ttl=60)
+        cache.fetch_version = mock.Mock(return_value={
+            'version': version, 'uuid': 'uuid', 'key': version})
+        return cache
+
+    def store(self, cache, service):
+        with open(cache.wsdl_fname(service), 'w') as fp:
+            fp.write("<definitions/>")
+        cache.stored(service)
+        return
+
+    def test_directory_per_backend(self):
+        "Each hostname and port has its own cache directory"
+        cache = self.new_cache('v1')
+        self.assertEqual(basename(cache.directory), 'backend.example.com_6544')
+        return
+
+    def test_hit_within_ttl(self):
+        "A valid cache doesn't contact the backend"
+        self.store(self.new_cache('v1'), 'Channel')
+        cache = self.new_cache('v1')
+        self.assertTrue(cache.is_valid('Channel'))
+        self.assertFalse(cache.is_valid('Myth'))
+        cache.fetch_version.assert_not_called()
+        return
+
+    def test_version_change(self):
+        "An upgraded backend invalidates the cache once the TTL expires"
+        self.store(self.new_cache('v1'), 'Channel')
+        with mock.patch.object(wsdl_cache.time, 'time',
+                               return_value=time.time() + 120):
+            cache = self.new_cache('v2')
+            self.assertFalse(cache.is_valid('Channel'))
+            cache.fetch_version.assert_called_once_with()
+        self.assertEqual(
+            [x for x in listdir(cache.directory) if x.endswith('.wsdl')], [])
+        return
+
+    def test_version_change_running(self):
+        "A long running process checks the version again once the TTL expires"
+        cache = self.new_cache('v1')
+        self.store(cache, 'Channel')
+        cache.fetch_version.return_value = {'version': 'v2', 'uuid': 'uuid', 'key': 'v2'}
+        self.assertEqual(cache.info()['key'], 'v1')
+        self.assertTrue(cache.is_valid('Channel'))
+        with mock.patch.object(wsdl_cache.time, 'time',
+                               return_value=time.time() + 120):
+            self.assertEqual(cache.info()['key'], 'v2')
+            self.assertFalse(cache.is_valid('Channel'))
+            self.assertEqual(cache.fetch_version.call_count, 2)
+        return
+
+    def test_refresh(self):
+        "refresh_wsdl ignores the cache until each service is stored"
+        self.store(self.new_cache('v1'), 'Channel')
+        self.backend.refresh_wsdl = True
+        cache = self.new_cache('v1')
+        self.assertFalse(cache.is_valid('Channel'))
+        self.store(cache, 'Channel')
+        self.assertTrue(cache.is_valid('Channel'))
+        return
+
+    def test_client_cache_follows_wsdl(self):
+        "The client model cache is replaced when the WSDL changes"
+        cache = self.new_cache('v1')
+        self.store(cache, 'Channel')
+        location = cache.client_cache_location('Channel')
+        self.assertEqual(location, cache.client_cache_location('Channel'))
+        mkdir(location)
+        with open(cache.wsdl_fname('Channel'), 'w') as fp:
+            fp.write("<definitions name='changed'/>")
+        new_location = cache.client_cache_location('Channel')
+        self.assertNotEqual(location, new_location)
+        self.assertFalse(isdir(location))
+        return
+
+    def test_index_follows_wsdl(self):
+        "Storing a new WSDL discards the index built from the old one"
+        cache = self.new_cache('v1')
+        self.store(cache, 'Channel')
+        self.assertIsNone(cache.load_index('Channel'))
+        cache.store_index('Channel', {'operations': {}})
+        self.assertEqual(cache.load_index('Channel'), {'operations': {}})
+        self.store(cache, 'Channel')
+        self.assertIsNone(cache.load_index('Channel'))
+        return
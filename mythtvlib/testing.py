@@ -0,0 +1,22 @@
+"""
+Module: testing.py
+
+Helpers shared by the mythtvlib unit tests.
+"""
+
+from mythtvlib.stats import MythTVStats
+
+
+
+class StubBackend(object):
+    """The MythTVBackend attributes used by the WSDL cache, response cache
+    and MythTVServiceAPI, without a connection pool.
+    The tests add the caches they need."""
+
+    def __init__(self, transport='json'):
+        self.hostname = 'backend.example.com'
+        self.port = 6544
+        self.transport = transport
+        self.refresh_wsdl = False
+        self.metrics = MythTVStats(enabled=False)
+        return
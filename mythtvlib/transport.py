@@ -0,0 +1,213 @@
+"""
+Module: transport.py
+
+Keep-alive HTTP connections to a MythTV backend.
+
+Each MythTVBackend owns a MythTVConnectionPool which is used for retrieving
+the WSDL, the json and xml transports and, through MythTVSudsTransport, by
+suds.  Connections are kept open between requests, so bulk operations
+(e.g. one UpdateDBChannel per channel) don't pay for a TCP connection per
+request.
+"""
+
+import http.client
+import logging
+import time
+from io import BytesIO
+from threading import BoundedSemaphore, Lock
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+from suds.transport import Reply, Transport, TransportError
+
+logger = logging.getLogger(__name__)
+
+# Errors that indicate that an idle connection was closed by the backend
+STALE_CONNECTION_ERRORS = (http.client.BadStatusLine, BrokenPipeError,
+                           ConnectionResetError, ConnectionAbortedError)
+
+
+
+class MythTVHTTPResponse(object):
+    "The status, headers and body of a completed request"
+
+    def __init__(self, url, status, reason, headers, data):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.data = data
+        return
+
+    def raise_for_status(self):
+        "Raise HTTPError if the request wasn't successful"
+        if self.status >= 400:
+            raise HTTPError(self.url, self.status, self.reason, self.headers,
+                            BytesIO(self.data))
+        return
+
+
+
+class MythTVConnectionPool(object):
+    """A pool of keep-alive HTTP connections to a single backend.
+
+    At most size connections are open at once, requests beyond that wait
+    for a connection to be returned to the pool.
+
+    Each request is recorded in metrics (a stats.MythTVStats), if supplied
+    and enabled."""
+
+    def __init__(self, hostname, port, size=4, timeout=90, metrics=None):
+        self.hostname = hostname
+        self.port = int(port)
+        self.size = size
+        self.timeout = timeout
+        self.metrics = metrics
+        self._idle = []
+        self._lock = Lock()
+        self._available = BoundedSemaphore(size)
+        # Counters: connections opened, requests sent on a previously used
+        # connection, all requests and requests retried on a new connection
+        self.created = 0
+        self.reused = 0
+        self.requests = 0
+        self.retries = 0
+        return
+
+    def counters(self):
+        "Answer the connection reuse counters"
+        with self._lock:
+            return {
+                'connections': self.created,
+                'requests': self.requests,
+                'reused': self.reused,
+                'retries': self.retries,
+                'idle': len(self._idle),
+                }
+
+    def handles(self, url):
+        "Answer a boolean indicating whether url is on the receivers backend"
+        parts = urlsplit(url)
+        return (parts.scheme == 'http' and parts.hostname == self.hostname and
+                (parts.port or 80) == self.port)
+
+    def _get_connection(self):
+        "Answer an idle connection, or a new one, and whether it is re-used"
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.pop(), True
+            self.created += 1
+        return http.client.HTTPConnection(self.hostname, self.port,
+                                          timeout=self.timeout), False
+
+    def _put_connection(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+        return
+
+    def request(self, method, url, body=None, headers=None):
+        """Send the request on a pooled connection,
+        answering a MythTVHTTPResponse.
+
+        Network errors are raised as URLError, as urlopen() does."""
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = "{0}?{1}".format(path, parts.query)
+        headers = dict(headers or {})
+        if self.metrics is not None and self.metrics.enabled:
+            start = time.perf_counter()
+        else:
+            start = None
+        self._available.acquire()
+        try:
+            connection, reused = self._get_connection()
+            while True:
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except STALE_CONNECTION_ERRORS as e:
+                    connection.close()
+                    if not reused:
+                        raise URLError(e)
+                    # The backend closed the idle connection, try a new one
+                    logger.debug("Retrying {0} on a new connection: {1}".format(url, e))
+                    with self._lock:
+                        self.retries += 1
+                    connection, reused = self._get_connection()
+                except (OSError, http.client.HTTPException) as e:
+                    # Including a reply cut short, e.g. IncompleteRead
+                    connection.close()
+                    raise URLError(e)
+            with self._lock:
+                self.requests += 1
+                if reused:
+                    self.reused += 1
+            if response.will_close:
+                connection.close()
+            else:
+                self._put_connection(connection)
+        finally:
+            self._available.release()
+        if start is not None:
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            self.metrics.record_http(time.perf_counter() - start,
+                                     len(body or b''), len(data))
+        return MythTVHTTPResponse(url, response.status, response.reason,
+                                  response.msg, data)
+
+    def get(self, url, headers=None):
+        """Answer the body of url, raising HTTPError if unsuccessful.
+        urls on other hosts are retrieved with urlopen()."""
+        if not self.handles(url):
+            return urlopen(url).read()
+        response = self.request('GET', url, headers=headers)
+        response.raise_for_status()
+        return response.data
+
+    def close(self):
+        "Close all idle connections"
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+        for connection in idle:
+            connection.close()
+        return
+
+
+
+class MythTVSudsTransport(Transport):
+    """suds transport sending requests through a MythTVConnectionPool"""
+
+    def __init__(self, pool):
+        Transport.__init__(self)
+        self.pool = pool
+        # reply_size is the size of the last reply received, the transport
+        # belongs to a single thread's client
+        self.reply_size = None
+        return
+
+    def open(self, request):
+        if not self.pool.handles(request.url):
+            # e.g. the file:// URL of the cached WSDL
+            return urlopen(request.url)
+        response = self.pool.request('GET', request.url, headers=request.headers)
+        if response.status >= 400:
+            raise TransportError(response.reason, response.status,
+                                 BytesIO(response.data))
+        return BytesIO(response.data)
+
+    def send(self, request):
+        response = self.pool.request('POST', request.url, body=request.message,
+                                     headers=request.headers)
+        self.reply_size = len(response.data)
+        if response.status in (http.client.ACCEPTED, http.client.NO_CONTENT):
+            return None
+        if response.status >= 300:
+            raise TransportError(response.reason, response.status,
+                                 BytesIO(response.data))
+        return Reply(http.client.OK, response.headers, response.data)
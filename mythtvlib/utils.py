@@ -1,13 +1,38 @@
+import atexit
 import logging
+import re
 from os import mkdir
 from os.path import isdir, join
 from mythtvlib.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Bulk operations log each record at RECORD, and a summary at INFO, so
+# setting a handler or logger level to INFO summarises them
+RECORD = 15
+logging.addLevelName(RECORD, 'RECORD')
+
+# The QueueListeners started by configure_logging()
+_queue_listeners = []
+
 class MythTVUtilsException(Exception):
     pass
 
+
+
+class MythTVConsoleFormatter(logging.Formatter):
+    """Format RECORD messages with the INFO level name, as they were
+    logged before the RECORD level was added, see settings.LOGGING"""
+
+    def format(self, record):
+        if record.levelno == RECORD:
+            # The record is shared with the other handlers
+            record = logging.makeLogRecord(record.__dict__)
+            record.levelname = logging.getLevelName(logging.INFO)
+        return logging.Formatter.format(self, record)
+
+
+
 def get_tmp_dir():
     "Answer the location used for temporary and cache files"
     tmp_dir = None
@@ -24,3 +49,86 @@ def get_tmp_dir():
         raise MythTVUtilsException(msg)
     logger.debug("got tmp dir = {0}".format(tmp_dir))
     return tmp_dir
+
+
+def configure_logging(config=None, queue=None, loggers=()):
+    """Configure logging from config (default settings.LOGGING).
+    The CLIs call this once their arguments have been parsed, so that
+    --help and --version don't create the log file.
+
+    loggers are the names of the loggers created before logging is
+    configured, e.g. the CLI's own, which must stay enabled if the config
+    disables existing loggers.
+
+    If queue (default settings.LOGGING_QUEUE) is True, the handlers run in
+    background threads, see queue_handlers()."""
+    import logging.config
+    if config is None:
+        config = settings.LOGGING
+    if queue is None:
+        queue = getattr(settings, "LOGGING_QUEUE", False)
+    stop_queue_listeners()
+    logging.config.dictConfig(config)
+    for name in loggers:
+        logging.getLogger(name).disabled = False
+    if queue:
+        queue_handlers([logging.getLogger(x) for x in config.get('loggers', {})] +
+                       [logging.getLogger()])
+    return
+
+
+def queue_handlers(loggers):
+    """Replace the handlers of each of loggers with a QueueHandler, and
+    run the original handlers in a QueueListener thread, so that logging
+    only formats the message and queues the record, while the file I/O and
+    rotation happen in the background.
+
+    Loggers with the same handlers share a queue.  The listeners are
+    stopped, writing any queued records, when the process exits."""
+    from logging.handlers import QueueHandler, QueueListener
+    from queue import Queue
+    queues = {}
+    for a_logger in loggers:
+        handlers = tuple(a_logger.handlers)
+        if len(handlers) == 0:
+            continue
+        queue_handler = queues.get(handlers)
+        if queue_handler is None:
+            queue = Queue(-1)
+            listener = QueueListener(queue, *handlers, respect_handler_level=True)
+            listener.start()
+            _queue_listeners.append(listener)
+            queue_handler = QueueHandler(queue)
+            queues[handlers] = queue_handler
+        for handler in handlers:
+            a_logger.removeHandler(handler)
+        a_logger.addHandler(queue_handler)
+    return
+
+
+def stop_queue_listeners():
+    "Stop the QueueListeners, writing the queued records"
+    while len(_queue_listeners) > 0:
+        _queue_listeners.pop().stop()
+    return
+
+atexit.register(stop_queue_listeners)
+
+
+def profile_feature(text, feature_name):
+    """Answer the requested feature from the MythTV profile text, or None.
+
+    The text is mostly free-format, however the features are:
+
+    - <feature_name>:
+         <feature_value>
+    """
+    regex = re.compile('(^- {0}:)'.format(re.escape(feature_name)), re.MULTILINE)
+    search = regex.search(text)
+    if search is None:
+        return None
+    offset = search.end() + 1
+    substring = text[offset:]
+    length = substring.find("\n")
+    substring = substring[:length].strip()
+    return substring
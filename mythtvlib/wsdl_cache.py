@@ -0,0 +1,194 @@
+"""
+Module: wsdl_cache.py
+
+The on-disk cache of the suds friendly WSDL retrieved from a MythTV backend.
+
+Each backend (hostname, port) has its own cache directory, and the cached
+files are named after the backend version, so multiple backends, or
+different versions of a single backend, never share definitions.
+
+The backend version is recorded in cache.json with the time it was last
+confirmed.  Within WSDL_CACHE_TTL seconds of confirmation the cache is used
+without contacting the backend.  After that the version is read again (a
+single Myth/ProfileText request), by new processes and by long running
+ones: if it is unchanged the cached files are re-used, otherwise the WSDL
+is retrieved from the backend.
+
+The operation index built from each WSDL (see services.build_index) is
+stored as JSON next to it.
+
+The suds client model built from each WSDL is pickled next to it (using
+suds' ObjectCache) in a directory named after a digest of the WSDL, so
+the model is rebuilt whenever the WSDL changes.
+"""
+
+import json
+import logging
+import re
+import time
+from hashlib import sha1
+from os import listdir, mkdir, remove
+from io import BytesIO
+from os.path import exists, isdir, join
+from shutil import rmtree
+from threading import Lock
+
+from lxml.etree import parse
+
+from mythtvlib.settings import settings
+from mythtvlib.utils import get_tmp_dir, profile_feature
+
+logger = logging.getLogger(__name__)
+
+
+
+class MythTVWSDLCache(object):
+    """Locate the cached WSDL files for a single backend."""
+
+    info_file_name = "cache.json"
+    # Increment client_cache_version to discard all pickled client models
+    client_cache_version = 1
+
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+        if self.ttl is None:
+            self.ttl = int(getattr(settings, "WSDL_CACHE_TTL", 86400))
+        self.directory = join(get_tmp_dir(), "{host}_{port}".format(
+            host=re.sub(r'[^\w.-]', '_', str(backend.hostname)),
+            port=backend.port))
+        if not isdir(self.directory):
+            mkdir(self.directory)
+        self.info_fname = join(self.directory, self.info_file_name)
+        # _info is the cache.json contents once confirmed by this process
+        self._info = None
+        # _refreshed is the set of service names retrieved by this process
+        self._refreshed = set()
+        self._lock = Lock()
+        return
+
+    def _read_info(self):
+        "Answer the contents of cache.json, or None"
+        try:
+            with open(self.info_fname) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _write_info(self, info):
+        with open(self.info_fname, 'w') as fp:
+            json.dump(info, fp)
+        return
+
+    def fetch_version(self):
+        """Answer the backend version details from Myth/ProfileText.
+        The version is 'unknown' if the backend doesn't supply it."""
+        url = 'http://{hostname}:{port}/Myth/ProfileText'.format(
+                hostname=self.backend.hostname,
+                port=self.backend.port)
+        text = parse(BytesIO(self.backend.http.get(url))).getroot().text or ""
+        version = profile_feature(text, 'version') or "unknown"
+        uuid = profile_feature(text, 'uuid') or ""
+        key = sha1("{0}|{1}".format(version, uuid).encode('utf-8')).hexdigest()[:12]
+        return {'version': version, 'uuid': uuid, 'key': key}
+
+    def info(self):
+        """Answer the confirmed cache information, checking the backend
+        version if the TTL has expired or a refresh has been requested.
+        Long running processes check the version again each time the TTL
+        expires (a TTL of 0 checks once per process), the service APIs
+        discard their WSDL if the key has changed, see
+        MythTVServiceAPI.check_version()."""
+        info = self._info
+        if info is not None and not self._expired(info):
+            return info
+        with self._lock:
+            if self._info is None or self._expired(self._info):
+                self._info = self._confirm_info()
+        return self._info
+
+    def _expired(self, info):
+        "Answer whether the confirmation of info is older than the TTL"
+        return self.ttl > 0 and time.time() - info['confirmed'] >= self.ttl
+
+    def _confirm_info(self):
+        "Answer the cache information, reading the backend version if needed"
+        info = self._read_info()
+        now = time.time()
+        if (info is not None and not self.backend.refresh_wsdl and
+                now - info['confirmed'] < self.ttl):
+            return info
+        new_info = self.fetch_version()
+        new_info['confirmed'] = now
+        if info is not None and info['key'] != new_info['key']:
+            logger.info("Backend version changed from {0} to {1}".format(
+                info['version'], new_info['version']))
+            self._remove_stale(new_info['key'])
+        if new_info['version'] == "unknown":
+            # The cached files can't be validated, retrieve them again
+            self._remove_stale(None)
+        self._write_info(new_info)
+        return new_info
+
+    def _remove_stale(self, key):
+        "Remove the cached WSDL and index files that don't belong to key"
+        suffixes = ("-{0}.wsdl".format(key), "-{0}.index.json".format(key))
+        for fname in listdir(self.directory):
+            if not fname.startswith("MythTV-"):
+                continue
+            if not fname.endswith(suffixes):
+                remove(join(self.directory, fname))
+        return
+
+    def wsdl_fname(self, service_name):
+        "Answer the file name of the cached WSDL for service_name"
+        return join(self.directory, "MythTV-{service}-{key}.wsdl".format(
+            service=service_name, key=self.info()['key']))
+
+    def index_fname(self, service_name):
+        "Answer the file name of the cached operation index for service_name"
+        return join(self.directory, "MythTV-{service}-{key}.index.json".format(
+            service=service_name, key=self.info()['key']))
+
+    def load_index(self, service_name):
+        "Answer the cached operation index for service_name, or None"
+        try:
+            with open(self.index_fname(service_name)) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def store_index(self, service_name, index):
+        with open(self.index_fname(service_name), 'w') as fp:
+            json.dump(index, fp)
+        return
+
+    def client_cache_location(self, service_name):
+        """Answer the directory of the suds object cache for service_name,
+        removing any caches built from previous versions of the WSDL"""
+        digest = sha1(str(self.client_cache_version).encode('utf-8'))
+        with open(self.wsdl_fname(service_name), 'rb') as fp:
+            digest.update(fp.read())
+        prefix = "suds-{0}-".format(service_name)
+        location = join(self.directory, prefix + digest.hexdigest()[:12])
+        if not isdir(location):
+            for fname in listdir(self.directory):
+                if fname.startswith(prefix):
+                    rmtree(join(self.directory, fname), ignore_errors=True)
+        return location
+
+    def is_valid(self, service_name):
+        """Answer a boolean indicating whether the cached WSDL for
+        service_name may be used"""
+        if self.backend.refresh_wsdl and service_name not in self._refreshed:
+            return False
+        return exists(self.wsdl_fname(service_name))
+
+    def stored(self, service_name):
+        """Note that the WSDL for service_name has been written by this
+        process, discarding the index built from the previous WSDL"""
+        self._refreshed.add(service_name)
+        index_fname = self.index_fname(service_name)
+        if exists(index_fname):
+            remove(index_fname)
+        return
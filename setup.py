@@ -4,8 +4,8 @@ from setuptools import setup
 
 import mythtvlib
 
-if sys.version < "3.4.0":
-    raise ValueError("mythtv_cli_extensions require python 3.4.0 or later")
+if sys.version_info < (3, 7):
+    raise ValueError("mythtv_cli_extensions require python 3.7.0 or later")
 
 setup(
     name = "mythtv_cli_extensions",
@@ -16,6 +16,7 @@ setup(
     url = "http://random0musings.blogspot.com/",
     long_description = open("README.txt").read(),
     packages = ["mythtvlib"],
+    python_requires = '>=3.7',
     install_requires = ['suds-jurko'],
     entry_points = {
         'console_scripts' : [
@@ -28,7 +29,7 @@ setup(
         'Environment :: Console',
         'License :: OSI Approved :: GNU General Public License v2 or later (GPLv2+)',
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3.7',
         'Topic :: Utilities'
     ]
 )
\ No newline at end of file